@@ -1 +1,6 @@
 """Local speech service package."""
+
+from app.cpu import apply_thread_env
+
+# BLAS and OpenMP read their thread limits once, when NumPy is first imported.
+apply_thread_env()
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import subprocess
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from fastapi import HTTPException
+
+from app.ffmpeg import resolve_ffmpeg_command
+
+
+def load_audio_for_scoring(path: Path) -> tuple:
+    import librosa
+
+    try:
+        return librosa.load(str(path), sr=16000, mono=True)
+    except Exception as exc:
+        raise HTTPException(
+            status_code=400,
+            detail="Audio decoding failed. Please retry with a short clear recording.",
+        ) from exc
+
+
+def boost_quiet_signal(signal: np.ndarray) -> np.ndarray:
+    if signal.size == 0:
+        return signal.astype(np.float32, copy=False)
+
+    signal32 = signal.astype(np.float32, copy=False)
+    peak = float(np.max(np.abs(signal32)))
+    if peak <= 0.0:
+        return signal32
+
+    rms = float(np.sqrt(np.mean(np.square(signal32))))
+    target_peak = 0.92
+    target_rms = 0.10
+
+    clip_limited_gain = target_peak / peak
+    if rms > 1e-8:
+        loudness_gain = target_rms / rms
+    else:
+        loudness_gain = clip_limited_gain
+
+    gain = min(clip_limited_gain, max(1.0, loudness_gain), 8.0)
+    if gain <= 1.05:
+        return signal32
+
+    return np.clip(signal32 * gain, -0.98, 0.98).astype(np.float32, copy=False)
+
+
+def write_temp_wav(signal: np.ndarray, sample_rate: int) -> Path:
+    import soundfile as sf
+
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
+        path = Path(temp_file.name)
+    sf.write(path, signal, sample_rate, subtype="PCM_16")
+    return path
+
+
+def convert_audio_to_scoring_wav(path: Path) -> Path:
+    ffmpeg_command = resolve_ffmpeg_command()
+    if not ffmpeg_command:
+        raise HTTPException(
+            status_code=500,
+            detail="`ffmpeg` is required in PATH to decode microphone audio (webm/mp4).",
+        )
+
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as converted_file:
+        converted_path = Path(converted_file.name)
+
+    convert = subprocess.run(
+        [
+            ffmpeg_command,
+            "-y",
+            "-loglevel",
+            "error",
+            "-i",
+            str(path),
+            "-ar",
+            "16000",
+            "-ac",
+            "1",
+            "-c:a",
+            "pcm_s16le",
+            str(converted_path),
+        ],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+
+    if convert.returncode != 0 or not converted_path.exists():
+        converted_path.unlink(missing_ok=True)
+        raise HTTPException(
+            status_code=400,
+            detail="Unsupported audio format. Try Chrome/Edge and allow microphone permissions.",
+        )
+
+    return converted_path
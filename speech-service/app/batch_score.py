@@ -0,0 +1,255 @@
+"""Offline batch re-scoring of recorded attempts.
+
+Usage (from ``speech-service/``)::
+
+    python -m app.batch_score manifest.json --out results.jsonl --workers 4 --threads 2
+
+The manifest is a JSON array (or JSONL file) of entries with ``id``,
+``language``, ``targetText``, optional ``transliteration`` and ``audioPath``,
+the same shape as ``scripts/benchmark/smoke-set.json``. Results are appended
+to the output JSONL as they finish; re-running with the same ``--out`` skips
+entries that already have a successful result.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, replace
+from multiprocessing import get_context
+from pathlib import Path
+
+_THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "NUMBA_NUM_THREADS",
+    "WHISPER_CPU_THREADS",
+)
+
+
+@dataclass
+class BatchEntry:
+    id: str
+    language: str
+    target_text: str
+    transliteration: str | None
+    audio_path: str
+
+
+@dataclass
+class BatchSummary:
+    total: int
+    skipped: int
+    succeeded: int
+    failed: int
+    wall_seconds: float
+    audio_seconds: float
+
+
+def load_manifest(path: Path) -> list[BatchEntry]:
+    raw = path.read_text(encoding="utf-8")
+    if path.suffix == ".jsonl":
+        items = [json.loads(line) for line in raw.splitlines() if line.strip()]
+    else:
+        items = json.loads(raw)
+
+    entries: list[BatchEntry] = []
+    for index, item in enumerate(items):
+        language = item.get("language")
+        if language not in {"ar", "zh"}:
+            raise ValueError(f"manifest entry {index}: language must be ar or zh")
+        audio_path = Path(item["audioPath"])
+        if not audio_path.is_absolute():
+            audio_path = (path.parent / audio_path).resolve()
+        entries.append(
+            BatchEntry(
+                id=str(item.get("id") or index),
+                language=language,
+                target_text=item["targetText"],
+                transliteration=item.get("transliteration"),
+                audio_path=str(audio_path),
+            )
+        )
+    return entries
+
+
+def completed_ids(out_path: Path) -> set[str]:
+    if not out_path.exists():
+        return set()
+
+    done: set[str] = set()
+    for line in out_path.read_text(encoding="utf-8").splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            # A crash mid-write can leave a truncated last line.
+            continue
+        if "error" not in record:
+            done.add(str(record.get("id")))
+    return done
+
+
+def _init_worker(threads: int, languages: list[str], nice: int) -> None:
+    # Must run before app modules import NumPy/librosa/CTranslate2 so every
+    # library in this worker is capped at its share of the cores.
+    for name in _THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+    # Re-scoring is background work: on a shared node, let the live
+    # service's interactive requests win the CPU.
+    if nice and hasattr(os, "nice"):
+        os.nice(nice)
+
+    from app.config import SETTINGS
+    from app.stt import transcriber
+
+    # Importing the ``app`` package builds SETTINGS, which can happen while
+    # this initializer is unpickled, before the loop above sets
+    # WHISPER_CPU_THREADS. Pass the cap to the transcriber directly.
+    transcriber.use_settings(replace(SETTINGS, whisper_cpu_threads=threads))
+
+    for language in languages:
+        try:
+            transcriber.warmup(language)
+        except Exception:
+            # Load errors resurface per entry, where they are recorded.
+            pass
+
+
+def _score_entry(entry: BatchEntry) -> dict:
+    import soundfile as sf
+    from fastapi import HTTPException
+
+    from app.pipeline import score_audio_file
+
+    started = time.perf_counter()
+    record: dict = {"id": entry.id, "language": entry.language}
+    try:
+        record["duration_seconds"] = round(sf.info(entry.audio_path).duration, 3)
+    except Exception:
+        record["duration_seconds"] = None
+
+    try:
+        record.update(
+            score_audio_file(
+                Path(entry.audio_path),
+                language=entry.language,
+                target_text=entry.target_text,
+                transliteration=entry.transliteration,
+            )
+        )
+    except HTTPException as exc:
+        record["error"] = str(exc.detail)
+        record["status"] = exc.status_code
+    except Exception as exc:
+        record["error"] = str(exc)
+        record["status"] = 500
+
+    record["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return record
+
+
+def _report_progress(done: int, total: int, started: float, audio_seconds: float) -> None:
+    elapsed = max(time.perf_counter() - started, 1e-6)
+    rate = done / elapsed
+    eta = (total - done) / rate if rate else 0.0
+    print(
+        f"[batch-score] {done}/{total} items  {rate:.2f} items/s  "
+        f"{audio_seconds / elapsed:.2f} audio-s/s  eta {eta:.0f}s",
+        file=sys.stderr,
+        flush=True,
+    )
+
+
+def score_manifest(
+    entries: list[BatchEntry],
+    out_path: Path,
+    workers: int,
+    threads: int,
+    resume: bool = True,
+    nice: int = 0,
+) -> BatchSummary:
+    """Score *entries* over a process pool, appending results to *out_path*."""
+    done_ids = completed_ids(out_path) if resume else set()
+    pending = [entry for entry in entries if entry.id not in done_ids]
+    languages = sorted({entry.language for entry in pending})
+
+    started = time.perf_counter()
+    succeeded = failed = 0
+    audio_seconds = 0.0
+
+    if pending:
+        # Spawned workers start from a clean interpreter, so the thread caps
+        # set in the initializer apply before any native library loads.
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(threads, languages, nice),
+        ) as pool, out_path.open("a", encoding="utf-8") as out_file:
+            futures = [pool.submit(_score_entry, entry) for entry in pending]
+            for index, future in enumerate(as_completed(futures), start=1):
+                record = future.result()
+                out_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out_file.flush()
+
+                if "error" in record:
+                    failed += 1
+                else:
+                    succeeded += 1
+                audio_seconds += record.get("duration_seconds") or 0.0
+
+                if index % 10 == 0 or index == len(pending):
+                    _report_progress(index, len(pending), started, audio_seconds)
+
+    return BatchSummary(
+        total=len(entries),
+        skipped=len(entries) - len(pending),
+        succeeded=succeeded,
+        failed=failed,
+        wall_seconds=round(time.perf_counter() - started, 2),
+        audio_seconds=round(audio_seconds, 2),
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Re-score recorded attempts offline.")
+    parser.add_argument("manifest", type=Path)
+    parser.add_argument("--out", type=Path, required=True, help="results JSONL (appended to)")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--threads", type=int, default=2, help="CPU threads per worker")
+    parser.add_argument("--no-resume", action="store_true", help="re-score entries already in --out")
+    parser.add_argument("--nice", type=int, default=10, help="niceness increment for workers (0 = none)")
+    args = parser.parse_args(argv)
+
+    entries = load_manifest(args.manifest)
+    summary = score_manifest(
+        entries,
+        out_path=args.out,
+        workers=max(1, args.workers),
+        threads=max(1, args.threads),
+        resume=not args.no_resume,
+        nice=max(0, args.nice),
+    )
+
+    throughput = summary.succeeded / summary.wall_seconds if summary.wall_seconds else 0.0
+    print(
+        json.dumps(
+            {
+                **summary.__dict__,
+                "items_per_second": round(throughput, 3),
+                "realtime_factor": round(summary.audio_seconds / summary.wall_seconds, 3)
+                if summary.wall_seconds
+                else 0.0,
+            }
+        )
+    )
+    return 1 if summary.failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
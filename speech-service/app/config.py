@@ -11,12 +11,21 @@ def _env_bool(name: str, default: bool) -> bool:
     return value.strip().lower() in {"1", "true", "yes", "on"}
 
 
+def _env_list(name: str, default: str) -> tuple[str, ...]:
+    value = os.getenv(name, default)
+    return tuple(item.strip() for item in value.split(",") if item.strip())
+
+
 @dataclass(frozen=True)
 class Settings:
     whisper_model: str = os.getenv("WHISPER_MODEL", "small")
     whisper_model_zh: str = os.getenv("WHISPER_MODEL_ZH", "tiny")
     whisper_device: str = os.getenv("WHISPER_DEVICE", "cpu")
     whisper_compute_type: str = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+    # 0 lets CTranslate2 pick its default thread count.
+    whisper_cpu_threads: int = int(os.getenv("WHISPER_CPU_THREADS", "0"))
+    # Parallel decodes one model instance can run (CTranslate2 num_workers).
+    whisper_num_workers: int = int(os.getenv("WHISPER_NUM_WORKERS", "1"))
     whisper_beam_size: int = int(os.getenv("WHISPER_BEAM_SIZE", "3"))
     whisper_best_of: int = int(os.getenv("WHISPER_BEST_OF", "3"))
     whisper_fallback_beam_size: int = int(os.getenv("WHISPER_FALLBACK_BEAM_SIZE", "5"))
@@ -29,6 +38,12 @@ class Settings:
     whisper_zh_fast_threshold: float = float(os.getenv("WHISPER_ZH_FAST_THRESHOLD", "70"))
     whisper_zh_skip_quality_fallback: bool = _env_bool("WHISPER_ZH_SKIP_QUALITY_FALLBACK", True)
     whisper_zh_vad_filter: bool = _env_bool("WHISPER_ZH_VAD_FILTER", False)
+    # Start the fallback pass alongside the primary for clips that look hard
+    # (quiet, long pauses, or a target that recently decoded badly) when a
+    # scheduler slot is free. Needs WHISPER_NUM_WORKERS >= 2 to run in parallel.
+    whisper_speculative: bool = _env_bool("WHISPER_SPECULATIVE", False)
+    whisper_speculative_max_rms_dbfs: float = float(os.getenv("WHISPER_SPECULATIVE_MAX_RMS_DBFS", "-30"))
+    whisper_speculative_pause_seconds: float = float(os.getenv("WHISPER_SPECULATIVE_PAUSE_SECONDS", "0.6"))
     local_tts_backend: str = os.getenv("LOCAL_TTS_BACKEND", "auto")
     qwen_tts_model: str = os.getenv("QWEN_TTS_MODEL", "Qwen/Qwen3-TTS-12Hz-1.7B-VoiceDesign")
     artst_model: str = os.getenv("ARTST_MODEL", "MBZUAI/speecht5_tts_clartts_ar")
@@ -36,7 +51,75 @@ class Settings:
     elevenlabs_ar_voice_id: str = os.getenv("ELEVENLABS_AR_VOICE_ID", "")
     elevenlabs_model_id: str = os.getenv("ELEVENLABS_MODEL_ID", "eleven_multilingual_v2")
     elevenlabs_timeout_seconds: float = float(os.getenv("ELEVENLABS_TIMEOUT_SECONDS", "20"))
+    warmup_languages: tuple[str, ...] = _env_list("WARMUP_LANGUAGES", "zh,ar")
+    # Relative paths resolve against speech-service/. Empty disables priming.
+    warmup_manifest: str = os.getenv("WARMUP_MANIFEST", "warmup.json")
+    # Pre-rendered clips (app/voicepack.py): base path of the .idx index (its
+    # .pack data sits beside it), relative to speech-service/. Empty or
+    # missing disables the pack.
+    voice_pack_path: str = os.getenv("VOICE_PACK_PATH", "voice-pack/voices")
+    # Cache-Control max-age for synthesized audio; ETags catch model changes
+    # when clients revalidate after it.
+    tts_cache_max_age_seconds: int = int(os.getenv("TTS_CACHE_MAX_AGE_SECONDS", "86400"))
+    # 0 disables the limit / idle unloading respectively.
+    model_memory_budget_mb: float = float(os.getenv("MODEL_MEMORY_BUDGET_MB", "0"))
+    model_idle_unload_seconds: float = float(os.getenv("MODEL_IDLE_UNLOAD_SECONDS", "3600"))
+    # Concurrent model-work slots (see app/scheduler.py) and how many of them
+    # only interactive requests may use.
+    scheduler_slots: int = int(os.getenv("SCHEDULER_SLOTS", "2"))
+    scheduler_interactive_reserved: int = int(os.getenv("SCHEDULER_INTERACTIVE_RESERVED", "1"))
+    # Interactive queue wait that pauses prefetch/background work, and for how long.
+    scheduler_interactive_wait_ms: float = float(os.getenv("SCHEDULER_INTERACTIVE_WAIT_MS", "250"))
+    scheduler_pause_seconds: float = float(os.getenv("SCHEDULER_PAUSE_SECONDS", "2"))
+    # Overload quality tiers (see app/overload.py): one threshold per degraded
+    # tier for interactive queue depth and recent interactive queue wait.
+    overload_enabled: bool = _env_bool("OVERLOAD_ENABLED", True)
+    overload_queue_depths: tuple[str, ...] = _env_list("OVERLOAD_QUEUE_DEPTHS", "4,8,16,24")
+    overload_wait_ms: tuple[str, ...] = _env_list("OVERLOAD_WAIT_MS", "1000,2000,4000,8000")
+    overload_recover_seconds: float = float(os.getenv("OVERLOAD_RECOVER_SECONDS", "10"))
+    overload_recover_fraction: float = float(os.getenv("OVERLOAD_RECOVER_FRACTION", "0.7"))
+    # Non-Chinese model used from the "small-model" tier on. Empty keeps WHISPER_MODEL.
+    whisper_model_overload: str = os.getenv("WHISPER_MODEL_OVERLOAD", "base")
+    # Learned fallback/rescue policy (see app/decode_policy.py). Relative
+    # paths resolve against speech-service/; empty keeps stats in memory only.
+    decode_policy_enabled: bool = _env_bool("DECODE_POLICY_ENABLED", True)
+    decode_policy_path: str = os.getenv("DECODE_POLICY_PATH", "decode-policy.json")
+    decode_policy_min_samples: int = int(os.getenv("DECODE_POLICY_MIN_SAMPLES", "30"))
+    decode_policy_min_gain_per_second: float = float(os.getenv("DECODE_POLICY_MIN_GAIN_PER_SECOND", "2"))
+    decode_policy_explore: float = float(os.getenv("DECODE_POLICY_EXPLORE", "0.05"))
+    # Time kept back from a request deadline for scoring and the response.
+    deadline_margin_ms: float = float(os.getenv("DEADLINE_MARGIN_MS", "150"))
+    # Cores shared by STT, TTS and scoring (see app/cpu.py). 0 leaves every
+    # library at its own default; -1 uses all cores the process may run on.
+    cpu_budget_cores: int = int(os.getenv("CPU_BUDGET_CORES", "0"))
+    cpu_budget_split: tuple[str, ...] = _env_list("CPU_BUDGET_SPLIT", "stt:2,tts:1,scoring:1")
+    cpu_pin_affinity: bool = _env_bool("CPU_PIN_AFFINITY", False)
+    # Append-only JSONL of per-request stage spans. Empty disables it.
+    trace_log_path: str = os.getenv("SPEECH_TRACE_LOG", "")
+    # Empty disables the request profiler (header and /admin/profile alike).
+    profiler_token: str = os.getenv("PROFILER_TOKEN", "")
+    profile_dir: str = os.getenv("PROFILE_DIR", "profiles")
+    profile_interval_ms: float = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+    # Replace Whisper and TTS models with fixed-latency stand-ins (load testing).
+    stub_models: bool = _env_bool("SPEECH_STUB_MODELS", False)
+    stub_stt_latency_ms: float = float(os.getenv("STUB_STT_LATENCY_MS", "250"))
+    stub_tts_latency_ms: float = float(os.getenv("STUB_TTS_LATENCY_MS", "400"))
+    stub_latency_jitter: float = float(os.getenv("STUB_LATENCY_JITTER", "0.2"))
     max_upload_seconds: float = float(os.getenv("MAX_UPLOAD_SECONDS", "12"))
+    max_longform_seconds: float = float(os.getenv("MAX_LONGFORM_SECONDS", "180"))
+    longform_window_seconds: float = float(os.getenv("LONGFORM_WINDOW_SECONDS", "10"))
+    longform_overlap_seconds: float = float(os.getenv("LONGFORM_OVERLAP_SECONDS", "1.5"))
+    stream_end_silence_seconds: float = float(os.getenv("STREAM_END_SILENCE_SECONDS", "0.8"))
+    stream_partial_interval_seconds: float = float(os.getenv("STREAM_PARTIAL_INTERVAL_SECONDS", "1.5"))
+    synthesize_batch_max_items: int = int(os.getenv("SYNTHESIZE_BATCH_MAX_ITEMS", "64"))
+    # Router (app/router.py): speech-service base URLs it spreads requests over.
+    router_backends: tuple[str, ...] = _env_list("ROUTER_BACKENDS", "")
+    router_health_interval_seconds: float = float(os.getenv("ROUTER_HEALTH_INTERVAL_SECONDS", "2"))
+    # Consecutive failed health checks before an instance leaves rotation.
+    router_unhealthy_after: int = int(os.getenv("ROUTER_UNHEALTHY_AFTER", "2"))
+    # Points per instance on the /synthesize hash ring.
+    router_virtual_nodes: int = int(os.getenv("ROUTER_VIRTUAL_NODES", "64"))
+    router_timeout_seconds: float = float(os.getenv("ROUTER_TIMEOUT_SECONDS", "120"))
 
 
 SETTINGS = Settings()
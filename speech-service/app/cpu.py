@@ -0,0 +1,162 @@
+"""Node-wide CPU budget shared by STT, TTS and scoring.
+
+CTranslate2, torch and the BLAS behind NumPy/librosa each default to one
+thread per core. When STT and TTS run at the same time they oversubscribe
+the node, and both get slower than if they ran one after the other. With
+``CPU_BUDGET_CORES`` set, the budget is split by the ``CPU_BUDGET_SPLIT``
+weights and each library is capped to its share:
+
+* STT: CTranslate2 ``cpu_threads`` per Whisper worker (an explicit
+  ``WHISPER_CPU_THREADS`` still wins);
+* TTS: torch intra-op threads, with a single inter-op thread;
+* scoring: ``OMP``/``OpenBLAS``/``MKL``/``numba`` thread limits, which are
+  read once when NumPy loads (see ``app/__init__.py``).
+
+With ``CPU_PIN_AFFINITY`` each share also gets its own set of cores, and
+the threads doing that work are pinned to it (Linux only).
+"""
+
+from __future__ import annotations
+
+import os
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from threading import Lock
+
+from app.config import SETTINGS, Settings
+
+COMPONENTS = ("stt", "tts", "scoring")
+_THREAD_ENV = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "NUMBA_NUM_THREADS",
+)
+
+
+@dataclass(frozen=True)
+class CpuPlan:
+    cores: int
+    threads: dict[str, int]
+    core_sets: dict[str, tuple[int, ...]]
+    pinned: bool
+
+    def as_dict(self) -> dict:
+        return {
+            "cores": self.cores,
+            "threads": dict(self.threads),
+            "pinned": self.pinned,
+            "core_sets": {name: list(cores) for name, cores in self.core_sets.items()} if self.pinned else None,
+        }
+
+
+def available_cores() -> list[int]:
+    """Cores this process may run on (respects cgroup/taskset restrictions)."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def parse_split(items: tuple[str, ...]) -> dict[str, float]:
+    weights = {name: 0.0 for name in COMPONENTS}
+    for item in items:
+        name, _, weight = item.partition(":")
+        name = name.strip()
+        if name not in weights:
+            raise ValueError(f"CPU_BUDGET_SPLIT: unknown component '{name}' (expected {', '.join(COMPONENTS)})")
+        weights[name] = float(weight or 1)
+    if sum(weights.values()) <= 0:
+        raise ValueError("CPU_BUDGET_SPLIT needs at least one positive weight.")
+    return weights
+
+
+def plan_budget(budget: int, weights: dict[str, float], cores: list[int], pin: bool) -> CpuPlan | None:
+    """Split *budget* cores by *weights*; every component gets at least one thread.
+
+    ``budget`` 0 disables the plan and -1 uses every core in *cores*. Budgets
+    smaller than the number of components share cores between them.
+    """
+    if budget == 0 or not cores:
+        return None
+    budget = len(cores) if budget < 0 else min(budget, len(cores))
+    total_weight = sum(weights.values())
+    ideal = {name: budget * weights.get(name, 0.0) / total_weight for name in COMPONENTS}
+    threads = {name: max(1, int(share)) for name, share in ideal.items()}
+    # Hand leftover cores to whichever component is furthest below its share.
+    while sum(threads.values()) < budget:
+        neediest = max(COMPONENTS, key=lambda name: ideal[name] - threads[name])
+        threads[neediest] += 1
+
+    pool = cores[:budget]
+    core_sets: dict[str, tuple[int, ...]] = {}
+    offset = 0
+    for name in COMPONENTS:
+        core_sets[name] = tuple(pool[(offset + index) % budget] for index in range(threads[name]))
+        offset += threads[name]
+    return CpuPlan(cores=budget, threads=threads, core_sets=core_sets, pinned=pin)
+
+
+PLAN = plan_budget(
+    SETTINGS.cpu_budget_cores,
+    parse_split(SETTINGS.cpu_budget_split),
+    available_cores(),
+    SETTINGS.cpu_pin_affinity,
+)
+
+
+def apply_thread_env() -> None:
+    """Cap BLAS/OpenMP pools to the scoring share; explicit env vars win."""
+    if PLAN is None:
+        return
+    for name in _THREAD_ENV:
+        os.environ.setdefault(name, str(PLAN.threads["scoring"]))
+
+
+def whisper_cpu_threads(settings: Settings = SETTINGS) -> int:
+    """CTranslate2 ``cpu_threads`` per worker; 0 keeps CTranslate2's default."""
+    if settings.whisper_cpu_threads or PLAN is None:
+        return settings.whisper_cpu_threads
+    return max(1, PLAN.threads["stt"] // max(1, settings.whisper_num_workers))
+
+
+_torch_lock = Lock()
+_torch_configured = False
+
+
+def configure_torch() -> None:
+    """Apply the TTS share to torch once, before the first TTS model loads."""
+    global _torch_configured
+    if PLAN is None or _torch_configured:
+        return
+    with _torch_lock:
+        if _torch_configured:
+            return
+        import torch
+
+        torch.set_num_threads(PLAN.threads["tts"])
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            # Only settable before torch runs any inter-op parallel work.
+            pass
+        _torch_configured = True
+
+
+@contextmanager
+def pinned(component: str) -> Iterator[None]:
+    """Run the block (and any threads it starts) on *component*'s cores.
+
+    Thread pools inherit the affinity of the thread that creates them, so
+    pinning model loads and first inference also pins the library's workers.
+    """
+    if PLAN is None or not PLAN.pinned or not hasattr(os, "sched_setaffinity"):
+        yield
+        return
+    previous = os.sched_getaffinity(0)
+    os.sched_setaffinity(0, PLAN.core_sets[component])
+    try:
+        yield
+    finally:
+        os.sched_setaffinity(0, previous)
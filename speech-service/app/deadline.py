@@ -0,0 +1,135 @@
+"""Request deadlines and Whisper pass cost estimates.
+
+A client sends its remaining time budget in ``X-Speech-Deadline-Ms`` (the
+WebSocket takes ``deadline_ms`` in its config message). The deadline is kept
+in a context variable, so it follows the request into worker threads.
+
+:data:`pass_costs` learns what each Whisper pass costs per second of audio
+on this host (an EWMA keyed by language, pass and beam size). The
+transcriber uses it to skip, or run a greedy version of, any pass that
+would not finish before the deadline.
+"""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+
+from app.config import SETTINGS
+
+_deadline: ContextVar[float | None] = ContextVar("speech_deadline", default=None)
+
+# Weight of the newest observation in the per-pass EWMA.
+_ALPHA = 0.2
+
+
+@contextmanager
+def deadline_scope(budget_ms: float | None) -> Iterator[None]:
+    """Give the block (and threads started from it) *budget_ms* from now."""
+    token = _deadline.set(time.monotonic() + budget_ms / 1000 if budget_ms and budget_ms > 0 else None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_seconds() -> float | None:
+    """Seconds left before the current request's deadline; ``None`` without one."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def expired() -> bool:
+    remaining = remaining_seconds()
+    return remaining is not None and remaining <= 0
+
+
+def parse_budget_ms(value: str | None) -> float | None:
+    """Parse a deadline header; raises ``ValueError`` on junk."""
+    if value is None or not value.strip():
+        return None
+    budget = float(value)
+    if budget <= 0:
+        raise ValueError("deadline must be positive")
+    return budget
+
+
+def _beam_factor(beam_size: int) -> float:
+    # Rough: extra beams are batched, so cost grows well below linearly.
+    return 1 + 0.25 * (max(1, beam_size) - 1)
+
+
+class PassCostModel:
+    """Seconds of decode time per second of audio, per (language, pass, beam)."""
+
+    def __init__(self) -> None:
+        self._rates: dict[tuple[str, str, int], float] = {}
+        self._lock = Lock()
+
+    def observe(self, language: str, pass_name: str, beam_size: int, seconds: float, audio_seconds: float) -> None:
+        if audio_seconds <= 0:
+            return
+        key = (language, pass_name, beam_size)
+        rate = seconds / audio_seconds
+        with self._lock:
+            previous = self._rates.get(key)
+            self._rates[key] = rate if previous is None else (1 - _ALPHA) * previous + _ALPHA * rate
+
+    def estimate(self, language: str, pass_name: str, beam_size: int, audio_seconds: float) -> float | None:
+        """Expected seconds for a pass, or ``None`` with no timings for *language* yet.
+
+        Passes never seen with this beam are extrapolated from the closest
+        beam of the same pass, then from any pass in the language.
+        """
+        with self._lock:
+            rate = self._rates.get((language, pass_name, beam_size))
+            if rate is None:
+                candidates = [
+                    (key[1] != pass_name, abs(key[2] - beam_size), key[2], value)
+                    for key, value in self._rates.items()
+                    if key[0] == language
+                ]
+                if not candidates:
+                    return None
+                _, _, known_beam, known_rate = min(candidates)
+                rate = known_rate * _beam_factor(beam_size) / _beam_factor(known_beam)
+        return rate * audio_seconds
+
+    def snapshot(self) -> dict[str, float]:
+        with self._lock:
+            return {f"{lang}/{name}/beam{beam}": round(rate, 4) for (lang, name, beam), rate in self._rates.items()}
+
+
+pass_costs = PassCostModel()
+
+
+def plan_pass(
+    language: str,
+    pass_name: str,
+    beam_size: int,
+    best_of: int,
+    audio_seconds: float | None,
+) -> tuple[int, int] | None:
+    """Beam settings that fit the deadline: as asked, greedy, or ``None`` to skip.
+
+    Without a deadline, audio duration or cost history the pass runs as asked.
+    """
+    remaining = remaining_seconds()
+    if remaining is None or audio_seconds is None:
+        return beam_size, best_of
+    # Leave room for scoring and the response after the last pass.
+    remaining -= SETTINGS.deadline_margin_ms / 1000
+    if remaining <= 0:
+        return None
+
+    full = pass_costs.estimate(language, pass_name, beam_size, audio_seconds)
+    if full is None or full <= remaining:
+        return beam_size, best_of
+    if beam_size > 1 or best_of > 1:
+        greedy = pass_costs.estimate(language, pass_name, 1, audio_seconds)
+        if greedy is not None and greedy <= remaining:
+            return 1, 1
+    return None
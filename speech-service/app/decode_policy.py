@@ -0,0 +1,228 @@
+"""Learned policy for the Whisper fallback and rescue passes.
+
+Every time the fallback or rescue pass runs, the transcriber records whether
+it beat the best transcript so far on ``WhisperTranscriber._quality``, by how
+much, and how long it took. Stats are kept per cell: language, target length
+bucket, pass, and the quality band of the transcript it tries to improve.
+
+Until a cell has ``DECODE_POLICY_MIN_SAMPLES`` runs, the static rules
+(``WHISPER_*_FAST_THRESHOLD``, ``WHISPER_ZH_SKIP_QUALITY_FALLBACK``) decide.
+After that, a pass runs only if its expected quality gain per second of decode
+is at least ``DECODE_POLICY_MIN_GAIN_PER_SECOND``. A pass the policy would
+skip still runs with probability ``DECODE_POLICY_EXPLORE``, so cells keep
+learning as audio and models change.
+
+Stats are saved to ``DECODE_POLICY_PATH`` every few updates and at shutdown,
+and loaded at startup. ``GET /decode-policy`` shows them.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import random
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from threading import Lock
+
+from app.config import SETTINGS
+
+_SERVICE_DIR = Path(__file__).resolve().parent.parent
+# Normalized target characters: single word, short phrase, sentence, longer.
+_LENGTH_BUCKETS = ((3, "xs"), (8, "s"), (20, "m"))
+_QUALITY_BANDS = ((40.0, "low"), (70.0, "mid"), (85.0, "high"))
+# A pass must beat the previous best by this much to count as an improvement.
+_MIN_IMPROVEMENT = 0.5
+_SAVE_EVERY = 20
+_FORMAT_VERSION = 1
+
+
+def length_bucket(target_norm: str) -> str:
+    for limit, name in _LENGTH_BUCKETS:
+        if len(target_norm) <= limit:
+            return name
+    return "l"
+
+
+def quality_band(quality: float) -> str:
+    for limit, name in _QUALITY_BANDS:
+        if quality < limit:
+            return name
+    return "top"
+
+
+@dataclass
+class PassStats:
+    runs: int = 0
+    improved: int = 0
+    gain_sum: float = 0.0
+    seconds_sum: float = 0.0
+    explored: int = 0
+    skipped: int = 0
+
+    def gain_per_second(self) -> float:
+        return self.gain_sum / self.seconds_sum if self.seconds_sum > 0 else 0.0
+
+    def summary(self) -> dict:
+        runs = max(1, self.runs)
+        return {
+            **asdict(self),
+            "improve_rate": round(self.improved / runs, 3),
+            "mean_gain": round(self.gain_sum / runs, 2),
+            "mean_seconds": round(self.seconds_sum / runs, 3),
+            "gain_per_second": round(self.gain_per_second(), 2),
+        }
+
+
+@dataclass(frozen=True)
+class Decision:
+    run: bool
+    # "static" (too few samples), "learned", or "explore"
+    reason: str
+
+
+class DecodePolicy:
+    def __init__(
+        self,
+        path: Path | None,
+        min_samples: int,
+        min_gain_per_second: float,
+        explore: float,
+        enabled: bool = True,
+    ) -> None:
+        self.path = path
+        self.min_samples = min_samples
+        self.min_gain_per_second = min_gain_per_second
+        self.explore = explore
+        self.enabled = enabled
+        self._cells: dict[str, PassStats] = {}
+        self._lock = Lock()
+        self._save_lock = Lock()
+        self._dirty = 0
+        self._rng = random.Random()
+        if path is not None:
+            self._load(path)
+
+    @staticmethod
+    def _key(language: str, target_norm: str, pass_name: str, quality: float) -> str:
+        return f"{language}/{length_bucket(target_norm)}/{pass_name}/{quality_band(quality)}"
+
+    def _load(self, path: Path) -> None:
+        try:
+            payload = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            # A corrupt file only costs the learned history, never startup.
+            return
+        if payload.get("version") != _FORMAT_VERSION:
+            return
+        self._cells = {key: PassStats(**value) for key, value in payload.get("cells", {}).items()}
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        with self._lock:
+            payload = {
+                "version": _FORMAT_VERSION,
+                "cells": {key: asdict(stats) for key, stats in sorted(self._cells.items())},
+            }
+            self._dirty = 0
+        with self._save_lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+            temp_path.write_text(json.dumps(payload, indent=1) + "\n", encoding="utf-8")
+            os.replace(temp_path, self.path)
+
+    def decide(
+        self,
+        language: str,
+        target_norm: str,
+        pass_name: str,
+        quality: float,
+        static_run: bool,
+    ) -> Decision:
+        """Whether to run *pass_name* to improve a transcript of *quality*."""
+        if not self.enabled:
+            return Decision(static_run, "static")
+        key = self._key(language, target_norm, pass_name, quality)
+        with self._lock:
+            stats = self._cells.setdefault(key, PassStats())
+            if stats.runs >= self.min_samples:
+                run, reason = stats.gain_per_second() >= self.min_gain_per_second, "learned"
+            else:
+                run, reason = static_run, "static"
+            if not run and self._rng.random() < self.explore:
+                stats.explored += 1
+                return Decision(True, "explore")
+            if not run:
+                stats.skipped += 1
+        return Decision(run, reason)
+
+    def record(
+        self,
+        language: str,
+        target_norm: str,
+        pass_name: str,
+        quality: float,
+        new_quality: float,
+        seconds: float,
+    ) -> None:
+        """Record one run of *pass_name* that took *quality* to *new_quality*."""
+        if not self.enabled:
+            return
+        gain = new_quality - quality
+        key = self._key(language, target_norm, pass_name, quality)
+        with self._lock:
+            stats = self._cells.setdefault(key, PassStats())
+            stats.runs += 1
+            stats.seconds_sum += seconds
+            if gain >= _MIN_IMPROVEMENT:
+                stats.improved += 1
+                stats.gain_sum += gain
+            self._dirty += 1
+            due = self._dirty >= _SAVE_EVERY
+        if due:
+            try:
+                self.save()
+            except OSError:
+                pass
+
+    def report(self) -> dict:
+        with self._lock:
+            cells = {
+                key: {
+                    **stats.summary(),
+                    "decision": (
+                        "static"
+                        if stats.runs < self.min_samples
+                        else ("run" if stats.gain_per_second() >= self.min_gain_per_second else "skip")
+                    ),
+                }
+                for key, stats in sorted(self._cells.items())
+            }
+        return {
+            "enabled": self.enabled,
+            "path": str(self.path) if self.path else None,
+            "min_samples": self.min_samples,
+            "min_gain_per_second": self.min_gain_per_second,
+            "explore": self.explore,
+            "cells": cells,
+        }
+
+
+def _policy_path() -> Path | None:
+    # Stub-model outcomes say nothing about real decodes; never persist them.
+    if not SETTINGS.decode_policy_path or SETTINGS.stub_models:
+        return None
+    path = Path(SETTINGS.decode_policy_path)
+    return path if path.is_absolute() else _SERVICE_DIR / path
+
+
+decode_policy = DecodePolicy(
+    path=_policy_path(),
+    min_samples=SETTINGS.decode_policy_min_samples,
+    min_gain_per_second=SETTINGS.decode_policy_min_gain_per_second,
+    explore=SETTINGS.decode_policy_explore,
+    enabled=SETTINGS.decode_policy_enabled,
+)
@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+from fastapi import HTTPException
+
+from app.audio import boost_quiet_signal, write_temp_wav
+from app.config import SETTINGS
+from app.cpu import pinned
+from app.overload import TIER_PITCH_PROXY, current_tier
+from app.scoring import ScoreResult, evaluate_pronunciation
+from app.stt import transcriber
+from app.text_utils import normalize_text
+
+# CJK characters are scored one syllable at a time; everything else by word.
+_TOKEN_PATTERN = re.compile(r"[\u4e00-\u9fff]|[^\s\u4e00-\u9fff]+")
+_CONFIDENCE_RANK = {"low": 0, "medium": 1, "high": 2}
+
+
+@dataclass
+class _TargetToken:
+    start: int
+    end: int
+    norm_start: int
+    norm_end: int
+
+
+@dataclass
+class _SpanScore:
+    start_seconds: float
+    end_seconds: float
+    first_token: int
+    last_token: int
+    target_text: str
+    weight: int
+    result: ScoreResult
+
+
+def _tokenize_target(text: str) -> tuple[list[_TargetToken], str]:
+    tokens: list[_TargetToken] = []
+    norm_parts: list[str] = []
+    offset = 0
+    for match in _TOKEN_PATTERN.finditer(text):
+        norm = normalize_text(match.group())
+        if not norm:
+            continue
+        tokens.append(
+            _TargetToken(
+                start=match.start(),
+                end=match.end(),
+                norm_start=offset,
+                norm_end=offset + len(norm),
+            )
+        )
+        norm_parts.append(norm)
+        offset += len(norm)
+    return tokens, "".join(norm_parts)
+
+
+def _align_substring(query: str, target: str, lo: int, hi: int) -> tuple[int, int, int]:
+    """Find the substring of ``target[lo:hi]`` closest to *query* by edit distance.
+
+    Semi-global alignment: skipping target characters before and after the
+    match is free. Returns ``(start, end, distance)`` in *target* offsets.
+    """
+    region = target[lo:hi]
+    cols = len(region) + 1
+    prev = [0] * cols
+    prev_start = list(range(cols))
+
+    for i in range(1, len(query) + 1):
+        row = [i] + [0] * (cols - 1)
+        row_start = [0] * cols
+        for j in range(1, cols):
+            cost = 0 if query[i - 1] == region[j - 1] else 1
+            diagonal = prev[j - 1] + cost
+            up = prev[j] + 1
+            left = row[j - 1] + 1
+            if diagonal <= up and diagonal <= left:
+                row[j], row_start[j] = diagonal, prev_start[j - 1]
+            elif up <= left:
+                row[j], row_start[j] = up, prev_start[j]
+            else:
+                row[j], row_start[j] = left, row_start[j - 1]
+        prev, prev_start = row, row_start
+
+    end = min(range(cols), key=lambda j: (prev[j], -j))
+    return lo + prev_start[end], lo + end, prev[end]
+
+
+def _tokens_between(tokens: list[_TargetToken], norm_start: int, norm_end: int) -> tuple[int, int] | None:
+    covered = [
+        index
+        for index, token in enumerate(tokens)
+        if token.norm_start < norm_end and token.norm_end > norm_start
+    ]
+    if not covered:
+        return None
+    return covered[0], covered[-1]
+
+
+def score_long_form(
+    wav_path: Path,
+    language: str,
+    target_text: str,
+    transliteration: str | None,
+) -> dict:
+    """Score a long reading in overlapping windows aligned to target spans.
+
+    Audio is read one window at a time from the converted 16 kHz WAV, so
+    memory stays bounded and work grows linearly with the recording length.
+    Each window is transcribed on its own, aligned to the best-matching span
+    of the target near the expected reading position, scored against that
+    span, and the span scores are aggregated by span length.
+    """
+    import soundfile as sf
+
+    del transliteration  # A whole-passage transliteration cannot be split per span.
+
+    info = sf.info(str(wav_path))
+    sample_rate = int(info.samplerate)
+    duration_seconds = info.frames / sample_rate if sample_rate else 0
+    if duration_seconds > SETTINGS.max_longform_seconds:
+        raise HTTPException(
+            status_code=400,
+            detail=f"audio too long; max {SETTINGS.max_longform_seconds} seconds",
+        )
+
+    tokens, target_norm = _tokenize_target(target_text)
+    if not tokens:
+        raise HTTPException(status_code=400, detail="target_text has no scoreable words")
+
+    window = max(1, int(SETTINGS.longform_window_seconds * sample_rate))
+    overlap = min(window // 2, int(SETTINGS.longform_overlap_seconds * sample_rate))
+    step = window - overlap
+    min_tail = overlap + int(0.5 * sample_rate)
+
+    spans: list[_SpanScore] = []
+    degraded: set[str] = set()
+    cursor = 0
+    for index, block in enumerate(
+        sf.blocks(str(wav_path), blocksize=window, overlap=overlap, dtype="float32", always_2d=False)
+    ):
+        if block.ndim > 1:
+            block = block.mean(axis=1)
+        offset = index * step
+        if index > 0 and block.size <= min_tail:
+            break
+
+        # Expected target position if the passage were read at an even pace.
+        expected_start = int(len(target_norm) * offset / max(info.frames, 1))
+        expected_end = int(len(target_norm) * (offset + block.size) / max(info.frames, 1))
+        expected_tokens = _tokens_between(tokens, expected_start, max(expected_end, expected_start + 1))
+        expected_text = target_text
+        if expected_tokens is not None:
+            expected_text = target_text[tokens[expected_tokens[0]].start : tokens[expected_tokens[1]].end]
+
+        boosted = boost_quiet_signal(block)
+        window_path = write_temp_wav(boosted, sample_rate)
+        try:
+            stt = transcriber.transcribe(
+                str(window_path),
+                language=language,
+                target_text=expected_text,
+                transliteration=None,
+            )
+        finally:
+            window_path.unlink(missing_ok=True)
+        degraded.update(stt.degraded)
+
+        transcript = stt.transcript.strip()
+        transcript_norm = normalize_text(transcript)
+        if not transcript_norm:
+            continue
+
+        slack = max(8, expected_end - expected_start)
+        lo = max(0, min(cursor, expected_start) - slack)
+        hi = min(len(target_norm), max(expected_end, cursor + len(transcript_norm)) + slack)
+        match_start, match_end, _ = _align_substring(transcript_norm, target_norm, lo, hi)
+        span_tokens = _tokens_between(tokens, match_start, max(match_end, match_start + 1))
+        if span_tokens is None:
+            continue
+
+        first, last = span_tokens
+        span_text = target_text[tokens[first].start : tokens[last].end]
+        with pinned("scoring"):
+            result = evaluate_pronunciation(
+                transcript=transcript,
+                target_text=span_text,
+                transliteration=None,
+                language=language,
+                audio=boosted,
+                sr=sample_rate,
+                avg_logprob=stt.avg_logprob,
+                pitch_proxy=current_tier() >= TIER_PITCH_PROXY,
+            )
+        spans.append(
+            _SpanScore(
+                start_seconds=round(offset / sample_rate, 2),
+                end_seconds=round((offset + block.size) / sample_rate, 2),
+                first_token=first,
+                last_token=last,
+                target_text=span_text,
+                weight=tokens[last].norm_end - tokens[first].norm_start,
+                result=result,
+            )
+        )
+        cursor = max(cursor, tokens[last].norm_end)
+
+    if not spans:
+        raise HTTPException(status_code=400, detail="no speech recognized")
+
+    result = _aggregate_spans(spans, tokens)
+    result["degraded"] = bool(degraded)
+    if degraded:
+        result["degradations"] = sorted(degraded)
+    return result
+
+
+def _aggregate_spans(spans: list[_SpanScore], tokens: list[_TargetToken]) -> dict:
+    total_weight = sum(span.weight for span in spans) or 1
+    covered: set[int] = set()
+    for span in spans:
+        covered.update(range(span.first_token, span.last_token + 1))
+    coverage = sum(tokens[i].norm_end - tokens[i].norm_start for i in covered) / tokens[-1].norm_end
+
+    component_names = spans[0].result.components.keys()
+    components = {
+        name: round(
+            sum(span.result.components.get(name, 0.0) * span.weight for span in spans) / total_weight,
+            2,
+        )
+        for name in component_names
+    }
+    components["coverage"] = round(coverage * 100, 2)
+
+    # Unread parts of the passage count as zero rather than being ignored.
+    mean_score = sum(span.result.score * span.weight for span in spans) / total_weight
+    score = round(max(0.0, min(100.0, mean_score * coverage)), 2)
+
+    weakest = min(spans, key=lambda span: span.result.score)
+    feedback = f'Weakest passage: "{weakest.target_text}". {weakest.result.feedback}'
+    if coverage < 0.8:
+        feedback = "Parts of the passage were not recognised; read every sentence. " + feedback
+
+    confidence = min((span.result.confidence for span in spans), key=_CONFIDENCE_RANK.__getitem__)
+
+    return {
+        "transcript": " ".join(span.result.transcript for span in spans),
+        "score": score,
+        "feedback": feedback,
+        "confidence": confidence,
+        "components": components,
+        "spans": [
+            {
+                "start_seconds": span.start_seconds,
+                "end_seconds": span.end_seconds,
+                "target_text": span.target_text,
+                "transcript": span.result.transcript,
+                "score": span.result.score,
+                "components": span.result.components,
+            }
+            for span in spans
+        ],
+    }
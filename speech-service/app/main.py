@@ -1,22 +1,68 @@
 from __future__ import annotations
 
 import asyncio
-import subprocess
+import json
 import tempfile
+import time
+import uuid
+from collections.abc import AsyncIterator
+from contextlib import nullcontext, suppress
 from pathlib import Path
 
-import librosa
 import numpy as np
-import soundfile as sf
-from fastapi import FastAPI, File, Form, HTTPException, UploadFile
-from fastapi.responses import Response
+from fastapi import (
+    FastAPI,
+    File,
+    Form,
+    HTTPException,
+    Request,
+    UploadFile,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
 
+from app.audio import convert_audio_to_scoring_wav
 from app.config import SETTINGS
-from app.ffmpeg import resolve_ffmpeg_command
-from app.scoring import evaluate_pronunciation
+from app.deadline import deadline_scope, parse_budget_ms
+from app.decode_policy import decode_policy
+from app.cpu import PLAN as cpu_plan
+from app.longform import score_long_form
+from app.metrics import IN_FLIGHT, REQUEST_SECONDS
+from app.metrics import render as render_metrics
+from app.models import model_manager
+from app.overload import TIER_NO_FALLBACK, overload, refresh_tier, scoring_tier
+from app.pipeline import score_audio_file, score_signal
+from app.scheduler import PRIORITIES, is_priority, priority_scope, scheduler
+from app.profiling import (
+    list_profiles,
+    profile_request,
+    selector,
+    should_profile,
+    token_matches,
+)
+from app.streaming import StreamingFeatureExtractor, pcm16_to_float
 from app.stt import transcriber
-from app.tts import TtsError, synthesize, warmup_models_for_language
+from app.tracing import current_trace, request_trace
+from app.tts import (
+    SynthesisResult,
+    TtsError,
+    audio_etag,
+    cached_synthesis,
+    packed_synthesis,
+    packed_synthesis_by_key,
+    synthesize,
+    synthesize_stream,
+)
+from app.voicepack import clip_id, voice_pack
+from app.warmup import (
+    LANGUAGES,
+    readiness_report,
+    resolve_manifest_path,
+    run_warmup,
+    warmup_report,
+)
 
 app = FastAPI(title="Local Speech Service", version="0.1.0")
 
@@ -27,22 +73,141 @@ class SynthesizeRequest(BaseModel):
     transliteration: str | None = None
 
 
-@app.on_event("startup")
-async def startup_warmup() -> None:
-    async def run_warmup() -> None:
-        try:
-            await asyncio.to_thread(warmup_models_for_language, "zh")
-        except Exception:
-            # Keep service available even if model warmup fails.
-            pass
+class ProfileArmRequest(BaseModel):
+    requests: int = Field(default=0, ge=0, le=1000)
+    fraction: float = Field(default=0.0, ge=0.0, le=1.0)
+
+
+class SynthesizeBatchRequest(BaseModel):
+    items: list[SynthesizeRequest] = Field(
+        min_length=1,
+        max_length=SETTINGS.synthesize_batch_max_items,
+    )
+
+
+_route_paths: set[str] = set()
+
+
+def _route_label(path: str) -> str:
+    # Unknown paths share one label so stray requests can't grow the series.
+    if not _route_paths:
+        _route_paths.update(route.path for route in app.routes)
+    return path if path in _route_paths else "other"
+
+
+# Routes whose callers are rarely waiting on the result.
+_DEFAULT_PRIORITY = {"/synthesize/batch": "prefetch"}
+
+
+def _wants_timings(request: Request) -> bool:
+    flag = request.headers.get("x-speech-timings") or request.query_params.get("timings") or ""
+    return flag.strip().lower() in {"1", "true", "yes", "on"}
+
+
+# Acceptable target forms per attempt; each extra one costs a little matching.
+_MAX_VARIANTS = 32
+
 
+def _target_variants(values: object) -> tuple[str, ...]:
+    if values is None:
+        return ()
+    if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+        raise HTTPException(status_code=400, detail="variants must be a list of strings")
+    if len(values) > _MAX_VARIANTS:
+        raise HTTPException(status_code=400, detail=f"at most {_MAX_VARIANTS} variants are accepted")
+    return tuple(value for value in values if value.strip())
+
+
+def _timings_breakdown() -> dict | None:
+    trace = current_trace()
+    return trace.breakdown() if trace else None
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    route = _route_label(request.url.path)
+    priority = request.headers.get("x-speech-priority", "").strip().lower() or _DEFAULT_PRIORITY.get(
+        route, "interactive"
+    )
+    if not is_priority(priority):
+        return JSONResponse(
+            {"detail": f"X-Speech-Priority must be one of: {', '.join(PRIORITIES)}"},
+            status_code=400,
+        )
+    try:
+        budget_ms = parse_budget_ms(request.headers.get("x-speech-deadline-ms"))
+    except ValueError:
+        return JSONResponse({"detail": "X-Speech-Deadline-Ms must be a positive number"}, status_code=400)
+
+    started = time.perf_counter()
+    status = 500
+    with (
+        IN_FLIGHT.track(route),
+        request_trace(route) as trace,
+        priority_scope(priority),
+        deadline_scope(budget_ms),
+    ):
+        profiling = should_profile(route, request.headers.get("x-speech-profile"))
         try:
-            await asyncio.to_thread(transcriber.warmup, "zh")
-        except Exception:
-            # Keep service available even if model warmup fails.
-            pass
+            async with profile_request(route, trace.id) if profiling else nullcontext() as profile_path:
+                response = await call_next(request)
+            status = response.status_code
+            response.headers["X-Request-Id"] = trace.id
+            if profile_path is not None:
+                response.headers["X-Profile"] = profile_path.name
+            if _wants_timings(request):
+                response.headers["Server-Timing"] = trace.server_timing()
+            return response
+        finally:
+            # Streaming responses are counted (and traced) once headers are sent.
+            trace.status = status
+            REQUEST_SECONDS.observe(time.perf_counter() - started, route, str(status))
+
 
-    asyncio.create_task(run_warmup())
+@app.on_event("startup")
+async def startup_warmup() -> None:
+    # Failures (a malformed manifest included) are recorded per component,
+    # so the service stays available and /ready and /warmup report them.
+    asyncio.create_task(asyncio.to_thread(run_warmup, resolve_manifest_path()))
+
+    async def unload_idle_models() -> None:
+        interval = max(5.0, min(60.0, model_manager.idle_seconds / 4))
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(model_manager.evict_idle)
+
+    if model_manager.idle_seconds > 0:
+        asyncio.create_task(unload_idle_models())
+
+    async def load_overload_model() -> None:
+        # A failed load leaves the small-model tier on the usual model; the
+        # next escalation tries again.
+        with suppress(Exception):
+            await asyncio.to_thread(transcriber.warmup_overload)
+
+    async def track_overload() -> None:
+        interval = max(0.5, min(5.0, overload.recover_seconds / 4))
+        loading: asyncio.Task | None = None
+        while True:
+            await asyncio.sleep(interval)
+            tier = refresh_tier()
+            if (
+                tier >= TIER_NO_FALLBACK
+                and (loading is None or loading.done())
+                and transcriber.needs_overload_model()
+            ):
+                loading = asyncio.create_task(load_overload_model())
+
+    if overload.enabled:
+        asyncio.create_task(track_overload())
+
+
+@app.on_event("shutdown")
+def save_decode_policy() -> None:
+    try:
+        decode_policy.save()
+    except OSError:
+        pass
 
 
 @app.get("/health")
@@ -53,15 +218,152 @@ def health():
 
     return {
         "ok": True,
+        "ready": all(entry["ready"] for entry in readiness_report().values()),
         "whisper_model": SETTINGS.whisper_model,
         "tts_backend": SETTINGS.local_tts_backend,
         "tts_mode": tts_mode,
+        "stub_models": SETTINGS.stub_models,
+        "cpu_budget": cpu_plan.as_dict() if cpu_plan else None,
+        "scheduler": scheduler.status(),
+        "overload": overload.status(),
+        "voice_pack": voice_pack.status() if voice_pack else None,
     }
 
 
+@app.get("/ready")
+def ready(language: str | None = None):
+    if language is not None and language not in {"ar", "zh"}:
+        raise HTTPException(status_code=400, detail="language must be ar or zh")
+
+    report = readiness_report((language,) if language else LANGUAGES)
+    is_ready = all(entry["ready"] for entry in report.values())
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={"ready": is_ready, "languages": report},
+    )
+
+
+@app.get("/models")
+def models_status():
+    return model_manager.report()
+
+
+@app.get("/decode-policy")
+def decode_policy_status():
+    return decode_policy.report()
+
+
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+def _require_admin(token: str | None) -> None:
+    if not SETTINGS.profiler_token:
+        raise HTTPException(status_code=404, detail="profiler disabled; set PROFILER_TOKEN")
+    if not token_matches(token):
+        raise HTTPException(status_code=403, detail="invalid admin token")
+
+
+@app.get("/admin/profile")
+def profile_status(request: Request):
+    _require_admin(request.headers.get("x-admin-token"))
+    return {
+        "remaining": selector.remaining,
+        "fraction": selector.fraction,
+        "profiles": list_profiles(),
+    }
+
+
+@app.post("/admin/profile")
+def arm_profiler(payload: ProfileArmRequest, request: Request):
+    """Profile the next ``requests`` scoring/synthesis requests, then ``fraction`` of them."""
+    _require_admin(request.headers.get("x-admin-token"))
+    selector.arm(payload.requests, payload.fraction)
+    return {"remaining": selector.remaining, "fraction": selector.fraction}
+
+
+@app.get("/warmup")
+def warmup_status():
+    return warmup_report()
+
+
+def _byte_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """Parse a single ``bytes=`` range into inclusive (start, end).
+
+    Returns ``None`` for no header or one this route ignores (other units,
+    multiple ranges); raises ``ValueError`` when the range is unsatisfiable.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if first:
+            start, end = int(first), int(last) if last else size - 1
+        else:
+            start, end = max(0, size - int(last)), size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise ValueError("unsatisfiable range")
+    return start, min(end, size - 1)
+
+
+def _etag_matches(header: str | None, etag: str) -> bool:
+    # If-None-Match uses weak comparison: W/"x" matches "x".
+    if not header:
+        return False
+    candidates = {candidate.strip().removeprefix("W/") for candidate in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def _audio_response(
+    request: Request,
+    body: bytes | memoryview,
+    content_type: str,
+    etag: str,
+    location: str,
+) -> Response:
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={SETTINGS.tts_cache_max_age_seconds}",
+        # Canonical GET address of this clip.
+        "Content-Location": location,
+    }
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    # A Range made against an older version of the clip gets the whole clip.
+    if_range = request.headers.get("if-range")
+    range_header = request.headers.get("range") if if_range in (None, etag) else None
+    try:
+        span = _byte_range(range_header, len(body))
+    except ValueError:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{len(body)}"})
+    if span is None:
+        return Response(content=body, media_type=content_type, headers=headers)
+    start, end = span
+    # Slicing a memoryview keeps voice-pack clips zero-copy into the socket.
+    return Response(
+        content=memoryview(body)[start : end + 1],
+        status_code=206,
+        media_type=content_type,
+        headers={**headers, "Content-Range": f"bytes {start}-{end}/{len(body)}"},
+    )
+
+
 @app.post("/synthesize")
-async def synthesize_route(payload: SynthesizeRequest):
+async def synthesize_route(request: Request, payload: SynthesizeRequest, stream: bool = False):
+    if stream:
+        return await _stream_synthesis(payload)
+
+    location = f"/synthesize/{payload.language}/{clip_id(payload.language, payload.text)}"
     try:
+        clip = packed_synthesis(payload.text, payload.language)
+        if clip is not None:
+            etag = audio_etag(clip.backend, clip.content_type, clip.data)
+            return _audio_response(request, clip.data, clip.content_type, etag, location)
         result = await synthesize(
             payload.text,
             payload.language,
@@ -70,162 +372,358 @@ async def synthesize_route(payload: SynthesizeRequest):
     except TtsError as exc:
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
-    return Response(content=result.audio_bytes, media_type=result.content_type)
+    return _audio_response(request, result.audio_bytes, result.content_type, result.etag, location)
+
 
+@app.get("/synthesize/{language}/{clip}")
+async def synthesize_clip_route(request: Request, language: str, clip: str, text: str | None = None):
+    """Clip addressed by ``clip_id(language, text)``, as in ``Content-Location``.
 
-def _load_audio_for_scoring(path: Path) -> tuple:
+    Voice-pack clips are served from the id alone. Anything else needs
+    ``?text=`` so it can be synthesized; it must hash to the same id.
+    """
+    if language not in {"ar", "zh"}:
+        raise HTTPException(status_code=400, detail="language must be ar or zh")
     try:
-        return librosa.load(str(path), sr=16000, mono=True)
-    except Exception as exc:
-        raise HTTPException(
-            status_code=400,
-            detail="Audio decoding failed. Please retry with a short clear recording.",
-        ) from exc
+        key = bytes.fromhex(clip)
+    except ValueError:
+        key = b""
+    if len(key) != 16:
+        raise HTTPException(status_code=404, detail="unknown clip")
+
+    location = f"/synthesize/{language}/{clip}"
+    try:
+        packed = packed_synthesis_by_key(key, language)
+        if packed is not None:
+            etag = audio_etag(packed.backend, packed.content_type, packed.data)
+            return _audio_response(request, packed.data, packed.content_type, etag, location)
+        if text is None:
+            raise HTTPException(status_code=404, detail="clip is not in the voice pack; pass ?text= to synthesize it")
+        if clip_id(language, text) != clip.lower():
+            raise HTTPException(status_code=400, detail="text does not match the clip id")
+        result = await synthesize(text, language)
+    except TtsError as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
 
+    return _audio_response(request, result.audio_bytes, result.content_type, result.etag, location)
 
-def _boost_quiet_signal(signal: np.ndarray) -> np.ndarray:
-    if signal.size == 0:
-        return signal.astype(np.float32, copy=False)
 
-    signal32 = signal.astype(np.float32, copy=False)
-    peak = float(np.max(np.abs(signal32)))
-    if peak <= 0.0:
-        return signal32
+async def _stream_synthesis(payload: SynthesizeRequest) -> StreamingResponse:
+    chunks = synthesize_stream(payload.text, payload.language)
+    # Produce the first phrase before committing to a 200 so backend failures
+    # still surface as a regular error response.
+    try:
+        first_chunk = await anext(chunks)
+    except TtsError as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
 
-    rms = float(np.sqrt(np.mean(np.square(signal32))))
-    target_peak = 0.92
-    target_rms = 0.10
+    async def body() -> AsyncIterator[bytes]:
+        yield first_chunk
+        try:
+            async for chunk in chunks:
+                yield chunk
+        except TtsError:
+            # Headers are already sent; ending the stream early is the only
+            # signal left, and the truncated clip is never cached.
+            return
+
+    return StreamingResponse(body(), media_type="audio/wav")
+
+
+def _multipart_part(
+    boundary: str,
+    indices: list[int],
+    body: bytes,
+    content_type: str,
+    status: int,
+    cache: str,
+) -> bytes:
+    headers = [
+        f"--{boundary}",
+        f"Content-Type: {content_type}",
+        f"Content-Length: {len(body)}",
+        f"X-Item-Index: {','.join(str(index) for index in indices)}",
+        f"X-Item-Status: {status}",
+        f"X-Cache: {cache}",
+    ]
+    return ("\r\n".join(headers) + "\r\n\r\n").encode("ascii") + body + b"\r\n"
+
+
+@app.post("/synthesize/batch")
+async def synthesize_batch_route(payload: SynthesizeBatchRequest):
+    # Identical (language, text) pairs are synthesized once; their part lists
+    # every request index it answers.
+    groups: dict[tuple[str, str], list[int]] = {}
+    for index, item in enumerate(payload.items):
+        groups.setdefault((item.language, item.text), []).append(index)
 
-    clip_limited_gain = target_peak / peak
-    if rms > 1e-8:
-        loudness_gain = target_rms / rms
-    else:
-        loudness_gain = clip_limited_gain
+    try:
+        cached: dict[tuple[str, str], SynthesisResult | None] = {
+            key: cached_synthesis(text=key[1], language=key[0]) for key in groups
+        }
+    except TtsError as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
 
-    gain = min(clip_limited_gain, max(1.0, loudness_gain), 8.0)
-    if gain <= 1.05:
-        return signal32
+    boundary = uuid.uuid4().hex
+
+    async def stream_parts() -> AsyncIterator[bytes]:
+        # Cache hits go out first so the client can start playback while the
+        # remaining items are still being synthesized.
+        for key, result in cached.items():
+            if result is not None:
+                yield _multipart_part(
+                    boundary,
+                    groups[key],
+                    result.audio_bytes,
+                    result.content_type,
+                    status=200,
+                    cache="hit",
+                )
 
-    return np.clip(signal32 * gain, -0.98, 0.98).astype(np.float32, copy=False)
+        for key, result in cached.items():
+            if result is not None:
+                continue
+            language, text = key
+            try:
+                result = await synthesize(text, language)
+            except TtsError as exc:
+                yield _multipart_part(
+                    boundary,
+                    groups[key],
+                    json.dumps({"detail": str(exc)}).encode("utf-8"),
+                    "application/json",
+                    status=500,
+                    cache="miss",
+                )
+                continue
+
+            yield _multipart_part(
+                boundary,
+                groups[key],
+                result.audio_bytes,
+                result.content_type,
+                status=200,
+                cache="miss",
+            )
 
+        yield f"--{boundary}--\r\n".encode("ascii")
 
-def _write_temp_wav(signal: np.ndarray, sample_rate: int) -> Path:
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-        path = Path(temp_file.name)
-    sf.write(path, signal, sample_rate, subtype="PCM_16")
-    return path
+    return StreamingResponse(
+        stream_parts(),
+        media_type=f"multipart/mixed; boundary={boundary}",
+    )
 
 
-def _convert_audio_to_scoring_wav(path: Path) -> Path:
-    ffmpeg_command = resolve_ffmpeg_command()
-    if not ffmpeg_command:
-        raise HTTPException(
-            status_code=500,
-            detail="`ffmpeg` is required in PATH to decode microphone audio (webm/mp4).",
-        )
+async def _save_upload(audio: UploadFile) -> Path:
+    suffix = Path(audio.filename or "attempt.webm").suffix or ".webm"
 
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as converted_file:
-        converted_path = Path(converted_file.name)
-
-    convert = subprocess.run(
-        [
-            ffmpeg_command,
-            "-y",
-            "-loglevel",
-            "error",
-            "-i",
-            str(path),
-            "-ar",
-            "16000",
-            "-ac",
-            "1",
-            "-c:a",
-            "pcm_s16le",
-            str(converted_path),
-        ],
-        capture_output=True,
-        text=True,
-        check=False,
-    )
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as temp_file:
+        temp_path = Path(temp_file.name)
+        data = await audio.read()
+        temp_file.write(data)
 
-    if convert.returncode != 0 or not converted_path.exists():
-        converted_path.unlink(missing_ok=True)
-        raise HTTPException(
-            status_code=400,
-            detail="Unsupported audio format. Try Chrome/Edge and allow microphone permissions.",
-        )
+    if not data:
+        temp_path.unlink(missing_ok=True)
+        raise HTTPException(status_code=400, detail="empty audio payload")
 
-    return converted_path
+    return temp_path
 
 
 @app.post("/score")
 async def score_route(
+    request: Request,
     audio: UploadFile = File(...),
     language: str = Form(...),
     target_text: str = Form(...),
     transliteration: str | None = Form(default=None),
+    variants: list[str] | None = Form(default=None),
 ):
     if language not in {"ar", "zh"}:
         raise HTTPException(status_code=400, detail="language must be ar or zh")
+    target_variants = _target_variants(variants)
 
-    suffix = Path(audio.filename or "attempt.webm").suffix or ".webm"
+    temp_path = await _save_upload(audio)
+    try:
+        async with scheduler.slot():
+            with scoring_tier() as tier:
+                result = await asyncio.to_thread(
+                    score_audio_file,
+                    temp_path,
+                    language=language,
+                    target_text=target_text,
+                    transliteration=transliteration,
+                    variants=target_variants,
+                )
+        result["tier"] = tier
+    finally:
+        temp_path.unlink(missing_ok=True)
 
-    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as temp_file:
-        temp_path = Path(temp_file.name)
-        data = await audio.read()
-        temp_file.write(data)
+    if _wants_timings(request):
+        result["timings"] = _timings_breakdown()
+    return result
 
-    if not data:
-        temp_path.unlink(missing_ok=True)
-        raise HTTPException(status_code=400, detail="empty audio payload")
 
+def _score_long_file(path: Path, language: str, target_text: str, transliteration: str | None) -> dict:
+    prepared_audio_path = convert_audio_to_scoring_wav(path)
     try:
-        prepared_audio_path = _convert_audio_to_scoring_wav(temp_path)
-        boosted_audio_path: Path | None = None
-        try:
-            signal, sample_rate = _load_audio_for_scoring(prepared_audio_path)
-            boosted_signal = _boost_quiet_signal(signal)
-            signal = boosted_signal
-            boosted_audio_path = _write_temp_wav(boosted_signal, int(sample_rate))
-
-            duration_seconds = len(signal) / sample_rate if sample_rate else 0
-            if duration_seconds > SETTINGS.max_upload_seconds:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"audio too long; max {SETTINGS.max_upload_seconds} seconds",
-                )
+        return score_long_form(
+            prepared_audio_path,
+            language=language,
+            target_text=target_text,
+            transliteration=transliteration,
+        )
+    finally:
+        prepared_audio_path.unlink(missing_ok=True)
 
-            stt = transcriber.transcribe(
-                str(boosted_audio_path),
-                language=language,
-                target_text=target_text,
-                transliteration=transliteration,
-            )
-            transcript = stt.transcript.strip() or ""
-
-            if not transcript:
-                raise HTTPException(status_code=400, detail="no speech recognized")
-
-            result = evaluate_pronunciation(
-                transcript=transcript,
-                target_text=target_text,
-                transliteration=transliteration,
-                language=language,
-                audio=signal,
-                sr=sample_rate,
-                avg_logprob=stt.avg_logprob,
-            )
 
-            return {
-                "transcript": result.transcript,
-                "score": result.score,
-                "feedback": result.feedback,
-                "confidence": result.confidence,
-                "components": result.components,
-            }
-        finally:
-            if boosted_audio_path is not None:
-                boosted_audio_path.unlink(missing_ok=True)
-            prepared_audio_path.unlink(missing_ok=True)
+@app.post("/score/long")
+async def score_long_route(
+    request: Request,
+    audio: UploadFile = File(...),
+    language: str = Form(...),
+    target_text: str = Form(...),
+    transliteration: str | None = Form(default=None),
+):
+    if language not in {"ar", "zh"}:
+        raise HTTPException(status_code=400, detail="language must be ar or zh")
+
+    temp_path = await _save_upload(audio)
+    try:
+        async with scheduler.slot():
+            with scoring_tier() as tier:
+                result = await asyncio.to_thread(
+                    _score_long_file,
+                    temp_path,
+                    language=language,
+                    target_text=target_text,
+                    transliteration=transliteration,
+                )
+        result["tier"] = tier
     finally:
         temp_path.unlink(missing_ok=True)
+
+    if _wants_timings(request):
+        result["timings"] = _timings_breakdown()
+    return result
+
+
+async def _send_partial_transcript(websocket: WebSocket, audio: np.ndarray, language: str) -> None:
+    try:
+        # Partials are best-effort and must never delay a final score.
+        async with scheduler.slot("prefetch"):
+            decode = asyncio.ensure_future(asyncio.to_thread(transcriber.transcribe_partial, audio, language))
+            try:
+                partial = await asyncio.shield(decode)
+            except asyncio.CancelledError:
+                # The thread cannot be stopped: keep the slot until it
+                # finishes, so the final score never runs beside it uncounted.
+                await asyncio.wait({decode})
+                raise
+        await websocket.send_json({"event": "partial", "transcript": partial.transcript})
+    except Exception:
+        # Live transcripts are best-effort; the final decode is authoritative.
+        pass
+
+
+@app.websocket("/score/stream")
+async def score_stream_route(websocket: WebSocket):
+    """Score an attempt while it is being spoken.
+
+    Protocol: the client sends a JSON config message (``language``,
+    ``target_text``, optional ``transliteration``, ``variants`` (other
+    acceptable target forms), ``timings`` and ``deadline_ms``, the budget for
+    the final score counted from end of speech), then binary frames of
+    16 kHz mono PCM s16le, and optionally ``{"event": "end"}``. The server
+    replies with ``partial`` transcripts, ``speech_end`` when VAD detects
+    trailing silence, and finally ``result`` (same fields as ``/score``) or
+    ``error``.
+    """
+    await websocket.accept()
+    partial_task: asyncio.Task | None = None
+
+    try:
+        config = await websocket.receive_json()
+        if not isinstance(config, dict):
+            raise HTTPException(status_code=400, detail="first message must be a JSON config object")
+        language = config.get("language")
+        target_text = config.get("target_text")
+        transliteration = config.get("transliteration")
+        variants = _target_variants(config.get("variants"))
+        if language not in {"ar", "zh"}:
+            raise HTTPException(status_code=400, detail="language must be ar or zh")
+        if not isinstance(target_text, str) or not target_text.strip():
+            raise HTTPException(status_code=400, detail="target_text is required")
+        if int(config.get("sample_rate", 16000)) != 16000:
+            raise HTTPException(status_code=400, detail="sample_rate must be 16000 (PCM s16le mono)")
+
+        extractor = StreamingFeatureExtractor(language=language)
+        await websocket.send_json({"event": "ready"})
+        last_partial_seconds = 0.0
+
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+
+            if message.get("bytes"):
+                await asyncio.to_thread(extractor.push, pcm16_to_float(message["bytes"]))
+                if extractor.end_of_speech:
+                    await websocket.send_json({"event": "speech_end"})
+                    break
+
+                elapsed = extractor.duration_seconds - last_partial_seconds
+                if (partial_task is None or partial_task.done()) and (
+                    elapsed >= SETTINGS.stream_partial_interval_seconds
+                ):
+                    last_partial_seconds = extractor.duration_seconds
+                    partial_task = asyncio.create_task(
+                        _send_partial_transcript(websocket, extractor.audio.copy(), language)
+                    )
+            elif message.get("text"):
+                try:
+                    event = json.loads(message["text"]).get("event")
+                except (ValueError, AttributeError):
+                    event = None
+                if event == "end":
+                    break
+
+        if partial_task is not None:
+            partial_task.cancel()
+        if extractor.duration_seconds == 0:
+            raise HTTPException(status_code=400, detail="empty audio payload")
+
+        try:
+            budget_ms = parse_budget_ms(str(config.get("deadline_ms") or ""))
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail="deadline_ms must be a positive number") from exc
+
+        with request_trace("/score/stream") as trace, deadline_scope(budget_ms):
+            features = await asyncio.to_thread(extractor.finalize)
+            async with scheduler.slot("interactive"):
+                with scoring_tier() as tier:
+                    result = await asyncio.to_thread(
+                        score_signal,
+                        extractor.audio,
+                        extractor.sr,
+                        language,
+                        target_text,
+                        transliteration,
+                        features,
+                        variants,
+                    )
+            result["tier"] = tier
+            trace.status = 200
+            if config.get("timings"):
+                result["timings"] = trace.breakdown()
+        await websocket.send_json({"event": "result", **result})
+    except WebSocketDisconnect:
+        return
+    except HTTPException as exc:
+        await websocket.send_json({"event": "error", "status": exc.status_code, "detail": exc.detail})
+    except ValueError as exc:
+        await websocket.send_json({"event": "error", "status": 400, "detail": str(exc)})
+    finally:
+        if partial_task is not None:
+            partial_task.cancel()
+
+    await websocket.close()
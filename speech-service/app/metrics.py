@@ -0,0 +1,319 @@
+"""Process-local Prometheus metrics, rendered in the text exposition format.
+
+Recording is a dict lookup plus a short lock per observation, cheap enough
+to wrap every pipeline stage. Values live in this process only; with
+several uvicorn workers, scrape each worker separately.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from threading import Lock
+from typing import TypeVar
+
+from app.tracing import record_span
+
+# Seconds; spans ffmpeg/feature stages (ms) up to slow CPU fallback decodes.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = tuple[str, ...]
+MetricT = TypeVar("MetricT", bound="_Metric")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock()
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        return [*self._header(), *self.samples()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in items
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    @contextmanager
+    def track(self, *labels: str) -> Iterator[None]:
+        """Count the block as in progress while it runs."""
+        self.inc(*labels)
+        try:
+            yield
+        finally:
+            self.dec(*labels)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in items
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Iterable[str] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts..., +Inf count, sum]
+        self._values: dict[LabelValues, list[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            slots = self._values.get(labels)
+            if slots is None:
+                slots = self._values[labels] = [0.0] * (len(self.buckets) + 2)
+            slots[index] += 1
+            slots[-1] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((labels, list(slots)) for labels, slots in self._values.items())
+
+        lines: list[str] = []
+        for labels, slots in items:
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, math.inf), slots):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {_format_value(cumulative)}"
+                )
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(slots[-1])}")
+            lines.append(f"{self.name}_count{label_text} {_format_value(cumulative)}")
+        return lines
+
+
+class Collected(_Metric):
+    """A metric whose samples are read from *collect* at scrape time."""
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        kind: str,
+        labelnames: Iterable[str],
+        collect: Callable[[], dict[LabelValues, float]],
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.kind = kind
+        self._collect = collect
+
+    def samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in sorted(self._collect().items())
+        ]
+
+
+_registry: list[_Metric] = []
+
+
+def _register(metric: MetricT) -> MetricT:
+    _registry.append(metric)
+    return metric
+
+
+def render() -> str:
+    lines: list[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def register_collected(
+    name: str,
+    help_text: str,
+    kind: str,
+    labelnames: Iterable[str],
+    collect: Callable[[], dict[LabelValues, float]],
+) -> None:
+    _register(Collected(name, help_text, kind, labelnames, collect))
+
+
+STAGE_SECONDS = _register(
+    Histogram(
+        "speech_stage_seconds",
+        "Latency of individual pipeline stages.",
+        ("stage", "language"),
+    )
+)
+REQUEST_SECONDS = _register(
+    Histogram(
+        "speech_request_seconds",
+        "End-to-end HTTP request latency.",
+        ("route", "status"),
+    )
+)
+IN_FLIGHT = _register(
+    Gauge(
+        "speech_requests_in_flight",
+        "Requests accepted and not yet answered (queue depth), per route.",
+        ("route",),
+    )
+)
+DECODE_WINNER = _register(
+    Counter(
+        "speech_decode_winner_total",
+        "Whisper pass whose transcript was used for scoring.",
+        ("language", "pass"),
+    )
+)
+TTS_BACKEND = _register(
+    Counter(
+        "speech_tts_backend_total",
+        "TTS backend attempts by outcome.",
+        ("backend", "language", "outcome"),
+    )
+)
+TTS_CACHE = _register(
+    Counter(
+        "speech_tts_cache_total",
+        "Synthesis cache lookups by result (pack, hit or miss).",
+        ("language", "result"),
+    )
+)
+DEADLINE_DEGRADED = _register(
+    Counter(
+        "speech_deadline_degraded_total",
+        "Whisper passes skipped or run greedy to meet a request deadline.",
+        ("language", "pass", "action"),
+    )
+)
+SPECULATIVE_FALLBACK = _register(
+    Counter(
+        "speech_whisper_speculative_total",
+        "Fallback passes started alongside the primary, by reason and outcome: used, cancelled "
+        "(stopped between segments) or wasted (called off but ran to the end).",
+        ("language", "reason", "outcome"),
+    )
+)
+ROUTER_REQUESTS = _register(
+    Counter(
+        "speech_router_requests_total",
+        "Requests proxied by the router, by instance, routing mode and outcome.",
+        ("backend", "mode", "outcome"),
+    )
+)
+QUEUE_WAIT = _register(
+    Histogram(
+        "speech_queue_wait_seconds",
+        "Time model work waited for a scheduler slot, per priority class.",
+        ("priority",),
+    )
+)
+SCHEDULER_PAUSES = _register(
+    Counter(
+        "speech_scheduler_pauses_total",
+        "Times lower-priority work was paused because interactive work waited too long.",
+    )
+)
+OVERLOAD_TRANSITIONS = _register(
+    Counter(
+        "speech_overload_transitions_total",
+        "Overload quality tier changes, by tier entered and direction (down or up).",
+        ("tier", "direction"),
+    )
+)
+
+
+@contextmanager
+def time_stage(stage: str, language: str | None, **attrs: object) -> Iterator[None]:
+    """Record one stage into ``speech_stage_seconds`` and the request trace.
+
+    *attrs* (e.g. beam settings) are only kept on the trace span; they are
+    not metric labels.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        STAGE_SECONDS.observe(seconds, stage, language or "unknown")
+        record_span(stage, language, started, seconds, attrs)
@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import ctypes
+import gc
+import os
+import sys
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Any
+
+from app.config import SETTINGS
+from app.metrics import register_collected
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _release_freed_memory() -> None:
+    gc.collect()
+    if sys.platform.startswith("linux"):
+        # glibc keeps freed arenas mapped; malloc_trim hands them back so the
+        # unload is visible in RSS.
+        try:
+            ctypes.CDLL("libc.so.6").malloc_trim(0)
+        except (OSError, AttributeError):
+            pass
+
+
+def torch_module_bytes(*modules: Any) -> int:
+    """Parameter + buffer bytes of torch modules (more precise than RSS deltas)."""
+    total = 0
+    for module in modules:
+        for tensor in [*module.parameters(), *module.buffers()]:
+            total += tensor.numel() * tensor.element_size()
+    return total
+
+
+@dataclass
+class _ModelEntry:
+    name: str
+    loader: Callable[[], Any]
+    size_of: Callable[[Any], int] | None
+    model: Any = None
+    size_bytes: int = 0
+    last_used: float = 0.0
+    in_use: int = 0
+    loads: int = 0
+    unloads: int = 0
+    load_seconds: float = 0.0
+    lock: Lock = field(default_factory=Lock)
+
+
+class ModelManager:
+    """Loads models on demand and unloads them under a RAM budget.
+
+    Callers hold a model through :meth:`use`; a model is never unloaded while
+    in use. Models idle longer than ``idle_seconds`` are unloaded by
+    :meth:`evict_idle`, and least-recently-used models are unloaded when a
+    load pushes the total over ``budget_bytes``.
+    """
+
+    def __init__(self, budget_bytes: int, idle_seconds: float) -> None:
+        self.budget_bytes = budget_bytes
+        self.idle_seconds = idle_seconds
+        self._entries: dict[str, _ModelEntry] = {}
+        self._lock = Lock()
+        self.events: deque[dict] = deque(maxlen=100)
+
+    def register(
+        self,
+        name: str,
+        loader: Callable[[], Any],
+        size_of: Callable[[Any], int] | None = None,
+    ) -> None:
+        with self._lock:
+            if name not in self._entries:
+                self._entries[name] = _ModelEntry(name=name, loader=loader, size_of=size_of)
+
+    def _entry(self, name: str) -> _ModelEntry:
+        entry = self._entries.get(name)
+        if entry is None:
+            raise KeyError(f"Model '{name}' is not registered.")
+        return entry
+
+    def is_loaded(self, name: str) -> bool:
+        entry = self._entries.get(name)
+        return entry is not None and entry.model is not None
+
+    def has_loaded(self, name: str) -> bool:
+        """True once *name* loaded successfully, even if it was unloaded since."""
+        entry = self._entries.get(name)
+        return entry is not None and entry.loads > 0
+
+    def _load(self, entry: _ModelEntry) -> Any:
+        with entry.lock:
+            if entry.model is not None:
+                return entry.model
+
+            rss_before = _rss_bytes()
+            started = time.perf_counter()
+            model = entry.loader()
+            entry.load_seconds = round(time.perf_counter() - started, 3)
+            size = entry.size_of(model) if entry.size_of else 0
+            entry.size_bytes = size or max(0, _rss_bytes() - rss_before)
+            entry.model = model
+            entry.loads += 1
+            entry.last_used = time.monotonic()
+            self._record("load", entry)
+
+        self._enforce_budget(keep=entry.name)
+        return model
+
+    def get(self, name: str) -> Any:
+        """Load *name* if needed and return it without pinning it."""
+        entry = self._entry(name)
+        model = entry.model
+        if model is None:
+            model = self._load(entry)
+        entry.last_used = time.monotonic()
+        return model
+
+    @contextmanager
+    def use(self, name: str) -> Iterator[Any]:
+        entry = self._entry(name)
+        with self._lock:
+            entry.in_use += 1
+        try:
+            model = entry.model
+            if model is None:
+                model = self._load(entry)
+            entry.last_used = time.monotonic()
+            yield model
+        finally:
+            with self._lock:
+                entry.in_use -= 1
+                entry.last_used = time.monotonic()
+
+    def unload(self, name: str, reason: str = "manual") -> bool:
+        entry = self._entry(name)
+        with self._lock:
+            if entry.model is None or entry.in_use:
+                return False
+            entry.model = None
+            entry.unloads += 1
+            self._record("unload", entry, reason=reason)
+            entry.size_bytes = 0
+        _release_freed_memory()
+        return True
+
+    def unload_all(self, reason: str = "manual") -> list[str]:
+        """Unload every model not in use; returns the names unloaded."""
+        loaded = [entry.name for entry in list(self._entries.values()) if entry.model is not None]
+        return [name for name in loaded if self.unload(name, reason=reason)]
+
+    def evict_idle(self) -> list[str]:
+        # Loads that went over budget while other models were pinned are
+        # settled here once those models are released.
+        self._enforce_budget(keep="")
+        if self.idle_seconds <= 0:
+            return []
+        cutoff = time.monotonic() - self.idle_seconds
+        idle = [
+            entry.name
+            for entry in list(self._entries.values())
+            if entry.model is not None and not entry.in_use and entry.last_used < cutoff
+        ]
+        return [name for name in idle if self.unload(name, reason="idle")]
+
+    def _enforce_budget(self, keep: str) -> None:
+        if self.budget_bytes <= 0:
+            return
+        while self.loaded_bytes() > self.budget_bytes:
+            candidates = sorted(
+                (
+                    entry
+                    for entry in self._entries.values()
+                    if entry.model is not None and not entry.in_use and entry.name != keep
+                ),
+                key=lambda entry: entry.last_used,
+            )
+            if not candidates or not self.unload(candidates[0].name, reason="budget"):
+                # Everything else is in use; run over budget rather than fail.
+                return
+
+    def stat(self, field_name: str) -> dict[tuple[str, ...], float]:
+        """One numeric ``_ModelEntry`` field per model, keyed for metric labels."""
+        return {(entry.name,): float(getattr(entry, field_name)) for entry in list(self._entries.values())}
+
+    def loaded_bytes(self) -> int:
+        return sum(entry.size_bytes for entry in self._entries.values() if entry.model is not None)
+
+    def _record(self, event: str, entry: _ModelEntry, reason: str | None = None) -> None:
+        self.events.append(
+            {
+                "event": event,
+                "model": entry.name,
+                "reason": reason,
+                "size_bytes": entry.size_bytes,
+                "load_seconds": entry.load_seconds if event == "load" else None,
+                "at": round(time.time(), 3),
+            }
+        )
+
+    def report(self) -> dict:
+        now = time.monotonic()
+        return {
+            "budget_bytes": self.budget_bytes,
+            "idle_unload_seconds": self.idle_seconds,
+            "loaded_bytes": self.loaded_bytes(),
+            "models": {
+                entry.name: {
+                    "loaded": entry.model is not None,
+                    "size_bytes": entry.size_bytes,
+                    "in_use": entry.in_use,
+                    "idle_seconds": round(now - entry.last_used, 1) if entry.loads else None,
+                    "loads": entry.loads,
+                    "unloads": entry.unloads,
+                    "load_seconds": entry.load_seconds,
+                }
+                for entry in list(self._entries.values())
+            },
+            "events": list(self.events),
+        }
+
+
+model_manager = ModelManager(
+    budget_bytes=int(SETTINGS.model_memory_budget_mb * 1024 * 1024),
+    idle_seconds=SETTINGS.model_idle_unload_seconds,
+)
+
+register_collected(
+    "speech_model_bytes",
+    "Memory attributed to each model (0 when unloaded).",
+    "gauge",
+    ("model",),
+    lambda: model_manager.stat("size_bytes"),
+)
+register_collected(
+    "speech_model_loads_total",
+    "Model loads, including reloads after an unload.",
+    "counter",
+    ("model",),
+    lambda: model_manager.stat("loads"),
+)
+register_collected(
+    "speech_model_unloads_total",
+    "Model unloads (idle, budget or manual).",
+    "counter",
+    ("model",),
+    lambda: model_manager.stat("unloads"),
+)
@@ -0,0 +1,163 @@
+"""Quality tiers for scoring under overload.
+
+When a whole class submits at once, queue wait dwarfs decode time. The
+controller watches the interactive queue depth and the recent interactive
+queue wait. As either crosses the next tier's threshold, it steps scoring
+down one tier at a time:
+
+====  ===============  ==================================================
+tier  name             change (cumulative)
+====  ===============  ==================================================
+0     ``full``         normal scoring
+1     ``no-fallback``  Whisper fallback and rescue passes disabled
+2     ``greedy``       primary pass decodes with beam 1 / best_of 1
+3     ``small-model``  Arabic decodes with ``WHISPER_MODEL_OVERLOAD``
+4     ``pitch-proxy``  YIN pitch on loud frames instead of pYIN tones
+====  ===============  ==================================================
+
+The ``small-model`` tier's model is loaded in the background on the first
+step down from ``full``, two tiers before it is needed, so instances that are
+never overloaded never hold it. Until it is resident (the load failed, or it
+was unloaded as idle), Arabic keeps its usual model at that tier rather than
+cold-loading a second model on a request.
+
+It steps back up one tier for each ``OVERLOAD_RECOVER_SECONDS`` that both
+signals stay below ``OVERLOAD_RECOVER_FRACTION`` of the current tier's
+thresholds. That hysteresis stops it flapping at a boundary. The service
+re-evaluates the tier on a timer as well as when scoring starts, so it
+recovers during a quiet spell rather than on the next requests. The tier
+follows scoring work into worker threads through a context variable.
+"""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+
+from app.config import SETTINGS
+from app.metrics import OVERLOAD_TRANSITIONS, register_collected
+from app.scheduler import scheduler
+
+TIERS = ("full", "no-fallback", "greedy", "small-model", "pitch-proxy")
+TIER_NO_FALLBACK = 1
+TIER_GREEDY = 2
+TIER_SMALL_MODEL = 3
+TIER_PITCH_PROXY = 4
+
+_tier: ContextVar[int] = ContextVar("speech_overload_tier", default=0)
+
+
+def current_tier() -> int:
+    return _tier.get()
+
+
+def _thresholds(values: tuple[str, ...]) -> tuple[float, ...]:
+    parsed = tuple(float(value) for value in values)
+    if len(parsed) != len(TIERS) - 1:
+        raise ValueError(f"overload thresholds need {len(TIERS) - 1} values, one per degraded tier")
+    return parsed
+
+
+class OverloadController:
+    def __init__(
+        self,
+        queue_depths: tuple[float, ...],
+        wait_seconds: tuple[float, ...],
+        recover_seconds: float,
+        recover_fraction: float,
+        enabled: bool = True,
+    ) -> None:
+        self.queue_depths = queue_depths
+        self.wait_seconds = wait_seconds
+        self.recover_seconds = recover_seconds
+        self.recover_fraction = recover_fraction
+        self.enabled = enabled
+        self.tier = 0
+        self._calm_since: float | None = None
+        self._lock = Lock()
+
+    def _pressure_tier(self, depth: float, wait: float, fraction: float = 1.0) -> int:
+        """Highest tier whose depth or wait threshold (scaled by *fraction*) is reached."""
+        tier = 0
+        for index, (max_depth, max_wait) in enumerate(zip(self.queue_depths, self.wait_seconds), start=1):
+            if depth >= max_depth * fraction or wait >= max_wait * fraction:
+                tier = index
+        return tier
+
+    def update(self, depth: float, wait: float, now: float | None = None) -> int:
+        """Step toward the tier the load calls for; returns the current tier."""
+        if not self.enabled:
+            return 0
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._pressure_tier(depth, wait) > self.tier:
+                self.tier += 1
+                self._calm_since = None
+                OVERLOAD_TRANSITIONS.inc(TIERS[self.tier], "down")
+            elif self.tier > 0 and self._pressure_tier(depth, wait, self.recover_fraction) < self.tier:
+                if self._calm_since is None:
+                    self._calm_since = now
+                # One tier per full recovery period of calm, however long
+                # ago the last update was.
+                while (
+                    self.tier > 0
+                    and now - self._calm_since >= self.recover_seconds
+                    and self._pressure_tier(depth, wait, self.recover_fraction) < self.tier
+                ):
+                    self.tier -= 1
+                    self._calm_since += self.recover_seconds
+                    OVERLOAD_TRANSITIONS.inc(TIERS[self.tier], "up")
+            else:
+                self._calm_since = None
+            return self.tier
+
+    def status(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "tier": self.tier,
+            "name": TIERS[self.tier],
+            "queue_depths": list(self.queue_depths),
+            "wait_seconds": list(self.wait_seconds),
+        }
+
+
+overload = OverloadController(
+    queue_depths=_thresholds(SETTINGS.overload_queue_depths),
+    wait_seconds=tuple(ms / 1000 for ms in _thresholds(SETTINGS.overload_wait_ms)),
+    recover_seconds=SETTINGS.overload_recover_seconds,
+    recover_fraction=SETTINGS.overload_recover_fraction,
+    enabled=SETTINGS.overload_enabled,
+)
+
+
+def refresh_tier() -> int:
+    """Re-evaluate the tier with no request in flight; run periodically.
+
+    Without it the tier only moves when scoring starts, so the first learners
+    after a burst would still be scored at the burst's tier.
+    """
+    scheduler.decay_idle_wait()
+    return overload.update(scheduler.waiting("interactive"), scheduler.recent_interactive_wait)
+
+
+@contextmanager
+def scoring_tier() -> Iterator[str]:
+    """Pick the tier for one scoring run from current load; yields its name."""
+    tier = overload.update(scheduler.waiting("interactive"), scheduler.recent_interactive_wait)
+    token = _tier.set(tier)
+    try:
+        yield TIERS[tier]
+    finally:
+        _tier.reset(token)
+
+
+register_collected(
+    "speech_overload_tier",
+    "Current scoring quality tier (0 = full quality).",
+    "gauge",
+    (),
+    lambda: {(): float(overload.tier)},
+)
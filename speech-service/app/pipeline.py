@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+from fastapi import HTTPException
+
+from app.audio import (
+    boost_quiet_signal,
+    convert_audio_to_scoring_wav,
+    load_audio_for_scoring,
+    write_temp_wav,
+)
+from app.config import SETTINGS
+from app.cpu import pinned
+from app.deadline import expired
+from app.metrics import time_stage
+from app.overload import TIER_PITCH_PROXY, current_tier
+from app.scoring import AudioFeatures, evaluate_pronunciation
+from app.stt import transcriber
+
+
+def score_signal(
+    signal: np.ndarray,
+    sample_rate: int,
+    language: str,
+    target_text: str,
+    transliteration: str | None,
+    features: AudioFeatures | None = None,
+    variants: tuple[str, ...] = (),
+) -> dict:
+    if expired():
+        # The client has given up; transcribing now would be wasted work.
+        raise HTTPException(status_code=504, detail="deadline exceeded before transcription")
+
+    with time_stage("boost", language):
+        boosted_signal = boost_quiet_signal(signal)
+        boosted_audio_path = write_temp_wav(boosted_signal, int(sample_rate))
+    try:
+        stt = transcriber.transcribe(
+            str(boosted_audio_path),
+            language=language,
+            target_text=target_text,
+            transliteration=transliteration,
+            variants=variants,
+        )
+        transcript = stt.transcript.strip() or ""
+
+        if not transcript:
+            raise HTTPException(status_code=400, detail="no speech recognized")
+
+        with pinned("scoring"):
+            result = evaluate_pronunciation(
+                transcript=transcript,
+                target_text=target_text,
+                transliteration=transliteration,
+                language=language,
+                audio=boosted_signal,
+                sr=sample_rate,
+                avg_logprob=stt.avg_logprob,
+                features=features,
+                pitch_proxy=current_tier() >= TIER_PITCH_PROXY,
+                variants=variants,
+            )
+
+        return {
+            "transcript": result.transcript,
+            "score": result.score,
+            "feedback": result.feedback,
+            "confidence": result.confidence,
+            "components": result.components,
+            "matched_variant": result.matched_variant,
+            "degraded": bool(stt.degraded),
+            **({"degradations": list(stt.degraded)} if stt.degraded else {}),
+        }
+    finally:
+        boosted_audio_path.unlink(missing_ok=True)
+
+
+def score_audio_file(
+    path: Path,
+    language: str,
+    target_text: str,
+    transliteration: str | None,
+    variants: tuple[str, ...] = (),
+) -> dict:
+    """Run the full ``/score`` pipeline on an audio file in any ffmpeg-readable format."""
+    with time_stage("ffmpeg", language):
+        prepared_audio_path = convert_audio_to_scoring_wav(path)
+    try:
+        with time_stage("load", language):
+            signal, sample_rate = load_audio_for_scoring(prepared_audio_path)
+
+        duration_seconds = len(signal) / sample_rate if sample_rate else 0
+        if duration_seconds > SETTINGS.max_upload_seconds:
+            raise HTTPException(
+                status_code=400,
+                detail=f"audio too long; max {SETTINGS.max_upload_seconds} seconds",
+            )
+
+        return score_signal(
+            signal,
+            int(sample_rate),
+            language=language,
+            target_text=target_text,
+            transliteration=transliteration,
+            variants=variants,
+        )
+    finally:
+        prepared_audio_path.unlink(missing_ok=True)
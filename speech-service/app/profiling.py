@@ -0,0 +1,155 @@
+"""Opt-in statistical profiler, triggered by individual production requests.
+
+While a selected request runs, a sampler thread snapshots every thread's
+Python stack (``sys._current_frames``) at a fixed interval and writes the
+counts as collapsed stacks (``frame;frame;frame count``), the input format
+of flamegraph.pl and speedscope. Nothing runs unless a request is selected,
+so the hook costs nothing in normal operation.
+
+Profiles are process-wide: Python cannot tell which worker thread is doing
+which request's work, so under concurrent load a profile also holds other
+requests' stacks. Every stack is rooted at ``process`` and its thread name.
+For a clean per-request picture, profile an otherwise idle instance.
+
+Requests are selected by ``X-Speech-Profile: <PROFILER_TOKEN>`` on the
+request itself, or by arming ``POST /admin/profile`` for the next N
+requests or a sampled fraction of them.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+from types import FrameType
+
+from app.config import SETTINGS
+
+PROFILED_ROUTES = frozenset({"/score", "/score/long", "/synthesize"})
+_SERVICE_DIR = Path(__file__).resolve().parents[1]
+
+
+def token_matches(candidate: str | None) -> bool:
+    if not SETTINGS.profiler_token or not candidate:
+        return False
+    return secrets.compare_digest(candidate, SETTINGS.profiler_token)
+
+
+def profile_dir() -> Path:
+    path = Path(SETTINGS.profile_dir)
+    return path if path.is_absolute() else _SERVICE_DIR / path
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    # Last two path components keep labels short but unambiguous
+    # (app/stt.py vs faster_whisper/transcribe.py).
+    location = "/".join(Path(code.co_filename).parts[-2:])
+    return f"{code.co_name} ({location}:{code.co_firstlineno})"
+
+
+class _Sampler:
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                labels: list[str] = []
+                current: FrameType | None = frame
+                while current is not None:
+                    labels.append(_frame_label(current))
+                    current = current.f_back
+                if thread_id not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                labels.append(f"thread:{names.get(thread_id, thread_id)}")
+                labels.append("process")
+                self.stacks[";".join(reversed(labels))] += 1
+            self.samples += 1
+
+
+class _ProfileSelector:
+    """Decides which requests get profiled when no header token is sent."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.remaining = 0
+        self.fraction = 0.0
+
+    def arm(self, requests: int, fraction: float) -> None:
+        with self._lock:
+            self.remaining = max(0, requests)
+            self.fraction = min(1.0, max(0.0, fraction))
+
+    def take(self) -> bool:
+        with self._lock:
+            if self.remaining > 0:
+                self.remaining -= 1
+                return True
+            return self.fraction > 0.0 and random.random() < self.fraction
+
+
+selector = _ProfileSelector()
+
+
+def should_profile(route: str, header_token: str | None) -> bool:
+    if not SETTINGS.profiler_token or route not in PROFILED_ROUTES:
+        return False
+    return token_matches(header_token) or selector.take()
+
+
+def _finish(sampler: _Sampler, out_path: Path) -> None:
+    sampler.stop()
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with out_path.open("w", encoding="utf-8") as out_file:
+        for stack, count in sampler.stacks.most_common():
+            out_file.write(f"{stack} {count}\n")
+
+
+@asynccontextmanager
+async def profile_request(route: str, request_id: str) -> AsyncIterator[Path]:
+    """Sample every thread's stacks for the duration of the block.
+
+    Yields the output path. The file is written when the block exits, on a
+    worker thread, so joining the sampler never blocks the event loop.
+    """
+    name = f"{time.strftime('%Y%m%dT%H%M%S')}-{route.strip('/').replace('/', '_')}-{request_id}.folded"
+    out_path = profile_dir() / name
+
+    sampler = _Sampler(interval=SETTINGS.profile_interval_ms / 1000)
+    sampler.start()
+    try:
+        yield out_path
+    finally:
+        await asyncio.to_thread(_finish, sampler, out_path)
+
+
+def list_profiles(limit: int = 50) -> list[dict]:
+    directory = profile_dir()
+    if not directory.exists():
+        return []
+    files = sorted(directory.glob("*.folded"), key=os.path.getmtime, reverse=True)[:limit]
+    return [{"file": path.name, "bytes": path.stat().st_size} for path in files]
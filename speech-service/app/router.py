@@ -0,0 +1,478 @@
+"""Router for several speech-service instances behind one address.
+
+Run from ``speech-service/``::
+
+    ROUTER_BACKENDS=http://127.0.0.1:8001,http://127.0.0.1:8002 uvicorn app.router:app --port 8000
+
+    # or start three stub-model instances on free ports and route to them
+    python -m app.router --spawn 3 --stub --port 8000
+
+Routing:
+
+* ``/score`` and ``/score/long`` go to the least-loaded instance that can
+  score the request's language. Load is the requests the router has in flight to it plus the active
+  and queued scheduler work from its last ``/health``.
+* ``POST /synthesize`` and ``GET /synthesize/{language}/{clip}`` use
+  consistent hashing on the clip id (language + text, see
+  :func:`app.voicepack.clip_id`), so each phrase stays hot in one instance's
+  synthesis cache. When an instance leaves or joins, only its share of
+  phrases moves. An owner that cannot synthesize the language hands the
+  phrase to the next instance on the ring.
+* Everything else goes to the least-loaded instance.
+
+Every ``ROUTER_HEALTH_INTERVAL_SECONDS`` the router polls each instance's
+``/ready`` and ``/health``. The per-language ``/ready`` report says what the
+instance can serve, whatever its overall status: it can score a language
+once ffmpeg and that language's Whisper model are ready, and synthesize it
+once any of its TTS backends is. An instance that can serve nothing yet
+(still loading models) stays out of rotation; ``/health`` supplies the load.
+After ``ROUTER_UNHEALTHY_AFTER`` consecutive failures the instance leaves
+rotation. A refused connection while proxying removes it at
+once. It rejoins on the next successful poll. A request whose connection is
+refused is retried on the next instance; one that reached an instance is
+never retried. The ``/score/stream`` WebSocket is not proxied: stream
+clients connect to an instance directly.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import bisect
+import hashlib
+import itertools
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+
+import httpx
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+
+from app.config import SETTINGS
+from app.metrics import ROUTER_REQUESTS, register_collected
+from app.metrics import render as render_metrics
+from app.voicepack import clip_id
+
+_SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_HOP_BY_HOP = frozenset(
+    {
+        "connection",
+        "keep-alive",
+        "proxy-authenticate",
+        "proxy-authorization",
+        "te",
+        "trailer",
+        "transfer-encoding",
+        "upgrade",
+    }
+)
+_CLIP_PATH = re.compile(r"^/synthesize/(ar|zh)/([0-9a-fA-F]{32})$")
+_LOAD_BALANCED = {"/score", "/score/long"}
+# The language field of a multipart /score upload.
+_FORM_LANGUAGE = re.compile(rb'name="language"[^\r\n]*\r\n(?:[^\r\n]+\r\n)*\r\n(ar|zh)\r\n')
+
+
+def _point(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent-hash ring with *virtual_nodes* points per node."""
+
+    def __init__(self, nodes: list[str], virtual_nodes: int) -> None:
+        points = sorted((_point(f"{node}#{index}"), node) for node in nodes for index in range(virtual_nodes))
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+        self._distinct = len(set(nodes))
+
+    def nodes_for(self, key: str) -> Iterator[str]:
+        """Distinct nodes clockwise from *key*: its owner first, then the fallbacks."""
+        if not self._nodes:
+            return
+        start = bisect.bisect(self._hashes, _point(key))
+        seen: set[str] = set()
+        for offset in range(len(self._nodes)):
+            node = self._nodes[(start + offset) % len(self._nodes)]
+            if node not in seen:
+                seen.add(node)
+                yield node
+                if len(seen) == self._distinct:
+                    return
+
+
+@dataclass
+class Backend:
+    url: str
+    healthy: bool = False
+    failures: int = 0
+    in_flight: int = 0
+    # Active + queued scheduler work at the last health poll.
+    queued: int = 0
+    # What it can serve at the last poll, e.g. {"score:ar", "synthesize:zh"}.
+    capabilities: frozenset[str] = frozenset()
+    last_error: str | None = None
+
+    def load(self) -> int:
+        return self.in_flight + self.queued
+
+    def status(self) -> dict:
+        return {
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "capabilities": sorted(self.capabilities),
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+class Router:
+    def __init__(
+        self,
+        urls: tuple[str, ...],
+        virtual_nodes: int,
+        unhealthy_after: int,
+        health_interval_seconds: float,
+        timeout_seconds: float,
+    ) -> None:
+        self.virtual_nodes = virtual_nodes
+        self.unhealthy_after = max(1, unhealthy_after)
+        self.health_interval_seconds = health_interval_seconds
+        self.timeout_seconds = timeout_seconds
+        self._tiebreak = itertools.count()
+        self._client: httpx.AsyncClient | None = None
+        self.set_backends(urls)
+
+    def set_backends(self, urls: tuple[str, ...] | list[str]) -> None:
+        self.backends = {url.rstrip("/"): Backend(url.rstrip("/")) for url in urls}
+        self._rebuild_ring()
+
+    def _rebuild_ring(self) -> None:
+        self._ring = HashRing([url for url, backend in self.backends.items() if backend.healthy], self.virtual_nodes)
+
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=httpx.Timeout(self.timeout_seconds, connect=2.0))
+        return self._client
+
+    # -- membership ---------------------------------------------------------
+
+    def mark_up(self, backend: Backend, queued: int, capabilities: frozenset[str]) -> None:
+        backend.failures = 0
+        backend.queued = queued
+        backend.capabilities = capabilities
+        backend.last_error = None
+        if not backend.healthy:
+            backend.healthy = True
+            self._rebuild_ring()
+
+    def mark_down(self, backend: Backend, error: str, immediately: bool = False) -> None:
+        backend.failures = self.unhealthy_after if immediately else backend.failures + 1
+        backend.last_error = error
+        if backend.healthy and backend.failures >= self.unhealthy_after:
+            backend.healthy = False
+            self._rebuild_ring()
+
+    async def poll(self, backend: Backend) -> None:
+        """Refresh one instance: in rotation once it can serve something.
+
+        ``/ready`` answers 503 unless every language and backend is ready, so
+        its per-language report decides what the instance serves; ``/health``
+        supplies the load.
+        """
+        try:
+            ready = await self.client().get(f"{backend.url}/ready", timeout=2.0)
+            if ready.status_code not in (200, 503):
+                self.mark_down(backend, f"/ready HTTP {ready.status_code}")
+                return
+            capabilities = _capabilities(ready.json())
+            if not capabilities:
+                self.mark_down(backend, "/ready: nothing ready yet")
+                return
+            health = await self.client().get(f"{backend.url}/health", timeout=2.0)
+            if health.status_code != 200:
+                self.mark_down(backend, f"/health HTTP {health.status_code}")
+                return
+            payload = health.json()
+            scheduler = (payload.get("scheduler") if isinstance(payload, dict) else None) or {}
+            queued = sum((scheduler.get("active") or {}).values()) + sum((scheduler.get("waiting") or {}).values())
+        except Exception as exc:
+            # Anything unexpected (refused connection, a body that is not the
+            # JSON we expect) counts against this instance only.
+            self.mark_down(backend, type(exc).__name__)
+            return
+        self.mark_up(backend, int(queued), capabilities)
+
+    async def poll_all(self) -> None:
+        await asyncio.gather(*(self.poll(backend) for backend in list(self.backends.values())))
+
+    async def poll_forever(self) -> None:
+        while True:
+            try:
+                await self.poll_all()
+            except Exception as exc:
+                # poll() handles per-instance errors; never let the loop die.
+                print(f"[router] health poll failed: {exc!r}", file=sys.stderr, flush=True)
+            await asyncio.sleep(self.health_interval_seconds)
+
+    # -- selection ----------------------------------------------------------
+
+    def least_loaded(self, exclude: set[str], need: str | None = None) -> Backend | None:
+        candidates = [
+            backend
+            for backend in self.backends.values()
+            if backend.healthy and backend.url not in exclude and (need is None or need in backend.capabilities)
+        ]
+        if not candidates:
+            return None
+        # Rotate ties so equally idle instances share the work.
+        turn = next(self._tiebreak)
+        order = {backend.url: (index - turn) % len(candidates) for index, backend in enumerate(candidates)}
+        return min(candidates, key=lambda backend: (backend.load(), order[backend.url]))
+
+    def by_key(self, key: str, exclude: set[str], need: str | None = None) -> Backend | None:
+        for url in self._ring.nodes_for(key):
+            backend = self.backends[url]
+            if url not in exclude and (need is None or need in backend.capabilities):
+                return backend
+        return None
+
+    def picker(self, method: str, path: str, body: bytes) -> tuple[str, Callable[[set[str]], Backend | None]]:
+        """Routing mode and backend chooser for one request."""
+        key = _routing_key(method, path, body)
+        need = _capability_needed(method, path, body)
+        if key is not None:
+            return "hash", lambda exclude: self.by_key(key, exclude, need)
+        return "load", lambda exclude: self.least_loaded(exclude, need)
+
+    # -- proxying -----------------------------------------------------------
+
+    async def forward(self, request: Request) -> Response:
+        body = await request.body()
+        path = request.url.path
+        mode, pick = self.picker(request.method, path, body)
+        headers = [
+            (name, value)
+            for name, value in request.headers.items()
+            if name not in _HOP_BY_HOP and name not in {"host", "content-length"}
+        ]
+
+        tried: set[str] = set()
+        while True:
+            backend = pick(tried)
+            if backend is None:
+                ROUTER_REQUESTS.inc("none", mode, "unavailable")
+                raise HTTPException(status_code=503, detail="no speech-service instance ready for this request")
+            tried.add(backend.url)
+
+            upstream_request = self.client().build_request(
+                request.method,
+                f"{backend.url}{path}",
+                params=request.url.query,
+                headers=headers,
+                content=body,
+            )
+            backend.in_flight += 1
+            try:
+                upstream = await self.client().send(upstream_request, stream=True)
+            except (httpx.ConnectError, httpx.ConnectTimeout) as exc:
+                # Nothing reached the instance, so another one may take it.
+                backend.in_flight -= 1
+                self.mark_down(backend, type(exc).__name__, immediately=True)
+                ROUTER_REQUESTS.inc(backend.url, mode, "retried")
+                continue
+            except httpx.HTTPError as exc:
+                backend.in_flight -= 1
+                ROUTER_REQUESTS.inc(backend.url, mode, "error")
+                raise HTTPException(status_code=502, detail=f"{backend.url}: {type(exc).__name__}") from exc
+            break
+
+        async def finish() -> None:
+            await upstream.aclose()
+            backend.in_flight -= 1
+
+        ROUTER_REQUESTS.inc(backend.url, mode, f"{upstream.status_code // 100}xx")
+        response_headers = {
+            name: value for name, value in upstream.headers.items() if name not in _HOP_BY_HOP
+        }
+        response_headers["X-Routed-To"] = backend.url
+        return StreamingResponse(
+            upstream.aiter_raw(),
+            status_code=upstream.status_code,
+            headers=response_headers,
+            background=BackgroundTask(finish),
+        )
+
+    def status(self) -> dict:
+        return {url: backend.status() for url, backend in self.backends.items()}
+
+
+def _capabilities(report: object) -> frozenset[str]:
+    """What an instance can serve, from its ``/ready`` report."""
+    languages = report.get("languages") if isinstance(report, dict) else None
+    capabilities: set[str] = set()
+    for language, entry in (languages or {}).items():
+        components = {
+            name: bool(component.get("ready")) for name, component in (entry.get("components") or {}).items()
+        }
+        if components.get("ffmpeg") and components.get("whisper"):
+            capabilities.add(f"score:{language}")
+        if any(ready for name, ready in components.items() if name.startswith("tts:")):
+            capabilities.add(f"synthesize:{language}")
+    return frozenset(capabilities)
+
+
+def _capability_needed(method: str, path: str, body: bytes) -> str | None:
+    """Capability an instance needs for this request, or ``None`` if any will do."""
+    if method == "POST" and path in _LOAD_BALANCED:
+        match = _FORM_LANGUAGE.search(body)
+        return f"score:{match.group(1).decode()}" if match else None
+    if method == "POST" and path == "/synthesize":
+        try:
+            language = json.loads(body)["language"]
+        except (ValueError, KeyError, TypeError):
+            return None
+        return f"synthesize:{language}" if language in ("ar", "zh") else None
+    match = _CLIP_PATH.match(path)
+    if method in {"GET", "HEAD"} and match:
+        return f"synthesize:{match.group(1)}"
+    return None
+
+
+def _routing_key(method: str, path: str, body: bytes) -> str | None:
+    """Clip id to hash on, or ``None`` for load-based routing."""
+    if path in _LOAD_BALANCED:
+        return None
+    if method == "POST" and path == "/synthesize":
+        try:
+            payload = json.loads(body)
+            return clip_id(payload["language"], payload["text"])
+        except (ValueError, KeyError, TypeError):
+            # Let an instance reject the malformed request.
+            return None
+    match = _CLIP_PATH.match(path)
+    if method in {"GET", "HEAD"} and match:
+        return match.group(2).lower()
+    return None
+
+
+router = Router(
+    urls=SETTINGS.router_backends,
+    virtual_nodes=SETTINGS.router_virtual_nodes,
+    unhealthy_after=SETTINGS.router_unhealthy_after,
+    health_interval_seconds=SETTINGS.router_health_interval_seconds,
+    timeout_seconds=SETTINGS.router_timeout_seconds,
+)
+
+register_collected(
+    "speech_router_healthy_backends",
+    "Speech-service instances currently in rotation.",
+    "gauge",
+    (),
+    lambda: {(): float(sum(1 for backend in router.backends.values() if backend.healthy))},
+)
+
+app = FastAPI(title="Speech Service Router", version="0.1.0")
+_tasks: set[asyncio.Task] = set()
+
+
+@app.on_event("startup")
+async def start_health_checks() -> None:
+    # One poll before serving, so healthy instances are in rotation at once.
+    await router.poll_all()
+    task = asyncio.create_task(router.poll_forever())
+    _tasks.add(task)
+
+
+@app.on_event("shutdown")
+async def stop_health_checks() -> None:
+    for task in _tasks:
+        task.cancel()
+    if router._client is not None:
+        await router._client.aclose()
+
+
+@app.get("/router/status")
+def router_status():
+    return {"backends": router.status()}
+
+
+@app.get("/router/metrics")
+def router_metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "HEAD"])
+async def proxy(request: Request):
+    return await router.forward(request)
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def spawn_instances(count: int, stub: bool) -> tuple[list[subprocess.Popen], list[str]]:
+    """Start *count* local speech-service instances on free ports."""
+    env = dict(os.environ)
+    if stub:
+        env["SPEECH_STUB_MODELS"] = "1"
+    processes: list[subprocess.Popen] = []
+    urls: list[str] = []
+    for _ in range(count):
+        port = _free_port()
+        processes.append(
+            subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+                cwd=_SERVICE_DIR,
+                env=env,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        )
+        urls.append(f"http://127.0.0.1:{port}")
+    return processes, urls
+
+
+def main(argv: list[str] | None = None) -> int:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Route requests over several speech-service instances.")
+    parser.add_argument("--backends", default=",".join(SETTINGS.router_backends), help="comma-separated base URLs")
+    parser.add_argument("--spawn", type=int, default=0, help="start this many local instances on free ports")
+    parser.add_argument("--stub", action="store_true", help="with --spawn: SPEECH_STUB_MODELS=1")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+
+    urls = [url.strip() for url in args.backends.split(",") if url.strip()]
+    processes: list[subprocess.Popen] = []
+    if args.spawn:
+        processes, spawned = spawn_instances(args.spawn, args.stub)
+        urls.extend(spawned)
+    if not urls:
+        parser.error("no backends: pass --backends, --spawn or set ROUTER_BACKENDS")
+
+    # Spawned instances join rotation once /ready reports anything they can serve.
+    router.set_backends(urls)
+    print(f"[router] routing to {', '.join(urls)}", file=sys.stderr, flush=True)
+    try:
+        uvicorn.run(app, host=args.host, port=args.port)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=30)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+"""Priority-aware dispatch of model work.
+
+Every request runs in one of three priority classes:
+
+* ``interactive``: a learner is waiting (scoring, playing a card);
+* ``prefetch``: audio fetched ahead of time (next-card synthesis);
+* ``background``: pre-rendering and other bulk jobs.
+
+Model work (a scoring pipeline run, one TTS backend call) holds a slot of
+the shared :data:`scheduler` while it runs. Free slots always go to the
+highest-priority waiter. Lower classes cannot take the last
+``SCHEDULER_INTERACTIVE_RESERVED`` slots. They are paused entirely for
+``SCHEDULER_PAUSE_SECONDS`` once an interactive request has waited longer than
+``SCHEDULER_INTERACTIVE_WAIT_MS``. Running work is never interrupted, but
+multi-part jobs (batch and streaming synthesis) take one slot per part, so
+they yield to interactive work between parts.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from app.config import SETTINGS
+from app.metrics import QUEUE_WAIT, SCHEDULER_PAUSES, register_collected
+from app.tracing import record_span
+
+PRIORITIES = ("interactive", "prefetch", "background")
+_RANK = {name: rank for rank, name in enumerate(PRIORITIES)}
+
+_priority: ContextVar[str] = ContextVar("speech_priority", default="interactive")
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+def is_priority(value: str) -> bool:
+    return value in _RANK
+
+
+@contextmanager
+def priority_scope(priority: str) -> Iterator[None]:
+    """Run the block (and tasks/threads started from it) at *priority*."""
+    token = _priority.set(priority if priority in _RANK else "interactive")
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+@dataclass(order=True)
+class _Waiter:
+    rank: int
+    seq: int
+    enqueued: float = field(compare=False)
+    loop: asyncio.AbstractEventLoop = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    abandoned: bool = field(default=False, compare=False)
+
+
+class PriorityScheduler:
+    """Slot accounting shared by every event loop in the process.
+
+    Warmup and CLI tools drive the TTS path from their own ``asyncio.run``
+    loops in worker threads, so state is guarded by a lock and grants are
+    delivered on the waiter's own loop.
+    """
+
+    def __init__(
+        self,
+        slots: int,
+        interactive_reserved: int,
+        interactive_wait_seconds: float,
+        pause_seconds: float,
+    ) -> None:
+        self.slots = max(1, slots)
+        # Never reserve every slot: background work must be able to run.
+        self.interactive_reserved = max(0, min(interactive_reserved, self.slots - 1))
+        self.interactive_wait_seconds = interactive_wait_seconds
+        self.pause_seconds = pause_seconds
+        self._active = {name: 0 for name in PRIORITIES}
+        self._waiters: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        # EWMA of interactive queue wait, an overload signal (app/overload.py).
+        self.recent_interactive_wait = 0.0
+
+    def paused(self, now: float | None = None) -> bool:
+        return (now if now is not None else time.monotonic()) < self._paused_until
+
+    def _pause(self, now: float) -> None:
+        if not self.paused(now):
+            SCHEDULER_PAUSES.inc()
+        self._paused_until = now + self.pause_seconds
+
+    def _can_start(self, rank: int, now: float) -> bool:
+        busy = sum(self._active.values())
+        if busy >= self.slots:
+            return False
+        if rank == 0:
+            return True
+        return not self.paused(now) and busy < self.slots - self.interactive_reserved
+
+    def _dispatch(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if any(
+                waiter.rank == 0 and not waiter.abandoned and now - waiter.enqueued > self.interactive_wait_seconds
+                for waiter in self._waiters
+            ):
+                self._pause(now)
+
+            while self._waiters:
+                waiter = self._waiters[0]
+                if waiter.abandoned:
+                    heapq.heappop(self._waiters)
+                    continue
+                if not self._can_start(waiter.rank, now):
+                    break
+                heapq.heappop(self._waiters)
+                self._active[PRIORITIES[waiter.rank]] += 1
+                waiter.loop.call_soon_threadsafe(self._deliver, waiter, now - waiter.enqueued)
+
+    def _deliver(self, waiter: _Waiter, wait: float) -> None:
+        # Runs on the waiter's loop, so it cannot race the waiter's own
+        # cancellation handling in :meth:`slot`.
+        if waiter.abandoned:
+            self._release(PRIORITIES[waiter.rank])
+        else:
+            waiter.future.set_result(wait)
+
+    def _release(self, name: str) -> None:
+        with self._lock:
+            self._active[name] -= 1
+        self._dispatch()
+
+    def _recheck_seconds(self) -> float:
+        # Waiters poll so a pause that ends while nothing else happens
+        # (no request arrives, no slot is released) still lets them start.
+        remaining = self._paused_until - time.monotonic()
+        return max(0.01, remaining) if remaining > 0 else max(0.05, self.pause_seconds)
+
+    async def _acquire(self, name: str) -> float:
+        rank = _RANK[name]
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            now = time.monotonic()
+            if not self._waiters and self._can_start(rank, now):
+                self._active[name] += 1
+                return 0.0
+            waiter = _Waiter(rank, next(self._seq), now, loop, loop.create_future())
+            heapq.heappush(self._waiters, waiter)
+
+        self._dispatch()
+        try:
+            while True:
+                try:
+                    return await asyncio.wait_for(asyncio.shield(waiter.future), self._recheck_seconds())
+                except asyncio.TimeoutError:
+                    self._dispatch()
+        except asyncio.CancelledError:
+            with self._lock:
+                waiter.abandoned = True
+            if waiter.future.done():
+                # Granted in the same tick the caller gave up: hand it on.
+                self._release(name)
+            raise
+
+    @asynccontextmanager
+    async def slot(self, priority: str | None = None) -> AsyncIterator[None]:
+        """Hold one slot for the block, queued behind higher-priority work."""
+        name = priority if priority in _RANK else current_priority()
+        started = time.perf_counter()
+        wait = await self._acquire(name)
+        if name == "interactive":
+            with self._lock:
+                self.recent_interactive_wait = 0.8 * self.recent_interactive_wait + 0.2 * wait
+                if wait > self.interactive_wait_seconds:
+                    self._pause(time.monotonic())
+
+        QUEUE_WAIT.observe(wait, name)
+        record_span("queue_wait", None, started, wait, {"priority": name})
+        try:
+            yield
+        finally:
+            self._release(name)
+
+    def decay_idle_wait(self) -> None:
+        """Fold a zero wait into the EWMA while no interactive request is queued.
+
+        The average only moves when a request takes a slot, so without this it
+        would hold a burst's wait through a quiet spell that follows it.
+        """
+        with self._lock:
+            if not any(waiter.rank == 0 and not waiter.abandoned for waiter in self._waiters):
+                self.recent_interactive_wait *= 0.8
+
+    def try_acquire(self, priority: str) -> bool:
+        """Take a slot only if one is free now with nothing queued for it.
+
+        For optional work that borrows spare capacity; pair with :meth:`release`.
+        """
+        with self._lock:
+            if any(not waiter.abandoned for waiter in self._waiters):
+                return False
+            if not self._can_start(_RANK[priority], time.monotonic()):
+                return False
+            self._active[priority] += 1
+            return True
+
+    def release(self, priority: str) -> None:
+        """Return a slot taken with :meth:`try_acquire`."""
+        self._release(priority)
+
+    def waiting(self, priority: str) -> int:
+        with self._lock:
+            rank = _RANK[priority]
+            return sum(1 for waiter in self._waiters if waiter.rank == rank and not waiter.abandoned)
+
+    def status(self) -> dict:
+        with self._lock:
+            waiting = {name: 0 for name in PRIORITIES}
+            for waiter in self._waiters:
+                if not waiter.abandoned:
+                    waiting[PRIORITIES[waiter.rank]] += 1
+            return {
+                "slots": self.slots,
+                "interactive_reserved": self.interactive_reserved,
+                "active": dict(self._active),
+                "waiting": waiting,
+                "paused": self.paused(),
+            }
+
+
+scheduler = PriorityScheduler(
+    slots=SETTINGS.scheduler_slots,
+    interactive_reserved=SETTINGS.scheduler_interactive_reserved,
+    interactive_wait_seconds=SETTINGS.scheduler_interactive_wait_ms / 1000,
+    pause_seconds=SETTINGS.scheduler_pause_seconds,
+)
+
+
+def _collect_waiting() -> dict[tuple[str, ...], float]:
+    return {(name,): float(count) for name, count in scheduler.status()["waiting"].items()}
+
+
+def _collect_active() -> dict[tuple[str, ...], float]:
+    return {(name,): float(count) for name, count in scheduler.status()["active"].items()}
+
+
+register_collected(
+    "speech_scheduler_waiting",
+    "Model work queued for a scheduler slot, per priority class.",
+    "gauge",
+    ("priority",),
+    _collect_waiting,
+)
+register_collected(
+    "speech_scheduler_active",
+    "Scheduler slots in use, per priority class.",
+    "gauge",
+    ("priority",),
+    _collect_active,
+)
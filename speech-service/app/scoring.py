@@ -2,11 +2,11 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 
-import librosa
 import numpy as np
-from pypinyin import Style, lazy_pinyin
 
-from app.text_utils import normalize_text, similarity_score
+from app.metrics import time_stage
+from app.text_utils import normalize_text
+from app.variants import target_matcher
 
 
 @dataclass
@@ -16,6 +16,18 @@ class ScoreResult:
     confidence: str
     components: dict[str, float]
     feedback: str
+    # Target form the transcript was closest to (see app/variants.py).
+    matched_variant: str | None = None
+
+
+@dataclass
+class AudioFeatures:
+    """Acoustic features computed ahead of scoring, e.g. while audio streams in."""
+
+    voiced_seconds: float | None = None
+    # pYIN f0 track over the whole clip, one value per ``f0_hop_length`` samples.
+    f0: np.ndarray | None = None
+    f0_hop_length: int = 512
 
 
 def _safe_float(value: float) -> float:
@@ -35,10 +47,23 @@ def _count_tokens(transcript: str, language: str) -> int:
     return max(1, len(transcript.strip().split()))
 
 
-def _fluency_score(audio: np.ndarray, sr: int, transcript: str, language: str) -> float:
-    duration = max(len(audio) / sr, 1e-6)
+def _voiced_seconds(audio: np.ndarray, sr: int) -> float:
+    import librosa
+
     intervals = librosa.effects.split(audio, top_db=28)
-    voiced_seconds = sum((end - start) / sr for start, end in intervals)
+    return sum((end - start) / sr for start, end in intervals)
+
+
+def _fluency_score(
+    audio: np.ndarray,
+    sr: int,
+    transcript: str,
+    language: str,
+    voiced_seconds: float | None = None,
+) -> float:
+    duration = max(len(audio) / sr, 1e-6)
+    if voiced_seconds is None:
+        voiced_seconds = _voiced_seconds(audio, sr)
     pause_ratio = max(0.0, min(1.0, 1.0 - voiced_seconds / duration))
 
     token_count = _count_tokens(transcript, language)
@@ -85,6 +110,8 @@ def _segment_by_onsets(audio: np.ndarray, sr: int, n_segments: int) -> list[tupl
     Falls back to equal-duration splitting when onset detection cannot
     produce enough boundaries.
     """
+    import librosa
+
     total = len(audio)
 
     if n_segments <= 1:
@@ -113,7 +140,53 @@ def _segment_by_onsets(audio: np.ndarray, sr: int, n_segments: int) -> list[tupl
     return [(boundaries[i], boundaries[i + 1]) for i in range(len(boundaries) - 1)]
 
 
-def _mandarin_tone_score(audio: np.ndarray, sr: int, target_text: str) -> float:
+def _segment_pitch(
+    audio: np.ndarray,
+    sr: int,
+    start: int,
+    end: int,
+    f0: np.ndarray | None,
+    f0_hop_length: int,
+    pitch_proxy: bool = False,
+) -> np.ndarray:
+    import librosa
+
+    if f0 is None and pitch_proxy:
+        return _proxy_pitch(audio[start:end], sr)
+    if f0 is None:
+        f0, _, _ = librosa.pyin(audio[start:end], fmin=75, fmax=420, sr=sr)
+    else:
+        first = start // f0_hop_length
+        f0 = f0[first : max(first + 1, end // f0_hop_length)]
+    return f0[~np.isnan(f0)]
+
+
+def _proxy_pitch(segment: np.ndarray, sr: int) -> np.ndarray:
+    """Cheap stand-in for pYIN: plain YIN on the louder frames.
+
+    YIN has no voicing decision, so frames quieter than half the segment's
+    median RMS are treated as unvoiced. Several times faster than pYIN, at
+    the cost of octave errors on breathy or creaky syllables.
+    """
+    import librosa
+
+    frame_length = 2048 if segment.size >= 2048 else max(256, 1 << (segment.size.bit_length() - 1))
+    f0 = librosa.yin(segment, fmin=75, fmax=420, sr=sr, frame_length=frame_length)
+    rms = librosa.feature.rms(y=segment, frame_length=frame_length)[0][: f0.size]
+    loud = rms > 0.5 * float(np.median(rms)) if rms.size else np.zeros(0, dtype=bool)
+    return f0[: loud.size][loud]
+
+
+def _mandarin_tone_score(
+    audio: np.ndarray,
+    sr: int,
+    target_text: str,
+    f0: np.ndarray | None = None,
+    f0_hop_length: int = 512,
+    pitch_proxy: bool = False,
+) -> float:
+    from pypinyin import Style, lazy_pinyin
+
     pinyin = lazy_pinyin(
         target_text,
         style=Style.TONE3,
@@ -136,12 +209,12 @@ def _mandarin_tone_score(audio: np.ndarray, sr: int, target_text: str) -> float:
 
     predicted_tones: list[int] = []
     for start, end in segments:
-        seg = audio[start:end]
-        if len(seg) < int(sr * 0.05):
+        if end - start < int(sr * 0.05):
             predicted_tones.append(5)
             continue
-        f0, _, _ = librosa.pyin(seg, fmin=75, fmax=420, sr=sr)
-        voiced = f0[~np.isnan(f0)]
+        voiced = _segment_pitch(
+            audio, sr, start, end, f0=f0, f0_hop_length=f0_hop_length, pitch_proxy=pitch_proxy
+        )
         predicted_tones.append(_classify_tone(voiced))
 
     exact = 0
@@ -173,20 +246,41 @@ def evaluate_pronunciation(
     audio: np.ndarray,
     sr: int,
     avg_logprob: float,
+    features: AudioFeatures | None = None,
+    pitch_proxy: bool = False,
+    variants: tuple[str, ...] = (),
 ) -> ScoreResult:
-    norm_transcript = normalize_text(transcript)
-    norm_target = normalize_text(target_text)
-    norm_translit = normalize_text(transliteration or "")
+    """Score one attempt.
 
-    intelligibility = similarity_score(norm_transcript, norm_target)
-    if norm_translit:
-        intelligibility = max(intelligibility, similarity_score(norm_transcript, norm_translit))
+    Intelligibility is the best match among *target_text*, *transliteration*
+    and any other acceptable *variants* (register and spelling alternatives).
+    *pitch_proxy* swaps pYIN for the cheaper :func:`_proxy_pitch` when no
+    precomputed f0 track is available (the overload "pitch-proxy" tier).
+    """
+    features = features or AudioFeatures()
+    match = target_matcher(target_text, transliteration, variants).match(normalize_text(transcript))
+    intelligibility = match.similarity
 
     confidence = "high" if avg_logprob > -0.8 else "medium" if avg_logprob > -1.25 else "low"
 
     if language == "zh":
-        fluency = _fluency_score(audio=audio, sr=sr, transcript=transcript, language="zh")
-        tone = _mandarin_tone_score(audio=audio, sr=sr, target_text=target_text)
+        with time_stage("fluency", language):
+            fluency = _fluency_score(
+                audio=audio,
+                sr=sr,
+                transcript=transcript,
+                language="zh",
+                voiced_seconds=features.voiced_seconds,
+            )
+        with time_stage("tone", language):
+            tone = _mandarin_tone_score(
+                audio=audio,
+                sr=sr,
+                target_text=target_text,
+                f0=features.f0,
+                f0_hop_length=features.f0_hop_length,
+                pitch_proxy=pitch_proxy,
+            )
         components = {
             "intelligibility": round(intelligibility, 2),
             "fluency": round(fluency, 2),
@@ -198,7 +292,14 @@ def evaluate_pronunciation(
     else:
         # Arabic: no reliable acoustic phonology scorer exists with these
         # tools, so score honestly on intelligibility + fluency only.
-        fluency = _fluency_score(audio=audio, sr=sr, transcript=transcript, language="ar")
+        with time_stage("fluency", language):
+            fluency = _fluency_score(
+                audio=audio,
+                sr=sr,
+                transcript=transcript,
+                language="ar",
+                voiced_seconds=features.voiced_seconds,
+            )
         components = {
             "intelligibility": round(intelligibility, 2),
             "fluency": round(fluency, 2),
@@ -240,4 +341,5 @@ def evaluate_pronunciation(
         confidence=confidence,
         components=components,
         feedback=feedback,
+        matched_variant=match.variant,
     )
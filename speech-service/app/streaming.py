@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import math
+
+import numpy as np
+
+from app.config import SETTINGS
+from app.metrics import time_stage
+from app.scoring import AudioFeatures
+
+_FRAME_LENGTH = 2048
+_HOP_LENGTH = 512
+# Run pYIN once this much new audio (plus right context) has arrived.
+_PITCH_BLOCK_SAMPLES = 16000
+_SPEECH_PEAK_RMS = 3e-3
+_SPEECH_FLOOR_RMS = 1e-3
+_SPEECH_RELATIVE_DB = 20.0
+_MIN_SPEECH_SECONDS = 0.3
+
+
+def pcm16_to_float(frame: bytes) -> np.ndarray:
+    usable = len(frame) - len(frame) % 2
+    return np.frombuffer(frame[:usable], dtype="<i2").astype(np.float32) / 32768.0
+
+
+class StreamingFeatureExtractor:
+    """Accumulate microphone audio and build scoring features incrementally.
+
+    Frame energies (for VAD and fluency) are computed as each chunk arrives,
+    and Mandarin pitch is tracked block by block, so the work left after
+    end-of-speech is the final decode and a cheap aggregation.
+    """
+
+    def __init__(self, language: str, sr: int = 16000) -> None:
+        self.language = language
+        self.sr = sr
+        self._buffer = np.zeros(int(SETTINGS.max_upload_seconds * sr), dtype=np.float32)
+        self._length = 0
+        self._rms: list[np.ndarray] = []
+        self._rms_frames = 0
+        self._peak_rms = 0.0
+        self._speech_frames = 0
+        self._trailing_silence_frames = 0
+        self._f0: list[np.ndarray] = []
+        self._pitch_pos = 0
+
+    @property
+    def duration_seconds(self) -> float:
+        return self._length / self.sr
+
+    @property
+    def audio(self) -> np.ndarray:
+        return self._buffer[: self._length]
+
+    @property
+    def end_of_speech(self) -> bool:
+        min_speech_frames = _MIN_SPEECH_SECONDS * self.sr / _HOP_LENGTH
+        end_silence_frames = SETTINGS.stream_end_silence_seconds * self.sr / _HOP_LENGTH
+        return (
+            self._speech_frames >= min_speech_frames
+            and self._trailing_silence_frames >= end_silence_frames
+        )
+
+    def push(self, samples: np.ndarray) -> None:
+        if self._length + samples.size > self._buffer.size:
+            raise ValueError(f"audio too long; max {SETTINGS.max_upload_seconds} seconds")
+
+        self._buffer[self._length : self._length + samples.size] = samples
+        self._length += samples.size
+        self._advance_energy()
+        if self.language == "zh":
+            self._advance_pitch(final=False)
+
+    def _advance_energy(self) -> None:
+        import librosa
+
+        start = self._rms_frames * _HOP_LENGTH
+        if self._length - start < _FRAME_LENGTH:
+            return
+
+        rms = librosa.feature.rms(
+            y=self._buffer[start : self._length],
+            frame_length=_FRAME_LENGTH,
+            hop_length=_HOP_LENGTH,
+            center=False,
+        )[0]
+        self._rms.append(rms)
+        self._rms_frames += rms.size
+
+        for value in rms:
+            value = float(value)
+            self._peak_rms = max(self._peak_rms, value)
+            threshold = max(
+                _SPEECH_FLOOR_RMS,
+                self._peak_rms * 10 ** (-_SPEECH_RELATIVE_DB / 20),
+            )
+            if self._peak_rms >= _SPEECH_PEAK_RMS and value >= threshold:
+                self._speech_frames += 1
+                self._trailing_silence_frames = 0
+            elif self._speech_frames:
+                self._trailing_silence_frames += 1
+
+    def _advance_pitch(self, final: bool) -> None:
+        import librosa
+
+        # Frames are centred at multiples of the hop. Each block keeps one
+        # frame of left context and only emits frames whose window is fully
+        # inside the received audio, so blocks stitch into one continuous track.
+        end = self._length if final else self._length - _FRAME_LENGTH
+        pending = end - self._pitch_pos
+        if pending <= 0 or (not final and pending < _PITCH_BLOCK_SAMPLES):
+            return
+
+        start = max(0, self._pitch_pos - _FRAME_LENGTH)
+        f0, _, _ = librosa.pyin(
+            self._buffer[start : self._length],
+            fmin=75,
+            fmax=420,
+            sr=self.sr,
+            frame_length=_FRAME_LENGTH,
+            hop_length=_HOP_LENGTH,
+        )
+        first = (self._pitch_pos - start) // _HOP_LENGTH
+        count = math.ceil(pending / _HOP_LENGTH)
+        self._f0.append(f0[first : first + count])
+        self._pitch_pos += count * _HOP_LENGTH
+
+    def finalize(self) -> AudioFeatures:
+        with time_stage("stream_finalize", self.language):
+            return self._finalize()
+
+    def _finalize(self) -> AudioFeatures:
+        if self.language == "zh":
+            self._advance_pitch(final=True)
+
+        voiced_seconds: float | None = None
+        if self._rms:
+            rms = np.concatenate(self._rms)
+            peak = float(np.max(rms))
+            if peak > 0.0:
+                # Same criterion as librosa.effects.split(top_db=28).
+                voiced_frames = int(np.count_nonzero(20 * np.log10(np.maximum(rms, 1e-10) / peak) > -28))
+                voiced_seconds = min(self.duration_seconds, voiced_frames * _HOP_LENGTH / self.sr)
+
+        f0 = np.concatenate(self._f0) if self._f0 else None
+        return AudioFeatures(voiced_seconds=voiced_seconds, f0=f0, f0_hop_length=_HOP_LENGTH)
@@ -1,12 +1,28 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from threading import Lock
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import copy_context
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING
 
-from faster_whisper import WhisperModel
+import numpy as np
 
-from app.config import SETTINGS
-from app.text_utils import normalize_text, similarity_score
+from app.config import SETTINGS, Settings
+from app.cpu import pinned, whisper_cpu_threads
+from app.deadline import pass_costs, plan_pass
+from app.decode_policy import DecodePolicy, decode_policy
+from app.metrics import DECODE_WINNER, DEADLINE_DEGRADED, SPECULATIVE_FALLBACK, time_stage
+from app.models import ModelManager, model_manager
+from app.overload import TIER_GREEDY, TIER_NO_FALLBACK, TIER_SMALL_MODEL, current_tier
+from app.scheduler import scheduler
+from app.text_utils import normalize_text
+from app.variants import VariantMatcher, target_matcher
+
+if TYPE_CHECKING:
+    from faster_whisper import WhisperModel
 
 
 @dataclass
@@ -14,51 +30,148 @@ class TranscriptionResult:
     transcript: str
     avg_logprob: float
     language: str
+    # Passes skipped or run greedy to meet the request deadline,
+    # e.g. ``("fallback:skipped",)``.
+    degraded: tuple[str, ...] = ()
+
+
+class _DecodeCancelled(Exception):
+    """A speculative pass was called off before it finished."""
+
+
+@dataclass
+class _Speculation:
+    reason: str
+    plan: tuple[int, int]
+    cancel: threading.Event
+    future: Future
+
+
+# Frames quieter than this (-40 dBFS, after boosting) count as pauses.
+_PAUSE_RMS = 0.01
+
+
+class _TargetHistory:
+    """Recent primary-pass quality per (language, target), LRU-bounded."""
+
+    def __init__(self, max_items: int = 2048) -> None:
+        self._quality: OrderedDict[tuple[str, str], float] = OrderedDict()
+        self._max_items = max_items
+        self._lock = threading.Lock()
+
+    def get(self, language: str, target_norm: str) -> float | None:
+        with self._lock:
+            return self._quality.get((language, target_norm))
+
+    def observe(self, language: str, target_norm: str, quality: float) -> None:
+        key = (language, target_norm)
+        with self._lock:
+            previous = self._quality.get(key)
+            self._quality[key] = quality if previous is None else 0.5 * previous + 0.5 * quality
+            self._quality.move_to_end(key)
+            if len(self._quality) > self._max_items:
+                self._quality.popitem(last=False)
 
 
 class WhisperTranscriber:
-    def __init__(self) -> None:
-        self._models: dict[str, WhisperModel] = {}
-        self._model_lock = Lock()
+    def __init__(
+        self,
+        manager: ModelManager = model_manager,
+        settings: Settings = SETTINGS,
+        policy: DecodePolicy = decode_policy,
+    ) -> None:
+        self._manager = manager
+        # Overridable so calibration can sweep decode settings in-process.
+        self._settings = settings
+        self._policy = policy
+        self._history = _TargetHistory()
+        self._speculative_pool: ThreadPoolExecutor | None = None
+        self._speculative_pool_lock = threading.Lock()
+
+    def use_settings(self, settings: Settings) -> None:
+        """Replace the settings; only affects models loaded afterwards."""
+        self._settings = settings
 
     def _model_name_for_language(self, language: str | None) -> str:
         if language == "zh":
-            return SETTINGS.whisper_model_zh
-        return SETTINGS.whisper_model
+            return self._settings.whisper_model_zh
+        # Mandarin already runs the smallest model; only others step down.
+        # Only to a resident overload model, though: cold-loading one at peak
+        # load would hold a slot for the load and, under a memory budget,
+        # could evict the primary model.
+        overload_model = self._settings.whisper_model_overload
+        if (
+            current_tier() >= TIER_SMALL_MODEL
+            and overload_model
+            and self._manager.is_loaded(self._register_model(overload_model))
+        ):
+            return overload_model
+        return self._settings.whisper_model
 
-    def _get_model(self, language: str | None) -> WhisperModel:
-        model_name = self._model_name_for_language(language)
-        existing = self._models.get(model_name)
-        if existing is not None:
-            return existing
+    def _load_model(self, model_name: str) -> WhisperModel:
+        if self._settings.stub_models:
+            from app.stubs import StubWhisperModel
 
-        with self._model_lock:
-            existing = self._models.get(model_name)
-            if existing is not None:
-                return existing
+            return StubWhisperModel(model_name)
 
-            model = WhisperModel(
+        # Imported on first use: CTranslate2 is slow to import and not
+        # needed until the first decode.
+        from faster_whisper import WhisperModel
+
+        # CTranslate2 starts its worker threads here; they inherit the pin.
+        with pinned("stt"):
+            return WhisperModel(
                 model_name,
-                device=SETTINGS.whisper_device,
-                compute_type=SETTINGS.whisper_compute_type,
+                device=self._settings.whisper_device,
+                compute_type=self._settings.whisper_compute_type,
+                cpu_threads=whisper_cpu_threads(self._settings),
+                num_workers=self._settings.whisper_num_workers,
             )
-            self._models[model_name] = model
-            return model
+
+    def _register_model(self, model_name: str) -> str:
+        key = f"whisper:{model_name}"
+        self._manager.register(key, lambda: self._load_model(model_name))
+        return key
+
+    def _model_key(self, language: str | None) -> str:
+        return self._register_model(self._model_name_for_language(language))
 
     def warmup(self, language: str) -> None:
-        self._get_model(language)
+        self._manager.get(self._model_key(language))
+
+    def needs_overload_model(self) -> bool:
+        """Whether the ``small-model`` tier has a distinct model not yet loaded."""
+        name = self._settings.whisper_model_overload
+        if name in ("", self._settings.whisper_model):
+            return False
+        return not self._manager.is_loaded(self._register_model(name))
+
+    def warmup_overload(self) -> None:
+        """Load the ``small-model`` tier's model so the tier can use it."""
+        if self._settings.whisper_model_overload:
+            self._manager.get(self._register_model(self._settings.whisper_model_overload))
+
+    def is_loaded(self, language: str) -> bool:
+        return self._manager.is_loaded(self._model_key(language))
+
+    def is_available(self, language: str) -> bool:
+        """Loaded now, or loaded before and reloadable on demand after an idle unload."""
+        return self._manager.has_loaded(self._model_key(language))
 
     def _decode_once(
         self,
-        audio_path: str,
+        audio_path: str | np.ndarray,
         language: str | None,
         initial_prompt: str | None,
         hotwords: str | None,
         beam_size: int,
         best_of: int,
         vad_filter: bool,
+        pass_name: str,
+        request_language: str | None = None,
+        audio_seconds: float | None = None,
+        cancel: threading.Event | None = None,
     ) -> TranscriptionResult:
-        model = self._get_model(language)
         kwargs = {
             "language": language,
             "beam_size": beam_size,
@@ -70,25 +183,54 @@ class WhisperTranscriber:
             "initial_prompt": initial_prompt,
         }
 
-        try:
-            segments, info = model.transcribe(
-                audio_path,
-                hotwords=hotwords,
-                **kwargs,
-            )
-        except TypeError:
-            # Older faster-whisper builds may not support hotwords.
-            segments, info = model.transcribe(audio_path, **kwargs)
-
         texts: list[str] = []
         logprobs: list[float] = []
 
-        for segment in segments:
-            text = (segment.text or "").strip()
-            if text:
-                texts.append(text)
-            if segment.avg_logprob is not None:
-                logprobs.append(float(segment.avg_logprob))
+        # Segments decode lazily, so the model stays pinned (and the stage
+        # timer runs) until iteration ends.
+        stage = time_stage(
+            f"whisper_{pass_name}",
+            request_language or language,
+            language_hint=language,
+            beam_size=beam_size,
+            best_of=best_of,
+            vad_filter=vad_filter,
+        )
+        started = time.perf_counter()
+        with stage, self._manager.use(self._model_key(language)) as model:
+            try:
+                segments, info = model.transcribe(
+                    audio_path,
+                    hotwords=hotwords,
+                    **kwargs,
+                )
+            except TypeError:
+                # Older faster-whisper builds may not support hotwords.
+                segments, info = model.transcribe(audio_path, **kwargs)
+
+            # Segments decode on demand, so a cancelled pass stops before
+            # the next one instead of finishing the clip.
+            if cancel is not None and cancel.is_set():
+                raise _DecodeCancelled
+            for segment in segments:
+                text = (segment.text or "").strip()
+                if text:
+                    texts.append(text)
+                if segment.avg_logprob is not None:
+                    logprobs.append(float(segment.avg_logprob))
+                if cancel is not None and cancel.is_set():
+                    raise _DecodeCancelled
+
+        if audio_seconds is None and isinstance(audio_path, np.ndarray):
+            audio_seconds = audio_path.size / 16000
+        if audio_seconds:
+            pass_costs.observe(
+                request_language or language or "unknown",
+                pass_name,
+                beam_size,
+                time.perf_counter() - started,
+                audio_seconds,
+            )
 
         transcript = " ".join(texts).strip()
         avg_logprob = sum(logprobs) / len(logprobs) if logprobs else -1.2
@@ -99,94 +241,299 @@ class WhisperTranscriber:
             language=info.language,
         )
 
+    def transcribe_partial(self, audio: np.ndarray, language: str) -> TranscriptionResult:
+        """Greedy single-pass decode for live transcripts while audio streams in."""
+        return self._decode_once(
+            audio_path=audio,
+            language=language,
+            initial_prompt=None,
+            hotwords=None,
+            beam_size=1,
+            best_of=1,
+            vad_filter=False,
+            pass_name="partial",
+        )
+
     @staticmethod
-    def _quality(
-        candidate: TranscriptionResult,
-        target_norm: str,
-        translit_norm: str,
-    ) -> float:
-        transcript_norm = normalize_text(candidate.transcript)
-        text_match = similarity_score(transcript_norm, target_norm)
-        if translit_norm:
-            text_match = max(text_match, similarity_score(transcript_norm, translit_norm))
+    def _quality(candidate: TranscriptionResult, matcher: VariantMatcher) -> float:
+        text_match = matcher.match(normalize_text(candidate.transcript)).similarity
         logprob_score = max(0.0, min(100.0, (candidate.avg_logprob + 2.0) / 1.8 * 100))
         return 0.75 * text_match + 0.25 * logprob_score
 
+    def _speculation_reason(self, audio_path: str, language: str, target_norm: str, fast_threshold: float) -> str | None:
+        """Why the fallback should start alongside the primary, or ``None``."""
+        settings = self._settings
+        if (
+            not settings.whisper_speculative
+            or settings.whisper_num_workers < 2
+            or current_tier() > 0
+        ):
+            return None
+        if language == "zh" and settings.whisper_zh_skip_quality_fallback:
+            # The fallback only runs after an empty primary: rarely worth it.
+            return None
+        recent = self._history.get(language, target_norm)
+        if recent is not None and recent < fast_threshold:
+            return "history"
+        profile = _clip_profile(audio_path)
+        if profile is None:
+            return None
+        rms_dbfs, longest_pause = profile
+        if rms_dbfs < settings.whisper_speculative_max_rms_dbfs:
+            return "quiet"
+        if longest_pause >= settings.whisper_speculative_pause_seconds:
+            return "pauses"
+        return None
+
+    def _speculative_executor(self) -> ThreadPoolExecutor:
+        with self._speculative_pool_lock:
+            if self._speculative_pool is None:
+                self._speculative_pool = ThreadPoolExecutor(
+                    max_workers=max(1, self._settings.whisper_num_workers - 1),
+                    thread_name_prefix="whisper-speculative",
+                )
+            return self._speculative_pool
+
     def transcribe(
         self,
         audio_path: str,
         language: str,
         target_text: str,
         transliteration: str | None,
+        variants: tuple[str, ...] = (),
     ) -> TranscriptionResult:
+        settings = self._settings
         is_mandarin = language == "zh"
         target_norm = normalize_text(target_text)
-        translit_norm = normalize_text(transliteration or "")
+        matcher = target_matcher(target_text, transliteration, variants)
 
-        primary_beam_size = SETTINGS.whisper_zh_beam_size if is_mandarin else SETTINGS.whisper_beam_size
-        primary_best_of = SETTINGS.whisper_zh_best_of if is_mandarin else SETTINGS.whisper_best_of
-        primary_vad = SETTINGS.whisper_zh_vad_filter if is_mandarin else True
-        fast_threshold = SETTINGS.whisper_zh_fast_threshold if is_mandarin else SETTINGS.whisper_fast_threshold
+        primary_beam_size = settings.whisper_zh_beam_size if is_mandarin else settings.whisper_beam_size
+        primary_best_of = settings.whisper_zh_best_of if is_mandarin else settings.whisper_best_of
+        primary_vad = settings.whisper_zh_vad_filter if is_mandarin else True
+        fast_threshold = settings.whisper_zh_fast_threshold if is_mandarin else settings.whisper_fast_threshold
 
         fallback_beam_size = (
-            SETTINGS.whisper_zh_fallback_beam_size
+            settings.whisper_zh_fallback_beam_size
             if is_mandarin
-            else SETTINGS.whisper_fallback_beam_size
+            else settings.whisper_fallback_beam_size
         )
         fallback_best_of = (
-            SETTINGS.whisper_zh_fallback_best_of
+            settings.whisper_zh_fallback_best_of
             if is_mandarin
-            else SETTINGS.whisper_fallback_best_of
+            else settings.whisper_fallback_best_of
         )
 
-        # Primary decode: language hint only, no target-text conditioning.
-        # This avoids biasing Whisper toward the expected answer so the
-        # transcription reflects what the user actually said.
-        primary = self._decode_once(
-            audio_path=audio_path,
-            language=language,
-            initial_prompt=None,
-            hotwords=None,
-            beam_size=primary_beam_size,
-            best_of=primary_best_of,
-            vad_filter=primary_vad,
-        )
-        primary_quality = self._quality(primary, target_norm=target_norm, translit_norm=translit_norm)
+        tier = current_tier()
+        if tier >= TIER_GREEDY:
+            primary_beam_size, primary_best_of = 1, 1
+
+        audio_seconds = _audio_seconds(audio_path)
+        degraded: list[str] = []
+
+        def note_plan(pass_name: str, asked: tuple[int, int], plan: tuple[int, int] | None) -> tuple[int, int] | None:
+            if plan != asked:
+                action = "skipped" if plan is None else "greedy"
+                degraded.append(f"{pass_name}:{action}")
+                DEADLINE_DEGRADED.inc(language, pass_name, action)
+            return plan
 
-        if primary_quality >= fast_threshold and primary.avg_logprob > -1.25:
-            return primary
+        def within_deadline(pass_name: str, beam_size: int, best_of: int) -> tuple[int, int] | None:
+            plan = plan_pass(language, pass_name, beam_size, best_of, audio_seconds)
+            return note_plan(pass_name, (beam_size, best_of), plan)
 
-        # Mandarin speed path: skip global-language fallback unless primary was empty.
-        if is_mandarin and SETTINGS.whisper_zh_skip_quality_fallback and primary.transcript:
-            return primary
+        def finish(result: TranscriptionResult, pass_name: str) -> TranscriptionResult:
+            return _winner(replace(result, degraded=tuple(degraded)), pass_name, language)
 
         # Fallback decode: still avoid target-text conditioning. We only relax
         # the language constraint and decode settings to recover harder clips.
-        fallback = self._decode_once(
-            audio_path=audio_path,
-            language=language if is_mandarin else None,
-            initial_prompt=None,
-            hotwords=None,
-            beam_size=fallback_beam_size,
-            best_of=fallback_best_of,
-            vad_filter=False,
+        def run_fallback(
+            plan: tuple[int, int],
+            cancel: threading.Event | None = None,
+        ) -> tuple[TranscriptionResult, float]:
+            started = time.perf_counter()
+            result = self._decode_once(
+                audio_path=audio_path,
+                language=language if is_mandarin else None,
+                initial_prompt=None,
+                hotwords=None,
+                beam_size=plan[0],
+                best_of=plan[1],
+                vad_filter=False,
+                pass_name="fallback",
+                request_language=language,
+                audio_seconds=audio_seconds,
+                cancel=cancel,
+            )
+            return result, time.perf_counter() - started
+
+        # Speculative mode: on a hard-looking clip with capacity to spare,
+        # decode the fallback in parallel instead of after the primary. It
+        # is called off if the primary turns out good enough.
+        speculation: _Speculation | None = None
+        reason = self._speculation_reason(audio_path, language, target_norm, fast_threshold)
+        if reason is not None:
+            plan = plan_pass(language, "fallback", fallback_beam_size, fallback_best_of, audio_seconds)
+            # The pass holds a background slot of its own, so it never runs
+            # beyond the scheduler's slot count or ahead of queued work.
+            if plan is not None and scheduler.try_acquire("background"):
+                cancel = threading.Event()
+                # copy_context carries the request trace, deadline and tier.
+                future = self._speculative_executor().submit(copy_context().run, run_fallback, plan, cancel)
+                future.add_done_callback(lambda _: scheduler.release("background"))
+                speculation = _Speculation(reason, plan, cancel, future)
+
+        def call_off_speculation() -> None:
+            if speculation is None:
+                return
+            speculation.cancel.set()
+
+            def count(future: Future) -> None:
+                # Cancellation is only checked between segments, and a short
+                # clip is usually a single segment: such a pass runs to the
+                # end regardless and is counted as wasted, not cancelled.
+                stopped = future.cancelled() or isinstance(future.exception(), _DecodeCancelled)
+                SPECULATIVE_FALLBACK.inc(language, speculation.reason, "cancelled" if stopped else "wasted")
+
+            speculation.future.add_done_callback(count)
+
+        # Primary decode: language hint only, no target-text conditioning.
+        # This avoids biasing Whisper toward the expected answer so the
+        # transcription reflects what the user actually said. It always runs
+        # (greedy when the deadline is tight): without it there is no score.
+        primary_plan = plan_pass(language, "primary", primary_beam_size, primary_best_of, audio_seconds)
+        if primary_plan != (primary_beam_size, primary_best_of):
+            primary_plan = (1, 1)
+            if (primary_beam_size, primary_best_of) != (1, 1):
+                degraded.append("primary:greedy")
+                DEADLINE_DEGRADED.inc(language, "primary", "greedy")
+        try:
+            primary = self._decode_once(
+                audio_path=audio_path,
+                language=language,
+                initial_prompt=None,
+                hotwords=None,
+                beam_size=primary_plan[0],
+                best_of=primary_plan[1],
+                vad_filter=primary_vad,
+                pass_name="primary",
+                audio_seconds=audio_seconds,
+            )
+        except BaseException:
+            call_off_speculation()
+            raise
+        primary_quality = self._quality(primary, matcher)
+        if settings.whisper_speculative:
+            self._history.observe(language, target_norm, primary_quality)
+
+        # Static rules: accept a confident primary as is; the Mandarin speed
+        # path skips the global-language fallback unless primary was empty.
+        # The learned policy overrides them once it has enough samples.
+        static_fallback = not (
+            (primary_quality >= fast_threshold and primary.avg_logprob > -1.25)
+            or (is_mandarin and settings.whisper_zh_skip_quality_fallback and primary.transcript)
         )
+        # Under overload the fallback is off outright; the policy is not
+        # consulted, so its stats only reflect normal operation.
+        if tier >= TIER_NO_FALLBACK:
+            return finish(primary, "primary")
+        decision = self._policy.decide(language, target_norm, "fallback", primary_quality, static_fallback)
 
-        fallback_quality = self._quality(fallback, target_norm=target_norm, translit_norm=translit_norm)
-        best = fallback if fallback_quality > primary_quality else primary
+        best, best_pass, best_quality = primary, "primary", primary_quality
+        fallback_plan = None
+        if not decision.run:
+            # Only the fallback decode is skipped; an empty primary still
+            # gets the rescue pass below.
+            call_off_speculation()
+        elif speculation is not None:
+            fallback_plan = note_plan("fallback", (fallback_beam_size, fallback_best_of), speculation.plan)
+            fallback, fallback_seconds = speculation.future.result()
+            SPECULATIVE_FALLBACK.inc(language, speculation.reason, "used")
+        else:
+            fallback_plan = within_deadline("fallback", fallback_beam_size, fallback_best_of)
+            if fallback_plan is not None:
+                fallback, fallback_seconds = run_fallback(fallback_plan)
+        if fallback_plan is not None:
+            fallback_quality = self._quality(fallback, matcher)
+            if fallback_plan == (fallback_beam_size, fallback_best_of) and speculation is None:
+                # Greedy deadline runs would skew the stats for the full pass,
+                # and a speculative run's time overlaps the primary's.
+                self._policy.record(
+                    language,
+                    target_norm,
+                    "fallback",
+                    primary_quality,
+                    fallback_quality,
+                    fallback_seconds,
+                )
+            if fallback_quality > primary_quality:
+                best, best_pass, best_quality = fallback, "fallback", fallback_quality
         if best.transcript:
-            return best
+            return finish(best, best_pass)
 
-        rescue = self._decode_once(
-            audio_path=audio_path,
-            language=language,
-            initial_prompt=None,
-            hotwords=None,
-            beam_size=fallback_beam_size,
-            best_of=fallback_best_of,
-            vad_filter=False,
-        )
-        return rescue if rescue.transcript else best
+        if not self._policy.decide(language, target_norm, "rescue", best_quality, True).run:
+            return finish(best, "none")
+        rescue_plan = within_deadline("rescue", fallback_beam_size, fallback_best_of)
+        if rescue_plan is not None:
+            started = time.perf_counter()
+            rescue = self._decode_once(
+                audio_path=audio_path,
+                language=language,
+                initial_prompt=None,
+                hotwords=None,
+                beam_size=rescue_plan[0],
+                best_of=rescue_plan[1],
+                vad_filter=False,
+                pass_name="rescue",
+                audio_seconds=audio_seconds,
+            )
+            if rescue_plan == (fallback_beam_size, fallback_best_of):
+                self._policy.record(
+                    language,
+                    target_norm,
+                    "rescue",
+                    best_quality,
+                    self._quality(rescue, matcher),
+                    time.perf_counter() - started,
+                )
+            if rescue.transcript:
+                return finish(rescue, "rescue")
+        return finish(best, "none")
+
+
+def _audio_seconds(audio_path: str) -> float | None:
+    import soundfile as sf
+
+    try:
+        return float(sf.info(audio_path).duration)
+    except Exception:
+        # Unknown length only disables deadline planning for this request.
+        return None
+
+
+def _clip_profile(audio_path: str) -> tuple[float, float] | None:
+    """RMS level in dBFS and the longest pause (seconds) between voiced frames."""
+    import soundfile as sf
+
+    try:
+        signal, sample_rate = sf.read(audio_path, dtype="float32", always_2d=True)
+    except Exception:
+        return None
+    signal = signal.mean(axis=1)
+    if signal.size == 0:
+        return None
+    rms_dbfs = 20 * float(np.log10(max(float(np.sqrt(np.mean(np.square(signal)))), 1e-9)))
+
+    frame = max(1, int(sample_rate * 0.02))
+    frames = signal[: signal.size // frame * frame].reshape(-1, frame)
+    voiced = np.flatnonzero(np.sqrt(np.mean(np.square(frames), axis=1)) > _PAUSE_RMS)
+    # Only gaps between voiced frames: leading/trailing silence is not a pause.
+    longest_pause = float(np.max(np.diff(voiced)) - 1) * frame / sample_rate if voiced.size > 1 else 0.0
+    return rms_dbfs, longest_pause
+
+
+def _winner(result: TranscriptionResult, pass_name: str, language: str) -> TranscriptionResult:
+    DECODE_WINNER.inc(language, pass_name)
+    return result
 
 
 transcriber = WhisperTranscriber()
@@ -0,0 +1,61 @@
+"""Model stand-ins for load testing without model weights (``SPEECH_STUB_MODELS=1``).
+
+The stubs replace only the models: requests still go through the model
+manager, every Whisper pass, scoring, the synthesis cache and ffmpeg. Fake
+inference blocks the calling thread (``time.sleep``) just as CTranslate2 and
+torch do, so event-loop and thread-pool behaviour under load matches the
+real service.
+"""
+
+from __future__ import annotations
+
+import io
+import random
+import time
+from collections.abc import Iterator
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.config import SETTINGS
+
+STUB_TRANSCRIPTS = {"zh": "我要水", "ar": "أريد ماء"}
+_STUB_TTS_RATE = 24000
+
+
+def _sleep_ms(base_ms: float) -> None:
+    jitter = SETTINGS.stub_latency_jitter
+    time.sleep(max(0.0, base_ms * random.uniform(1 - jitter, 1 + jitter)) / 1000)
+
+
+class StubWhisperModel:
+    """Mimics ``faster_whisper.WhisperModel.transcribe``; wider beams cost more."""
+
+    def __init__(self, model_name: str) -> None:
+        self.model_name = model_name
+
+    def transcribe(self, audio, language: str | None = None, beam_size: int = 1, **kwargs):
+        del audio, kwargs
+        _sleep_ms(SETTINGS.stub_stt_latency_ms * (1 + 0.15 * (beam_size - 1)))
+        detected = language or "ar"
+
+        def segments() -> Iterator[SimpleNamespace]:
+            yield SimpleNamespace(text=STUB_TRANSCRIPTS.get(detected, ""), avg_logprob=-0.3)
+
+        return segments(), SimpleNamespace(language=detected)
+
+
+class StubTtsModel:
+    def __init__(self, backend: str) -> None:
+        self.backend = backend
+
+    def synthesize(self, text: str) -> bytes:
+        import soundfile as sf
+
+        _sleep_ms(SETTINGS.stub_tts_latency_ms)
+        seconds = min(8.0, 0.3 + 0.08 * len(text))
+        t = np.arange(int(seconds * _STUB_TTS_RATE)) / _STUB_TTS_RATE
+        signal = (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+        out = io.BytesIO()
+        sf.write(out, signal, _STUB_TTS_RATE, format="WAV", subtype="PCM_16")
+        return out.getvalue()
@@ -0,0 +1,167 @@
+"""Per-request stage spans and the JSONL trace log.
+
+Every stage timed through :func:`app.metrics.time_stage` is also recorded as
+a span on the current request's trace (a context variable, so spans from
+``asyncio.to_thread`` workers land on the right request). Finished traces
+are handed to a background writer; the request never waits on disk I/O.
+"""
+
+from __future__ import annotations
+
+import json
+import queue
+import threading
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from app.config import SETTINGS
+
+
+@dataclass
+class Span:
+    name: str
+    start: float
+    seconds: float
+    attrs: dict = field(default_factory=dict)
+
+
+@dataclass
+class RequestTrace:
+    route: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:16])
+    language: str | None = None
+    status: int | None = None
+    started_at: float = field(default_factory=time.time)
+    started: float = field(default_factory=time.perf_counter)
+    spans: list[Span] = field(default_factory=list)
+
+    def add_span(self, name: str, started: float, seconds: float, attrs: dict) -> None:
+        self.spans.append(Span(name=name, start=started - self.started, seconds=seconds, attrs=attrs))
+
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self.started) * 1000, 1)
+
+    def stage_records(self) -> list[dict]:
+        return [
+            {
+                "stage": span.name,
+                "start_ms": round(span.start * 1000, 1),
+                "ms": round(span.seconds * 1000, 1),
+                **span.attrs,
+            }
+            for span in self.spans
+        ]
+
+    def breakdown(self) -> dict:
+        """Timing summary returned to clients that ask for it."""
+        return {
+            "request_id": self.id,
+            "total_ms": self.elapsed_ms(),
+            "whisper_passes": sum(1 for span in self.spans if span.name.startswith("whisper_")),
+            "stages": self.stage_records(),
+        }
+
+    def server_timing(self) -> str:
+        # Server-Timing metric names are tokens; repeated stages get a suffix.
+        seen: dict[str, int] = {}
+        entries: list[str] = []
+        for span in self.spans:
+            count = seen.get(span.name, 0)
+            seen[span.name] = count + 1
+            name = span.name if count == 0 else f"{span.name}_{count + 1}"
+            entries.append(f"{name};dur={span.seconds * 1000:.1f}")
+        entries.append(f"total;dur={self.elapsed_ms():.1f}")
+        return ", ".join(entries)
+
+
+_current: ContextVar[RequestTrace | None] = ContextVar("speech_trace", default=None)
+
+
+def current_trace() -> RequestTrace | None:
+    return _current.get()
+
+
+def record_span(name: str, language: str | None, started: float, seconds: float, attrs: dict) -> None:
+    trace = _current.get()
+    if trace is None:
+        return
+    if trace.language is None and language:
+        trace.language = language
+    trace.add_span(name, started, seconds, attrs)
+
+
+class _TraceWriter:
+    """Appends trace records to a JSONL file from a daemon thread.
+
+    The queue is bounded; when the disk falls behind, records are dropped
+    (counted in ``dropped``) instead of slowing requests down.
+    """
+
+    def __init__(self, path: Path, max_pending: int = 1000) -> None:
+        self.path = path
+        self.dropped = 0
+        self._queue: queue.Queue[dict] = queue.Queue(maxsize=max_pending)
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, record: dict) -> None:
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+                    self._thread.start()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as out_file:
+            while True:
+                records = [self._queue.get()]
+                while True:
+                    try:
+                        records.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                out_file.write(
+                    "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+                )
+                out_file.flush()
+
+
+_writer = _TraceWriter(Path(SETTINGS.trace_log_path)) if SETTINGS.trace_log_path else None
+
+
+def _log_trace(trace: RequestTrace) -> None:
+    if _writer is None:
+        return
+    _writer.submit(
+        {
+            "request_id": trace.id,
+            "route": trace.route,
+            "language": trace.language,
+            "status": trace.status,
+            "started_at": round(trace.started_at, 3),
+            "total_ms": trace.elapsed_ms(),
+            "stages": trace.stage_records(),
+        }
+    )
+
+
+@contextmanager
+def request_trace(route: str) -> Iterator[RequestTrace]:
+    """Collect spans for one request and log them when the block exits."""
+    trace = RequestTrace(route=route)
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+        _log_trace(trace)
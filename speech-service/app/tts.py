@@ -1,21 +1,32 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import io
 import json
+import re
+import struct
 import subprocess
 import tempfile
 import threading
 from collections import OrderedDict
-from dataclasses import dataclass
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, replace
+from functools import cached_property
 from pathlib import Path
+from typing import Any
 from urllib import error as urlerror
 from urllib import request as urlrequest
 
 import numpy as np
-import soundfile as sf
 
 from app.config import SETTINGS
+from app.cpu import configure_torch, pinned
 from app.ffmpeg import resolve_ffmpeg_command
+from app.metrics import TTS_BACKEND, TTS_CACHE, time_stage
+from app.models import model_manager, torch_module_bytes
+from app.scheduler import scheduler
+from app.voicepack import PackedClip, backend_models, clip_key, voice_pack
 
 
 class TtsError(RuntimeError):
@@ -26,9 +37,29 @@ class TtsError(RuntimeError):
 class SynthesisResult:
     audio_bytes: bytes
     content_type: str
+    backend: str = ""
+
+    @cached_property
+    def etag(self) -> str:
+        # Computed once per cached clip, not per response.
+        return audio_etag(self.backend, self.content_type, self.audio_bytes)
+
+
+def audio_etag(backend: str, content_type: str, audio: bytes | memoryview) -> str:
+    """Strong ETag over the clip bytes and the backend/model that produced them.
+
+    Including the model id means a model upgrade changes the tag, even for
+    a clip that happens to come out identical.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{backend}\0{backend_models().get(backend, '')}\0{content_type}\0".encode("utf-8"))
+    digest.update(audio)
+    return f'"{digest.hexdigest()}"'
 
 
 def _boost_arabic_tts_loudness(audio_bytes: bytes, language: str) -> bytes:
+    import soundfile as sf
+
     if language != "ar":
         return audio_bytes
 
@@ -65,6 +96,8 @@ def _boost_arabic_tts_loudness(audio_bytes: bytes, language: str) -> bytes:
 
 
 def _assert_not_near_silent_wav(audio_bytes: bytes, backend: str, language: str) -> None:
+    import soundfile as sf
+
     if language != "ar":
         return
 
@@ -136,13 +169,17 @@ def _convert_to_wav(source_path: Path) -> bytes:
 # ---------------------------------------------------------------------------
 # ArTST (MBZUAI SpeechT5) - lazy-loaded Arabic TTS
 # ---------------------------------------------------------------------------
-_artst_processor = None
-_artst_model = None
-_artst_vocoder = None
-_artst_speaker_embeddings = None
+_ARTST_MODEL_KEY = "tts:artst"
+_QWEN_MODEL_KEY = "tts:qwen"
+
+
+@dataclass
+class _ArtstBundle:
+    processor: Any
+    model: Any
+    vocoder: Any
+    speaker_embeddings: Any
 
-_qwen_model = None
-_qwen_model_lock = threading.Lock()
 
 _synthesis_cache: OrderedDict[str, SynthesisResult] = OrderedDict()
 _synthesis_cache_lock = threading.Lock()
@@ -177,44 +214,42 @@ def _format_elevenlabs_error(payload: bytes) -> str:
     return json.dumps(body)
 
 
-def _load_artst():
-    """Lazy-load ArTST model, vocoder, and speaker embeddings on first call."""
-    global _artst_processor, _artst_model, _artst_vocoder, _artst_speaker_embeddings
-
-    if _artst_processor is not None:
-        return
-
+def _load_artst() -> _ArtstBundle:
+    """Load the ArTST model, vocoder, and speaker embeddings."""
     import torch
     from datasets import load_dataset
     from transformers import SpeechT5ForTextToSpeech, SpeechT5HifiGan, SpeechT5Processor
 
+    configure_torch()
     model_id = SETTINGS.artst_model
-    _artst_processor = SpeechT5Processor.from_pretrained(model_id)
-    _artst_model = SpeechT5ForTextToSpeech.from_pretrained(model_id)
-    _artst_vocoder = SpeechT5HifiGan.from_pretrained("microsoft/speecht5_hifigan")
-
     xvector_ds = load_dataset("herwoww/arabic_xvector_embeddings", split="validation")
-    _artst_speaker_embeddings = torch.tensor(xvector_ds[0]["speaker_embeddings"]).unsqueeze(0)
+    return _ArtstBundle(
+        processor=SpeechT5Processor.from_pretrained(model_id),
+        model=SpeechT5ForTextToSpeech.from_pretrained(model_id),
+        vocoder=SpeechT5HifiGan.from_pretrained("microsoft/speecht5_hifigan"),
+        speaker_embeddings=torch.tensor(xvector_ds[0]["speaker_embeddings"]).unsqueeze(0),
+    )
 
 
 async def _synthesize_with_artst(text: str, language: str) -> SynthesisResult:
+    import soundfile as sf
+
     if language != "ar":
         raise TtsError("LOCAL_TTS_BACKEND=artst only supports Arabic (`ar`).")
 
     try:
-        _load_artst()
+        model_manager.get(_ARTST_MODEL_KEY)
     except Exception as exc:
         raise TtsError(f"ArTST model failed to load: {exc}") from exc
 
     import torch
 
-    inputs = _artst_processor(text=text, return_tensors="pt")
-
-    with torch.no_grad():
-        speech = _artst_model.generate_speech(
+    with model_manager.use(_ARTST_MODEL_KEY) as artst, torch.no_grad(), pinned("tts"):
+        inputs = artst.processor(text=text, return_tensors="pt")
+        speech = artst.model.generate_speech(
             inputs["input_ids"],
-            _artst_speaker_embeddings,
-            vocoder=_artst_vocoder,
+            artst.speaker_embeddings,
+            vocoder=artst.vocoder,
         )
 
     wav_array = speech.cpu().numpy()
@@ -236,16 +271,18 @@ async def _synthesize_with_artst(text: str, language: str) -> SynthesisResult:
 
 
 async def _synthesize_with_qwen(text: str, language: str) -> SynthesisResult:
+    import soundfile as sf
+
     if language != "zh":
         raise TtsError("LOCAL_TTS_BACKEND=qwen only supports Mandarin (`zh`).")
 
-    model = _load_qwen_model()
     try:
-        wav, sample_rate = model.generate_voice_design(
-            text=text,
-            language="chinese",
-            instruct="calm female voice",
-        )
+        with model_manager.use(_QWEN_MODEL_KEY) as model, pinned("tts"):
+            wav, sample_rate = model.generate_voice_design(
+                text=text,
+                language="chinese",
+                instruct="calm female voice",
+            )
     except ValueError as exc:
         raise TtsError(str(exc)) from exc
 
@@ -322,22 +359,38 @@ async def _synthesize_with_elevenlabs(text: str, language: str) -> SynthesisResu
 
 
 def _load_qwen_model():
-    global _qwen_model
+    try:
+        from qwen_tts.inference.qwen3_tts_model import Qwen3TTSModel
+    except Exception as exc:
+        raise TtsError("Qwen TTS backend selected but `qwen-tts` is not installed.") from exc
 
-    if _qwen_model is not None:
-        return _qwen_model
+    configure_torch()
+    return Qwen3TTSModel.from_pretrained(SETTINGS.qwen_tts_model)
 
-    with _qwen_model_lock:
-        if _qwen_model is not None:
-            return _qwen_model
 
-        try:
-            from qwen_tts.inference.qwen3_tts_model import Qwen3TTSModel
-        except Exception as exc:
-            raise TtsError("Qwen TTS backend selected but `qwen-tts` is not installed.") from exc
+if SETTINGS.stub_models:
+    from app.stubs import StubTtsModel
+
+    model_manager.register(_QWEN_MODEL_KEY, lambda: StubTtsModel("qwen"))
+    model_manager.register(_ARTST_MODEL_KEY, lambda: StubTtsModel("artst"))
+else:
+    model_manager.register(_QWEN_MODEL_KEY, _load_qwen_model)
+    model_manager.register(
+        _ARTST_MODEL_KEY,
+        _load_artst,
+        size_of=lambda bundle: torch_module_bytes(bundle.model, bundle.vocoder),
+    )
 
-        _qwen_model = Qwen3TTSModel.from_pretrained(SETTINGS.qwen_tts_model)
-        return _qwen_model
+
+async def _synthesize_with_stub(backend: str, text: str) -> SynthesisResult:
+    from app.stubs import StubTtsModel
+
+    if backend == "elevenlabs":
+        audio = StubTtsModel(backend).synthesize(text)
+    else:
+        with model_manager.use(f"tts:{backend}") as model:
+            audio = model.synthesize(text)
+    return SynthesisResult(audio_bytes=audio, content_type="audio/wav")
 
 
 def _synthesis_cache_key(backend: str, language: str, text: str) -> str:
@@ -361,6 +414,45 @@ def _write_cached_synthesis(cache_key: str, result: SynthesisResult) -> None:
             _synthesis_cache.popitem(last=False)
 
 
+def packed_synthesis(text: str, language: str) -> PackedClip | None:
+    """Return *text*'s clip from the voice pack if a configured backend made it."""
+    return packed_synthesis_by_key(clip_key(language, text), language)
+
+
+def packed_synthesis_by_key(key: bytes, language: str) -> PackedClip | None:
+    """Like :func:`packed_synthesis`, addressed by :func:`app.voicepack.clip_key`."""
+    if voice_pack is None:
+        return None
+    clip = voice_pack.lookup_key(key)
+    if clip is None or clip.backend not in _resolve_backends(language):
+        return None
+    TTS_CACHE.inc(language, "pack")
+    return clip
+
+
+def _from_pack(clip: PackedClip) -> SynthesisResult:
+    # Copies the clip out of the mapping; /synthesize serves it in place.
+    return SynthesisResult(audio_bytes=bytes(clip.data), content_type=clip.content_type, backend=clip.backend)
+
+
+def cached_synthesis(text: str, language: str) -> SynthesisResult | None:
+    """Return a pre-rendered or previously synthesized clip for *text* without running a backend.
+
+    Only hits are counted in the cache metrics; callers fall through to
+    :func:`synthesize` on a miss, which counts it.
+    """
+    clip = packed_synthesis(text, language)
+    if clip is not None:
+        return _from_pack(clip)
+    for backend in _resolve_backends(language):
+        cache_key = _synthesis_cache_key(backend=backend, language=language, text=text)
+        cached = _read_cached_synthesis(cache_key)
+        if cached is not None:
+            TTS_CACHE.inc(language, "hit")
+            return cached
+    return None
+
+
 def _resolve_auto_backends(language: str) -> list[str]:
     if language == "zh":
         return ["qwen"]
@@ -394,6 +486,8 @@ def _resolve_backends(language: str) -> list[str]:
 
 
 async def _run_backend(backend: str, text: str, language: str) -> SynthesisResult:
+    if SETTINGS.stub_models:
+        return await _synthesize_with_stub(backend, text)
     if backend == "artst":
         return await _synthesize_with_artst(text=text, language=language)
     if backend == "qwen":
@@ -403,6 +497,49 @@ async def _run_backend(backend: str, text: str, language: str) -> SynthesisResul
     raise TtsError(f"Unsupported backend '{backend}'.")
 
 
+async def _synthesize_and_cache(backend: str, text: str, language: str) -> SynthesisResult:
+    try:
+        # The backends block while they generate, so they run on a worker
+        # thread (with its own loop) while holding a scheduler slot.
+        async with scheduler.slot():
+            with time_stage(f"tts_{backend}", language):
+                result = await asyncio.to_thread(
+                    asyncio.run,
+                    _run_backend(backend=backend, text=text, language=language),
+                )
+        if result.content_type == "audio/wav":
+            _assert_not_near_silent_wav(
+                audio_bytes=result.audio_bytes,
+                backend=backend,
+                language=language,
+            )
+    except Exception:
+        TTS_BACKEND.inc(backend, language, "failure")
+        raise
+    TTS_BACKEND.inc(backend, language, "success")
+
+    if backend == "artst" and result.content_type == "audio/wav":
+        result = SynthesisResult(
+            audio_bytes=_boost_arabic_tts_loudness(
+                audio_bytes=result.audio_bytes,
+                language=language,
+            ),
+            content_type=result.content_type,
+        )
+    result = replace(result, backend=backend)
+    _write_cached_synthesis(_synthesis_cache_key(backend=backend, language=language, text=text), result)
+    return result
+
+
+async def synthesize_with_backend(text: str, language: str, backend: str) -> SynthesisResult:
+    """Synthesize *text* with one specific backend (no fallback chain)."""
+    cached = _read_cached_synthesis(_synthesis_cache_key(backend=backend, language=language, text=text))
+    TTS_CACHE.inc(language, "miss" if cached is None else "hit")
+    if cached is not None:
+        return cached
+    return await _synthesize_and_cache(backend=backend, text=text, language=language)
+
+
 async def synthesize(
     text: str,
     language: str,
@@ -411,47 +548,148 @@ async def synthesize(
     """Synthesize *text* using configured TTS backends."""
     del transliteration
 
+    clip = packed_synthesis(text, language)
+    if clip is not None:
+        return _from_pack(clip)
+
     backends = _resolve_backends(language)
     errors: list[str] = []
 
-    for backend in backends:
+    for index, backend in enumerate(backends):
         cache_key = _synthesis_cache_key(backend=backend, language=language, text=text)
         cached = _read_cached_synthesis(cache_key)
         if cached is not None:
+            TTS_CACHE.inc(language, "hit")
             return cached
+        if index == 0:
+            TTS_CACHE.inc(language, "miss")
 
         try:
-            result = await _run_backend(
-                backend=backend,
-                text=text,
-                language=language,
-            )
-            if result.content_type == "audio/wav":
-                _assert_not_near_silent_wav(
-                    audio_bytes=result.audio_bytes,
-                    backend=backend,
-                    language=language,
-                )
-            if backend == "artst" and result.content_type == "audio/wav":
-                result = SynthesisResult(
-                    audio_bytes=_boost_arabic_tts_loudness(
-                        audio_bytes=result.audio_bytes,
-                        language=language,
-                    ),
-                    content_type=result.content_type,
-                )
-            _write_cached_synthesis(cache_key, result)
-            return result
+            return await _synthesize_and_cache(backend=backend, text=text, language=language)
         except TtsError as exc:
             errors.append(f"{backend}: {exc}")
 
     raise TtsError("No TTS backend succeeded. " + " | ".join(errors))
 
 
+# ---------------------------------------------------------------------------
+# Streaming synthesis
+# ---------------------------------------------------------------------------
+# Split after sentence/phrase punctuation in Latin, Arabic and CJK text.
+_PHRASE_BREAK_PATTERN = re.compile(r"(?<=[.!?;,\u060c\u061b\u061f\u3001\u3002\uff01\uff0c\uff1b\uff1f])")
+_MIN_PHRASE_CHARS = 6
+
+
+def split_phrases(text: str) -> list[str]:
+    """Split *text* at phrase boundaries, merging fragments too short to voice well."""
+    # Pieces keep their original whitespace so merged fragments read exactly
+    # as in the source text (no spaces injected into CJK).
+    pieces: list[str] = []
+    for piece in _PHRASE_BREAK_PATTERN.split(text):
+        if not piece.strip():
+            continue
+        if pieces and len(pieces[-1].strip()) < _MIN_PHRASE_CHARS:
+            pieces[-1] += piece
+        else:
+            pieces.append(piece)
+
+    if len(pieces) > 1 and len(pieces[-1].strip()) < _MIN_PHRASE_CHARS:
+        pieces[-2] += pieces.pop()
+    return [piece.strip() for piece in pieces]
+
+
+def _streaming_wav_header(sample_rate: int) -> bytes:
+    # RIFF/data sizes are unknown up front; 0xFFFFFFFF is the conventional
+    # "stream until EOF" marker that browsers and ffmpeg accept.
+    block_align = 2
+    return (
+        b"RIFF"
+        + struct.pack("<I", 0xFFFFFFFF)
+        + b"WAVEfmt "
+        + struct.pack("<IHHIIHH", 16, 1, 1, sample_rate, sample_rate * block_align, block_align, 16)
+        + b"data"
+        + struct.pack("<I", 0xFFFFFFFF)
+    )
+
+
+async def synthesize_stream(text: str, language: str) -> AsyncIterator[bytes]:
+    """Yield a WAV stream for *text*, one phrase at a time.
+
+    The first chunk is the WAV header followed by the first phrase, so
+    playback can start before later phrases are synthesized. Once every
+    phrase succeeds, the assembled clip is cached under the full text.
+    """
+    import soundfile as sf
+
+    cached = cached_synthesis(text, language)
+    phrases = split_phrases(text)
+    if cached is not None or len(phrases) <= 1:
+        result = cached or await synthesize(text, language)
+        yield result.audio_bytes
+        return
+
+    sample_rate: int | None = None
+    backends: set[str] = set()
+    pcm_chunks: list[np.ndarray] = []
+
+    for phrase in phrases:
+        result = await synthesize(phrase, language)
+        backends.add(result.backend)
+        try:
+            signal, phrase_rate = sf.read(io.BytesIO(result.audio_bytes), dtype="int16")
+        except Exception as exc:
+            raise TtsError(f"Phrase audio could not be decoded for streaming: {exc}") from exc
+
+        if signal.ndim > 1:
+            signal = signal[:, 0]
+
+        if sample_rate is None:
+            sample_rate = int(phrase_rate)
+            header = _streaming_wav_header(sample_rate)
+        elif int(phrase_rate) != sample_rate:
+            raise TtsError("Phrase sample rates differ; cannot stream as a single WAV.")
+        else:
+            header = b""
+
+        pcm_chunks.append(signal)
+        yield header + signal.astype("<i2", copy=False).tobytes()
+
+    # Only cache the assembled clip when a single backend voiced every phrase,
+    # otherwise the cache key would misattribute the audio.
+    if sample_rate is not None and len(backends) == 1:
+        backend = backends.pop()
+        if backend:
+            out = io.BytesIO()
+            sf.write(out, np.concatenate(pcm_chunks), sample_rate, format="WAV", subtype="PCM_16")
+            _write_cached_synthesis(
+                _synthesis_cache_key(backend=backend, language=language, text=text),
+                SynthesisResult(audio_bytes=out.getvalue(), content_type="audio/wav", backend=backend),
+            )
+
+
+def resolve_backends(language: str) -> list[str]:
+    return _resolve_backends(language)
+
+
+def backend_loaded(backend: str) -> bool:
+    if backend == "elevenlabs":
+        # Remote backend: nothing to load, only credentials to check.
+        return _elevenlabs_enabled()
+    return model_manager.is_loaded(f"tts:{backend}")
+
+
+def backend_available(backend: str) -> bool:
+    """Loaded now, or loaded before and reloadable on demand after an idle unload."""
+    if backend == "elevenlabs":
+        return _elevenlabs_enabled()
+    return model_manager.has_loaded(f"tts:{backend}")
+
+
+def warmup_backend(backend: str) -> None:
+    if backend in {"qwen", "artst"}:
+        model_manager.get(f"tts:{backend}")
+
+
 def warmup_models_for_language(language: str) -> None:
-    backends = _resolve_backends(language)
-    for backend in backends:
-        if backend == "qwen":
-            _load_qwen_model()
-        elif backend == "artst":
-            _load_artst()
+    for backend in _resolve_backends(language):
+        warmup_backend(backend)
@@ -0,0 +1,159 @@
+"""Match a transcript against every acceptable form of a target at once.
+
+An Arabic item can be said several ways: the MSA and Syrian lexical variants,
+each vowelled or not, and their transliterations. Scoring the transcript
+against each one with :func:`app.text_utils.similarity_score` costs one full
+edit-distance table per form. :class:`VariantMatcher` compiles the normalized
+forms into a trie once per item instead. One depth-first walk then advances a
+bit-parallel edit-distance column per trie node, so forms that share a
+prefix (the vowelled and bare spellings of a word, ``al-`` transliterations)
+share that work. A subtree is skipped as soon as its smallest possible
+distance cannot beat the best match found so far.
+
+Similarities match :func:`~app.text_utils.similarity_score` exactly, so an
+item with one unvowelled form scores as it always has.
+"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable
+from dataclasses import dataclass
+from functools import lru_cache
+
+from app.text_utils import normalize_text
+
+_HARAKAT = re.compile(r"[\u0610-\u061a\u064b-\u065f]")
+
+
+def strip_harakat(text: str) -> str:
+    return _HARAKAT.sub("", text)
+
+
+@dataclass(frozen=True)
+class VariantMatch:
+    similarity: float
+    # Target form (as given, not normalized) the transcript matched best.
+    variant: str | None
+
+
+class _Node:
+    __slots__ = ("children", "terminal", "max_length")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _Node] = {}
+        # (order, original form) when a form ends here; lower order wins ties.
+        self.terminal: tuple[int, str] | None = None
+        self.max_length = 0
+
+
+def _similarity(distance: int, transcript_length: int, variant_length: int) -> float:
+    denom = max(transcript_length, variant_length, 1)
+    return max(0.0, min(100.0, round((1 - distance / denom) * 100, 2)))
+
+
+class VariantMatcher:
+    """Trie of normalized target forms with a bounded edit-distance search."""
+
+    def __init__(self, forms: Iterable[str]) -> None:
+        self._root = _Node()
+        self.forms: list[str] = []
+        self._originals: list[str] = []
+        for form in forms:
+            normalized = normalize_text(form)
+            candidates = [normalized]
+            bare = strip_harakat(normalized)
+            if bare != normalized:
+                # Whisper rarely writes harakat: the bare spelling is always acceptable.
+                candidates.append(bare)
+            for candidate in candidates:
+                if candidate:
+                    self._insert(candidate, form)
+
+    def __len__(self) -> int:
+        return len(self.forms)
+
+    def _insert(self, normalized: str, original: str) -> None:
+        node = self._root
+        node.max_length = max(node.max_length, len(normalized))
+        for char in normalized:
+            node = node.children.setdefault(char, _Node())
+            node.max_length = max(node.max_length, len(normalized))
+        if node.terminal is None:
+            node.terminal = (len(self.forms), original)
+            self.forms.append(normalized)
+            self._originals.append(original)
+
+    def match(self, transcript: str) -> VariantMatch:
+        """Best similarity of normalized *transcript* to any compiled form."""
+        if not self.forms:
+            return VariantMatch(100.0 if not transcript else 0.0, None)
+        length = len(transcript)
+        if not length:
+            return VariantMatch(0.0, self._originals[0])
+
+        # Bit-parallel Levenshtein (Myers/Hyyrö): bit i of the vertical delta
+        # vectors is the step between rows i and i + 1 of the current column,
+        # and *score* is the column's last cell, the distance to this prefix.
+        peq: dict[str, int] = {}
+        for index, char in enumerate(transcript):
+            peq[char] = peq.get(char, 0) | (1 << index)
+        mask = (1 << length) - 1
+        high = 1 << (length - 1)
+
+        best = (-1.0, 0)
+        best_variant: str | None = None
+        stack: list[tuple[_Node, int, int, int, int]] = [(self._root, 0, mask, 0, length)]
+        while stack:
+            node, depth, positive, negative, score = stack.pop()
+            if node.terminal is not None:
+                order, original = node.terminal
+                candidate = (_similarity(score, length, depth), -order)
+                if candidate > best:
+                    best, best_variant = candidate, original
+                    if best[0] >= 100.0 and order == 0:
+                        break
+            for char, child in node.children.items():
+                eq = peq.get(char, 0)
+                vertical = eq | negative
+                horizontal = (((eq & positive) + positive) ^ positive) | eq
+                h_positive = negative | ~(horizontal | positive)
+                h_negative = positive & horizontal
+                child_score = score + (1 if h_positive & high else -1 if h_negative & high else 0)
+                # Each further character moves the distance by at most one,
+                # so nothing below can end closer than this bound.
+                floor = child_score - (child.max_length - depth - 1)
+                if _similarity(max(floor, 0), length, child.max_length) < best[0]:
+                    continue
+                h_positive = ((h_positive << 1) | 1) & mask
+                h_negative = (h_negative << 1) & mask
+                stack.append(
+                    (
+                        child,
+                        depth + 1,
+                        (h_negative | ~(vertical | h_positive)) & mask,
+                        h_positive & vertical,
+                        child_score,
+                    )
+                )
+        return VariantMatch(best[0], best_variant)
+
+
+@lru_cache(maxsize=1024)
+def _compile(forms: tuple[str, ...]) -> VariantMatcher:
+    return VariantMatcher(forms)
+
+
+def target_matcher(
+    target_text: str,
+    transliteration: str | None = None,
+    variants: Iterable[str] = (),
+) -> VariantMatcher:
+    """Compiled matcher for an item, cached across attempts at the same item.
+
+    *target_text* comes first, so it wins ties; the transliteration and any
+    extra *variants* follow in the order given.
+    """
+    forms = [target_text, transliteration or "", *variants]
+    unique = tuple(dict.fromkeys(form.strip() for form in forms if form and form.strip()))
+    return _compile(unique)
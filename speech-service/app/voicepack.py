@@ -0,0 +1,310 @@
+"""Pre-rendered voice pack for a fixed curriculum.
+
+Most ``/synthesize`` traffic asks for the same known set of lesson phrases.
+A voice pack holds those clips, rendered once, as two files:
+
+``<name>.<build>.pack``
+    encoded clips (WAV as ``/synthesize`` returns it), back to back. Each
+    build writes a new data file under a fresh name.
+``<name>.idx``
+    a header, JSON metadata (backends, model ids, build time, and the name
+    and size of its data file), then a sorted array of 64-bit key prefixes
+    and a matching array of records: the rest of the key, the offset and
+    length in the data file, and the content type and backend.
+
+The index is the only file replaced in place, and it names its data file,
+so swapping it is a single atomic switch from one build to the next.
+
+Keys are a 128-bit BLAKE2b hash of the language and the NFC-normalized text
+(:func:`clip_key`). At startup the service memory-maps both files, so every
+uvicorn worker shares one copy through the page cache instead of holding the
+clips in its own synthesis cache. A lookup is a binary search over the
+mapped key array. A hit is a ``memoryview`` into the mapping, which
+``/synthesize`` sends without copying.
+
+Clips whose backend model differs from the current configuration are
+ignored, so a model upgrade never serves stale audio. Build a pack from
+``speech-service/``::
+
+    python -m app.voicepack --dataset ../data/ar_8020_msa_syrian.v1.json \\
+        --dataset benchmarks/corpus-targets.json --out voice-pack/voices
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from app.config import SETTINGS
+
+_SERVICE_DIR = Path(__file__).resolve().parent.parent
+_MAGIC = b"SVPK"
+_FORMAT_VERSION = 2
+# magic, format version, clip count, metadata length
+_HEADER = struct.Struct("<4sIII")
+_RECORD = np.dtype(
+    [("key_lo", "<u8"), ("offset", "<u8"), ("length", "<u4"), ("content_type", "<u2"), ("backend", "<u2")]
+)
+
+
+def clip_key(language: str, text: str) -> bytes:
+    """128-bit pack key for *text* in *language*."""
+    normalized = unicodedata.normalize("NFC", text.strip())
+    return hashlib.blake2b(f"{language}\0{normalized}".encode("utf-8"), digest_size=16).digest()
+
+
+def clip_id(language: str, text: str) -> str:
+    return clip_key(language, text).hex()
+
+
+def backend_models() -> dict[str, str]:
+    """Model id behind each TTS backend; a clip is only valid for the same id."""
+    return {
+        "qwen": SETTINGS.qwen_tts_model,
+        "artst": SETTINGS.artst_model,
+        "elevenlabs": f"{SETTINGS.elevenlabs_model_id}/{SETTINGS.elevenlabs_ar_voice_id}",
+    }
+
+
+def _split_key(key: bytes) -> tuple[int, int]:
+    return int.from_bytes(key[:8], "little"), int.from_bytes(key[8:], "little")
+
+
+def _align(value: int) -> int:
+    return (value + 7) & ~7
+
+
+@dataclass(frozen=True)
+class PackedClip:
+    data: memoryview
+    content_type: str
+    backend: str
+
+
+class VoicePack:
+    def __init__(self, base_path: Path) -> None:
+        self.base_path = base_path
+        index_path = base_path.with_suffix(".idx")
+        with open(index_path, "rb") as index_file:
+            self._index = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count, meta_length = _HEADER.unpack_from(self._index, 0)
+        if magic != _MAGIC or version != _FORMAT_VERSION:
+            raise ValueError(f"{index_path} is not a version {_FORMAT_VERSION} voice pack index")
+        meta_start = _HEADER.size
+        self.meta = json.loads(bytes(self._index[meta_start : meta_start + meta_length]))
+
+        data_path = base_path.parent / self.meta["dataFile"]
+        with open(data_path, "rb") as data_file:
+            size = os.fstat(data_file.fileno()).st_size
+            if size != self.meta["dataBytes"]:
+                raise ValueError(f"{data_path} is {size} bytes; the index expects {self.meta['dataBytes']}")
+            # mmap refuses empty files; a pack with no clips has nothing to map.
+            self._data = mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self.data_path = data_path
+        keys_start = _align(meta_start + meta_length)
+        self._keys = np.frombuffer(self._index, dtype="<u8", count=count, offset=keys_start)
+        self._records = np.frombuffer(self._index, dtype=_RECORD, count=count, offset=keys_start + 8 * count)
+        self._content_types: list[str] = self.meta["contentTypes"]
+        self._backends: list[str] = self.meta["backends"]
+
+        current = backend_models()
+        built_with = self.meta.get("models", {})
+        self._valid_backends = {
+            index for index, name in enumerate(self._backends) if built_with.get(name) == current.get(name)
+        }
+        if bool(self.meta.get("stubModels")) != SETTINGS.stub_models:
+            self._valid_backends = set()
+
+    def __len__(self) -> int:
+        return int(self._keys.size)
+
+    def lookup(self, language: str, text: str) -> PackedClip | None:
+        return self.lookup_key(clip_key(language, text))
+
+    def lookup_key(self, key: bytes) -> PackedClip | None:
+        key_hi, key_lo = _split_key(key)
+        index = int(np.searchsorted(self._keys, key_hi))
+        while index < self._keys.size and int(self._keys[index]) == key_hi:
+            record = self._records[index]
+            if int(record["key_lo"]) == key_lo:
+                backend = int(record["backend"])
+                if backend not in self._valid_backends or self._data is None:
+                    return None
+                start = int(record["offset"])
+                return PackedClip(
+                    data=memoryview(self._data)[start : start + int(record["length"])],
+                    content_type=self._content_types[int(record["content_type"])],
+                    backend=self._backends[backend],
+                )
+            index += 1
+        return None
+
+    def status(self) -> dict:
+        return {
+            "path": str(self.base_path),
+            "data_file": self.data_path.name,
+            "clips": len(self),
+            "bytes": len(self._data) if self._data is not None else 0,
+            "built_at": self.meta.get("builtAt"),
+            "valid_backends": sorted(self._backends[index] for index in self._valid_backends),
+        }
+
+
+def write_pack(base_path: Path, clips: dict[bytes, tuple[bytes, str, str]], meta: dict) -> None:
+    """Write *clips* (key -> audio, content type, backend) as a voice pack.
+
+    The data goes to a new, uniquely named file that no index refers to yet;
+    only then is the index renamed into place. A service starting at any
+    moment maps either the old build or the new one, never a mix. Data files
+    of earlier builds are removed afterwards (a running service keeps its
+    mapping of an unlinked file).
+    """
+    content_types = sorted({content_type for _, content_type, _ in clips.values()})
+    backends = sorted({backend for _, _, backend in clips.values()})
+    data_name = f"{base_path.name}.{time.strftime('%Y%m%d%H%M%S', time.gmtime())}-{os.urandom(4).hex()}.pack"
+    meta = {**meta, "contentTypes": content_types, "backends": backends, "dataFile": data_name}
+
+    ordered = sorted(clips.items(), key=lambda item: _split_key(item[0]))
+    keys = np.zeros(len(ordered), dtype="<u8")
+    records = np.zeros(len(ordered), dtype=_RECORD)
+    base_path.parent.mkdir(parents=True, exist_ok=True)
+    data_path = base_path.parent / data_name
+    index_path = base_path.with_suffix(".idx")
+
+    offset = 0
+    with open(data_path, "wb") as data_file:
+        for position, (key, (audio, content_type, backend)) in enumerate(ordered):
+            keys[position], records[position]["key_lo"] = _split_key(key)
+            records[position]["offset"] = offset
+            records[position]["length"] = len(audio)
+            records[position]["content_type"] = content_types.index(content_type)
+            records[position]["backend"] = backends.index(backend)
+            data_file.write(audio)
+            offset += len(audio)
+        data_file.flush()
+        os.fsync(data_file.fileno())
+    meta["dataBytes"] = offset
+
+    meta_bytes = json.dumps(meta, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    header = _HEADER.pack(_MAGIC, _FORMAT_VERSION, len(ordered), len(meta_bytes))
+    padding = b"\0" * (_align(len(header) + len(meta_bytes)) - len(header) - len(meta_bytes))
+    temp_index = index_path.with_suffix(".idx.tmp")
+    temp_index.write_bytes(header + meta_bytes + padding + keys.tobytes() + records.tobytes())
+
+    os.replace(temp_index, index_path)
+
+    for stale in base_path.parent.glob(f"{base_path.name}.*.pack"):
+        if stale.name != data_name:
+            stale.unlink(missing_ok=True)
+
+
+def resolve_pack_path() -> Path | None:
+    if not SETTINGS.voice_pack_path:
+        return None
+    path = Path(SETTINGS.voice_pack_path)
+    return path if path.is_absolute() else _SERVICE_DIR / path
+
+
+def load_voice_pack() -> VoicePack | None:
+    path = resolve_pack_path()
+    if path is None or not path.with_suffix(".idx").exists():
+        return None
+    try:
+        return VoicePack(path)
+    except (OSError, ValueError, KeyError) as exc:
+        # A broken pack only costs the fast path, never startup.
+        print(f"[voicepack] ignoring {path}: {exc}", file=sys.stderr, flush=True)
+        return None
+
+
+voice_pack = load_voice_pack()
+
+
+# ---------------------------------------------------------------------------
+# Building
+# ---------------------------------------------------------------------------
+
+def dataset_phrases(path: Path) -> list[tuple[str, str]]:
+    """(language, text) pairs the app synthesizes for a dataset file.
+
+    Reads the curriculum format (``data/*.json``: ``concepts`` with ``msa``
+    and ``syrian`` forms; MSA is synthesized vowelled when available, as the
+    target-audio routes do) and the ``benchmarks/corpus-targets.json`` format.
+    """
+    raw = json.loads(path.read_text(encoding="utf-8"))
+    phrases: list[tuple[str, str]] = []
+    for concept in raw.get("concepts", []):
+        msa = concept.get("msa") or {}
+        for text in (msa.get("vowelledText"), msa.get("scriptText"), (concept.get("syrian") or {}).get("scriptText")):
+            if text:
+                phrases.append(("ar", text))
+    for target in raw.get("targets", []):
+        phrases.append((target["language"], target["targetText"]))
+    return phrases
+
+
+async def _render(phrases: list[tuple[str, str]]) -> tuple[dict[bytes, tuple[bytes, str, str]], list[dict]]:
+    from app.scheduler import priority_scope
+    from app.tts import TtsError, synthesize
+
+    clips: dict[bytes, tuple[bytes, str, str]] = {}
+    failures: list[dict] = []
+    with priority_scope("background"):
+        for index, (language, text) in enumerate(phrases, start=1):
+            key = clip_key(language, text)
+            if key in clips:
+                continue
+            try:
+                # Unchanged clips come straight from the current pack.
+                result = await synthesize(text, language)
+            except TtsError as exc:
+                failures.append({"language": language, "text": text, "error": str(exc)})
+                print(f"[voicepack] {language} {text!r}: {exc}", file=sys.stderr, flush=True)
+                continue
+            clips[key] = (bytes(result.audio_bytes), result.content_type, result.backend)
+            print(f"[voicepack] {index}/{len(phrases)} {language} {text}", file=sys.stderr, flush=True)
+    return clips, failures
+
+
+def build_pack(datasets: list[Path], out: Path, languages: set[str]) -> dict:
+    phrases = [phrase for path in datasets for phrase in dataset_phrases(path) if phrase[0] in languages]
+    clips, failures = asyncio.run(_render(phrases))
+    meta = {
+        "builtAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "datasets": [path.name for path in datasets],
+        "models": backend_models(),
+        "stubModels": SETTINGS.stub_models,
+        "failures": failures,
+    }
+    write_pack(out, clips, meta)
+    return {"clips": len(clips), "bytes": sum(len(audio) for audio, _, _ in clips.values()), "failures": len(failures)}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Pre-render curriculum audio into a voice pack.")
+    parser.add_argument("--dataset", type=Path, action="append", required=True, help="curriculum or targets JSON")
+    parser.add_argument("--out", type=Path, default=resolve_pack_path() or _SERVICE_DIR / "voice-pack" / "voices")
+    parser.add_argument("--languages", default="zh,ar")
+    args = parser.parse_args(argv)
+
+    languages = {language.strip() for language in args.languages.split(",") if language.strip()}
+    summary = build_pack(args.dataset, args.out, languages)
+    print(json.dumps(summary))
+    return 1 if summary["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
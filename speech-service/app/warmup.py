@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from threading import Lock
+
+from app.config import SETTINGS
+from app.ffmpeg import resolve_ffmpeg_command
+from app.pipeline import score_audio_file
+from app.scheduler import priority_scope
+from app.stt import transcriber
+from app.tts import (
+    TtsError,
+    backend_available,
+    backend_loaded,
+    resolve_backends,
+    synthesize_with_backend,
+    warmup_backend,
+)
+
+LANGUAGES = ("ar", "zh")
+_SERVICE_DIR = Path(__file__).resolve().parents[1]
+
+
+@dataclass
+class ComponentStatus:
+    ready: bool = False
+    error: str | None = None
+    seconds: float | None = None
+
+
+@dataclass
+class WarmupUtterance:
+    language: str
+    text: str
+    transliteration: str | None = None
+    audio_path: str | None = None
+
+
+@dataclass
+class WarmupManifest:
+    languages: tuple[str, ...]
+    # Per-language TTS backends to load and prime; missing means the
+    # backends /synthesize would use.
+    backends: dict[str, list[str]] = field(default_factory=dict)
+    utterances: list[WarmupUtterance] = field(default_factory=list)
+
+
+_status: dict[tuple[str, str], ComponentStatus] = {}
+_status_lock = Lock()
+_run_state = {"state": "pending", "seconds": None}
+
+
+def _run_component(language: str, component: str, action: Callable[[], object]) -> None:
+    started = time.perf_counter()
+    try:
+        action()
+    except Exception as exc:
+        status = ComponentStatus(ready=False, error=str(exc) or type(exc).__name__)
+    else:
+        status = ComponentStatus(ready=True)
+    status.seconds = round(time.perf_counter() - started, 3)
+
+    with _status_lock:
+        _status[(language, component)] = status
+
+
+def _require_ffmpeg() -> None:
+    if not resolve_ffmpeg_command():
+        raise RuntimeError("`ffmpeg` not found in PATH or FFMPEG_PATH.")
+
+
+def warmup_language(language: str, backends: list[str] | None = None) -> None:
+    """Load every component *language* needs, recording per-component status."""
+    _run_component(language, "ffmpeg", _require_ffmpeg)
+    _run_component(language, "whisper", lambda: transcriber.warmup(language))
+
+    if backends is None:
+        try:
+            backends = resolve_backends(language)
+        except TtsError as exc:
+            with _status_lock:
+                _status[(language, "tts")] = ComponentStatus(ready=False, error=str(exc))
+            return
+
+    for backend in backends:
+        _run_component(language, f"tts:{backend}", lambda backend=backend: warmup_backend(backend))
+
+
+def load_manifest(path: Path) -> WarmupManifest:
+    raw = json.loads(path.read_text(encoding="utf-8"))
+    utterances = [
+        WarmupUtterance(
+            language=item["language"],
+            text=item["text"],
+            transliteration=item.get("transliteration"),
+            audio_path=item.get("audioPath"),
+        )
+        for item in raw.get("utterances", [])
+    ]
+    languages = tuple(raw.get("languages") or sorted({item.language for item in utterances}))
+    return WarmupManifest(
+        languages=languages,
+        backends={language: list(names) for language, names in (raw.get("backends") or {}).items()},
+        utterances=utterances,
+    )
+
+
+def resolve_manifest_path() -> Path | None:
+    if not SETTINGS.warmup_manifest:
+        return None
+    path = Path(SETTINGS.warmup_manifest)
+    if not path.is_absolute():
+        path = _SERVICE_DIR / path
+    return path if path.exists() else None
+
+
+def _prime_utterance(utterance: WarmupUtterance, backends: list[str]) -> None:
+    # Synthesis primes the TTS graphs; scoring the result then runs ffmpeg,
+    # librosa (numba-compiled onset/pYIN code) and every Whisper pass on real
+    # speech, so the first learner request doesn't pay for kernel selection,
+    # JIT compilation or allocator growth.
+    language = utterance.language
+    synthesized: list[bytes] = []
+
+    for backend in backends:
+        def synthesize_once(backend: str = backend) -> None:
+            result = asyncio.run(synthesize_with_backend(utterance.text, language, backend))
+            synthesized.append(result.audio_bytes)
+
+        _run_component(language, f"prime:synthesize:{backend}", synthesize_once)
+
+    if utterance.audio_path:
+        audio_path = Path(utterance.audio_path)
+        if not audio_path.is_absolute():
+            audio_path = _SERVICE_DIR / audio_path
+        _run_component(
+            language,
+            "prime:score",
+            lambda: score_audio_file(audio_path, language, utterance.text, utterance.transliteration),
+        )
+        return
+
+    if not synthesized:
+        return
+
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
+        temp_path = Path(temp_file.name)
+        temp_file.write(synthesized[0])
+    try:
+        _run_component(
+            language,
+            "prime:score",
+            lambda: score_audio_file(temp_path, language, utterance.text, utterance.transliteration),
+        )
+    finally:
+        temp_path.unlink(missing_ok=True)
+
+
+def run_warmup(manifest_path: Path | None) -> None:
+    """Load models and, with a manifest, prime the full synth/score paths.
+
+    A manifest that fails to parse is recorded as a failed ``manifest`` step
+    and warmup falls back to ``WARMUP_LANGUAGES``.
+    """
+    started = time.perf_counter()
+    _run_state.update(state="running", seconds=None)
+    # Priming synthesizes through the scheduler: at background priority it
+    # can never take the slot reserved for a learner's first request.
+    try:
+        with priority_scope("background"):
+            manifests: list[WarmupManifest] = []
+            if manifest_path is not None:
+                _run_component("all", "manifest", lambda: manifests.append(load_manifest(manifest_path)))
+            manifest = manifests[0] if manifests else None
+            if manifest is None:
+                for language in SETTINGS.warmup_languages:
+                    warmup_language(language)
+                return
+
+            for language in manifest.languages:
+                warmup_language(language, manifest.backends.get(language))
+
+            for utterance in manifest.utterances:
+                if utterance.language not in manifest.languages:
+                    continue
+                backends = manifest.backends.get(utterance.language)
+                if backends is None:
+                    try:
+                        backends = resolve_backends(utterance.language)[:1]
+                    except TtsError:
+                        backends = []
+                _prime_utterance(utterance, backends)
+    finally:
+        _run_state.update(state="done", seconds=round(time.perf_counter() - started, 3))
+
+
+def warmup_report() -> dict:
+    with _status_lock:
+        steps = [
+            {
+                "language": language,
+                "component": component,
+                "ok": status.ready,
+                "error": status.error,
+                "seconds": status.seconds,
+            }
+            for (language, component), status in _status.items()
+        ]
+    return {**_run_state, "steps": steps}
+
+
+def _component_state(language: str, component: str) -> tuple[bool, bool]:
+    """Return ``(ready, loaded)``; idle-unloaded models stay ready (they reload on demand)."""
+    if component == "ffmpeg":
+        found = resolve_ffmpeg_command() is not None
+        return found, found
+    if component == "whisper":
+        return transcriber.is_available(language), transcriber.is_loaded(language)
+    if component.startswith("tts:"):
+        backend = component.removeprefix("tts:")
+        return backend_available(backend), backend_loaded(backend)
+    return False, False
+
+
+def readiness_report(languages: tuple[str, ...] = LANGUAGES) -> dict:
+    """Per-language, per-component readiness.
+
+    ``ready`` reflects the live state (a model loaded lazily by a request
+    counts); ``error`` and ``seconds`` come from the last warmup attempt.
+    """
+    report: dict[str, dict] = {}
+    for language in languages:
+        try:
+            tts_components = [f"tts:{backend}" for backend in resolve_backends(language)]
+        except TtsError:
+            tts_components = ["tts"]
+
+        components: dict[str, dict] = {}
+        for component in ("ffmpeg", "whisper", *tts_components):
+            with _status_lock:
+                recorded = _status.get((language, component))
+            ready, loaded = _component_state(language, component)
+            components[component] = {
+                "ready": ready,
+                "loaded": loaded,
+                "error": recorded.error if recorded else None,
+                "warmup_seconds": recorded.seconds if recorded else None,
+            }
+
+        report[language] = {
+            "ready": all(component["ready"] for component in components.values()),
+            "components": components,
+        }
+    return report
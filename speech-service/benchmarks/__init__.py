@@ -0,0 +1 @@
+"""Speech service benchmarks."""
@@ -0,0 +1,341 @@
+"""Calibrate Whisper runtime and beam settings for the current host.
+
+Runs a fixture corpus (``benchmarks.corpus`` output or the smoke set)
+through ``WhisperTranscriber`` in two stages:
+
+1. runtime sweep: every ``compute_type`` x ``cpu_threads`` x ``num_workers``
+   combination with the configured beam ladders, ``num_workers`` clips in
+   flight at a time;
+2. ladder sweep: with the best runtime, each beam/best_of ladder per language.
+
+Each stage prints a latency-vs-accuracy table with its Pareto front marked.
+The recommended settings (the fastest p95 within ``--accuracy-tolerance`` of
+the most accurate configuration) are written as an env file.
+
+Run from ``speech-service/``::
+
+    python -m benchmarks.calibrate --dataset benchmarks/corpus/manifest.json --env-out whisper.env
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+
+from benchmarks.startup import SERVICE_DIR, resolve_audio_path
+
+
+@dataclass(frozen=True)
+class Ladder:
+    name: str
+    beam_size: int
+    best_of: int
+    fallback_beam_size: int
+    fallback_best_of: int
+
+
+LADDERS = (
+    Ladder("greedy", 1, 1, 2, 2),
+    Ladder("narrow", 2, 2, 3, 3),
+    Ladder("default", 3, 3, 5, 5),
+    Ladder("wide", 5, 5, 8, 8),
+)
+
+
+@dataclass
+class PreparedEntry:
+    id: str
+    language: str
+    target_text: str
+    transliteration: str | None
+    expected: str
+    path: Path
+
+
+def prepare_entries(dataset: Path, languages: set[str], limit: int) -> list[PreparedEntry]:
+    """Decode and boost each clip once, as ``/score`` does before transcription."""
+    from app.audio import boost_quiet_signal, load_audio_for_scoring, write_temp_wav
+
+    per_language: dict[str, int] = {}
+    entries: list[PreparedEntry] = []
+    for item in json.loads(dataset.read_text(encoding="utf-8")):
+        language = item["language"]
+        if language not in languages or (limit and per_language.get(language, 0) >= limit):
+            continue
+        per_language[language] = per_language.get(language, 0) + 1
+        signal, sample_rate = load_audio_for_scoring(resolve_audio_path(dataset, item["audioPath"]))
+        entries.append(
+            PreparedEntry(
+                id=str(item.get("id") or len(entries)),
+                language=language,
+                target_text=item["targetText"],
+                transliteration=item.get("transliteration"),
+                expected=item.get("expectedTranscript") or item["targetText"],
+                path=write_temp_wav(boost_quiet_signal(signal), int(sample_rate)),
+            )
+        )
+    return entries
+
+
+def _percentile_ms(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return round(ordered[index] * 1000, 1)
+
+
+def run_entries(transcriber, entries: list[PreparedEntry], concurrency: int) -> dict:
+    from app.text_utils import normalize_text, similarity_score
+
+    def one(entry: PreparedEntry) -> tuple[float, float]:
+        started = time.perf_counter()
+        result = transcriber.transcribe(
+            str(entry.path),
+            language=entry.language,
+            target_text=entry.target_text,
+            transliteration=entry.transliteration,
+        )
+        elapsed = time.perf_counter() - started
+        return elapsed, similarity_score(normalize_text(result.transcript), normalize_text(entry.expected))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(one, entries))
+    wall = time.perf_counter() - started
+
+    latencies = [latency for latency, _ in outcomes]
+    similarities = [similarity for _, similarity in outcomes]
+    return {
+        "p50_ms": _percentile_ms(latencies, 0.50),
+        "p95_ms": _percentile_ms(latencies, 0.95),
+        "throughput": round(len(entries) / wall, 3) if wall else 0.0,
+        "accuracy": round(sum(similarities) / len(similarities), 2),
+        "exact_rate": round(sum(1 for value in similarities if value >= 100.0) / len(similarities), 3),
+    }
+
+
+def mark_pareto(rows: list[dict]) -> None:
+    """Flag rows no other row beats on both p95 latency and accuracy."""
+    valid = [row for row in rows if "error" not in row]
+    for row in valid:
+        row["pareto"] = not any(
+            other is not row
+            and other["p95_ms"] <= row["p95_ms"]
+            and other["accuracy"] >= row["accuracy"]
+            and (other["p95_ms"] < row["p95_ms"] or other["accuracy"] > row["accuracy"])
+            for other in valid
+        )
+
+
+def recommend(rows: list[dict], tolerance: float) -> dict | None:
+    valid = [row for row in rows if "error" not in row]
+    if not valid:
+        return None
+    best_accuracy = max(row["accuracy"] for row in valid)
+    candidates = [row for row in valid if row["accuracy"] >= best_accuracy - tolerance]
+    return min(candidates, key=lambda row: (row["p95_ms"], -row["accuracy"]))
+
+
+def _ladder_settings(settings, ladder: Ladder, language: str):
+    if language == "zh":
+        return replace(
+            settings,
+            whisper_zh_beam_size=ladder.beam_size,
+            whisper_zh_best_of=ladder.best_of,
+            whisper_zh_fallback_beam_size=ladder.fallback_beam_size,
+            whisper_zh_fallback_best_of=ladder.fallback_best_of,
+        )
+    return replace(
+        settings,
+        whisper_beam_size=ladder.beam_size,
+        whisper_best_of=ladder.best_of,
+        whisper_fallback_beam_size=ladder.fallback_beam_size,
+        whisper_fallback_best_of=ladder.fallback_best_of,
+    )
+
+
+def _static_policy():
+    from app.decode_policy import DecodePolicy
+
+    # Measure the configured static rules; calibration runs must not feed
+    # (or be steered by) the service's learned decode policy.
+    return DecodePolicy(path=None, min_samples=0, min_gain_per_second=0.0, explore=0.0, enabled=False)
+
+
+def sweep_runtime(
+    entries: list[PreparedEntry],
+    compute_types: list[str],
+    thread_counts: list[int],
+    worker_counts: list[int],
+) -> list[dict]:
+    from app.config import SETTINGS
+    from app.models import ModelManager
+    from app.stt import WhisperTranscriber
+
+    policy = _static_policy()
+    rows: list[dict] = []
+    for compute_type in compute_types:
+        for threads in thread_counts:
+            for workers in worker_counts:
+                row: dict = {"compute_type": compute_type, "cpu_threads": threads, "num_workers": workers}
+                settings = replace(
+                    SETTINGS,
+                    whisper_compute_type=compute_type,
+                    whisper_cpu_threads=threads,
+                    whisper_num_workers=workers,
+                )
+                # A private manager per combination: models load with these
+                # settings and are unloaded before the next one. Dropping the
+                # transcriber is not enough: the manager's loaders reference
+                # it, so the models would live until a cyclic GC.
+                manager = ModelManager(budget_bytes=0, idle_seconds=0)
+                transcriber = WhisperTranscriber(manager, settings, policy)
+                try:
+                    load_started = time.perf_counter()
+                    for language in sorted({entry.language for entry in entries}):
+                        transcriber.warmup(language)
+                    row["load_seconds"] = round(time.perf_counter() - load_started, 2)
+                    row.update(run_entries(transcriber, entries, concurrency=workers))
+                except Exception as exc:
+                    # e.g. a compute type this CPU does not support.
+                    row["error"] = str(exc) or type(exc).__name__
+                finally:
+                    manager.unload_all()
+                rows.append(row)
+                print(f"[calibrate] runtime {json.dumps(row)}", file=sys.stderr, flush=True)
+    mark_pareto(rows)
+    return rows
+
+
+def sweep_ladders(entries: list[PreparedEntry], runtime: dict) -> dict[str, list[dict]]:
+    from app.config import SETTINGS
+    from app.models import ModelManager
+    from app.stt import WhisperTranscriber
+
+    base = replace(
+        SETTINGS,
+        whisper_compute_type=runtime["compute_type"],
+        whisper_cpu_threads=runtime["cpu_threads"],
+        whisper_num_workers=runtime["num_workers"],
+    )
+    manager = ModelManager(budget_bytes=0, idle_seconds=0)
+    tables: dict[str, list[dict]] = {}
+    for language in sorted({entry.language for entry in entries}):
+        subset = [entry for entry in entries if entry.language == language]
+        rows = []
+        for ladder in LADDERS:
+            transcriber = WhisperTranscriber(manager, _ladder_settings(base, ladder, language), _static_policy())
+            row = asdict(ladder)
+            row.update(run_entries(transcriber, subset, concurrency=runtime["num_workers"]))
+            rows.append(row)
+            print(f"[calibrate] {language} ladder {json.dumps(row)}", file=sys.stderr, flush=True)
+        mark_pareto(rows)
+        tables[language] = rows
+    return tables
+
+
+def format_table(rows: list[dict], columns: list[str]) -> str:
+    header = [*columns, "p50_ms", "p95_ms", "throughput", "accuracy", "exact_rate", "pareto"]
+    lines = ["| " + " | ".join(header) + " |", "|" + "---|" * len(header)]
+    for row in rows:
+        if "error" in row:
+            cells = [str(row[column]) for column in columns] + [f"error: {row['error']}"] + [""] * 5
+        else:
+            cells = [str(row.get(column, "")) for column in header[:-1]] + ["*" if row.get("pareto") else ""]
+        lines.append("| " + " | ".join(cells) + " |")
+    return "\n".join(lines)
+
+
+def env_lines(runtime: dict, ladders: dict[str, dict]) -> list[str]:
+    lines = [
+        f"# Calibrated on {platform.node()} ({platform.machine()}, {os.cpu_count()} CPUs) "
+        f"{time.strftime('%Y-%m-%d')}",
+        f'WHISPER_COMPUTE_TYPE="{runtime["compute_type"]}"',
+        f'WHISPER_CPU_THREADS="{runtime["cpu_threads"]}"',
+        f'WHISPER_NUM_WORKERS="{runtime["num_workers"]}"',
+    ]
+    for language, row in sorted(ladders.items()):
+        prefix = "WHISPER_ZH_" if language == "zh" else "WHISPER_"
+        lines += [
+            f'{prefix}BEAM_SIZE="{row["beam_size"]}"',
+            f'{prefix}BEST_OF="{row["best_of"]}"',
+            f'{prefix}FALLBACK_BEAM_SIZE="{row["fallback_beam_size"]}"',
+            f'{prefix}FALLBACK_BEST_OF="{row["fallback_best_of"]}"',
+        ]
+    return lines
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def _default_threads() -> str:
+    cores = os.cpu_count() or 1
+    return ",".join(str(count) for count in sorted({1, 2, 4, cores}) if count <= cores)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Sweep Whisper runtime and beam settings on this host.")
+    parser.add_argument("--dataset", type=Path, default=SERVICE_DIR / "benchmarks" / "corpus" / "manifest.json")
+    parser.add_argument("--languages", default="zh,ar")
+    parser.add_argument("--limit", type=int, default=0, help="max clips per language (0 = all)")
+    parser.add_argument("--compute-types", default="int8,int8_float32,float32")
+    parser.add_argument("--threads", default=_default_threads(), help="cpu_threads values to try")
+    parser.add_argument("--workers", default="1,2", help="num_workers values to try")
+    parser.add_argument("--accuracy-tolerance", type=float, default=1.0, help="accuracy points to trade for speed")
+    parser.add_argument("--env-out", type=Path, default=None, help="write the recommended settings here")
+    parser.add_argument("--out", type=Path, default=None, help="also write the full result JSON here")
+    args = parser.parse_args(argv)
+
+    languages = {language.strip() for language in args.languages.split(",") if language.strip()}
+    entries = prepare_entries(args.dataset, languages, args.limit)
+    if not entries:
+        print(f"[calibrate] no entries for {sorted(languages)} in {args.dataset}", file=sys.stderr)
+        return 1
+    try:
+        runtime_rows = sweep_runtime(
+            entries,
+            [item.strip() for item in args.compute_types.split(",") if item.strip()],
+            _int_list(args.threads),
+            _int_list(args.workers),
+        )
+        runtime = recommend(runtime_rows, args.accuracy_tolerance)
+        if runtime is None:
+            print("[calibrate] every runtime configuration failed", file=sys.stderr)
+            return 1
+        ladder_tables = sweep_ladders(entries, runtime)
+    finally:
+        for entry in entries:
+            entry.path.unlink(missing_ok=True)
+
+    ladders = {
+        language: recommend(rows, args.accuracy_tolerance) for language, rows in ladder_tables.items()
+    }
+    print("## Runtime (all languages, configured ladders)\n")
+    print(format_table(runtime_rows, ["compute_type", "cpu_threads", "num_workers"]))
+    for language, rows in ladder_tables.items():
+        print(f"\n## Beam ladders: {language}\n")
+        print(format_table(rows, ["name", "beam_size", "best_of", "fallback_beam_size", "fallback_best_of"]))
+
+    recommended = env_lines(runtime, {language: row for language, row in ladders.items() if row})
+    print("\n## Recommended\n")
+    print("\n".join(recommended))
+    if args.env_out:
+        args.env_out.write_text("\n".join(recommended) + "\n", encoding="utf-8")
+    if args.out:
+        args.out.write_text(
+            json.dumps({"runtime": runtime_rows, "ladders": ladder_tables, "recommended": recommended}, indent=2)
+            + "\n",
+            encoding="utf-8",
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
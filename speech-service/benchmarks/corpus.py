@@ -0,0 +1,215 @@
+"""Render a versioned synthetic fixture corpus with the service's own TTS.
+
+Each curriculum target in ``benchmarks/corpus-targets.json`` is synthesized
+once per language backend, converted to 16 kHz mono, and written in a fixed
+set of variants: clean, silence padding, white noise at several SNRs, tempo
+changes and gain changes. Variants are seeded from the entry id, so re-running
+on the same TTS output reproduces the corpus byte for byte.
+
+Run from ``speech-service/``::
+
+    python -m benchmarks.corpus --out benchmarks/corpus
+
+The output directory holds ``manifest.json``, a JSON array in the smoke-set
+entry shape (``audioPath`` relative to the manifest), which ``benchmarks.*``
+and ``app.batch_score`` accept directly, plus ``corpus.json`` with the
+version, backends and the SHA-256 of every clip.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import sys
+import time
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.startup import SERVICE_DIR
+
+SAMPLE_RATE = 16000
+DEFAULT_TARGETS = SERVICE_DIR / "benchmarks" / "corpus-targets.json"
+# Bump when variant definitions or rendering change, so corpora built by
+# different generator versions are never compared as equals.
+GENERATOR_VERSION = "1"
+
+
+@dataclass(frozen=True)
+class Variant:
+    name: str
+    kind: str
+    params: dict = field(default_factory=dict)
+
+
+VARIANTS = (
+    Variant("clean", "clean"),
+    Variant("pad", "pad", {"lead_seconds": 0.6, "tail_seconds": 1.2}),
+    Variant("snr20", "noise", {"snr_db": 20.0}),
+    Variant("snr10", "noise", {"snr_db": 10.0}),
+    Variant("snr5", "noise", {"snr_db": 5.0}),
+    Variant("tempo085", "tempo", {"rate": 0.85}),
+    Variant("tempo115", "tempo", {"rate": 1.15}),
+    Variant("gain-20db", "gain", {"gain_db": -20.0}),
+    Variant("gain+6db", "gain", {"gain_db": 6.0}),
+)
+
+
+def apply_variant(audio: np.ndarray, variant: Variant, seed: int) -> np.ndarray:
+    import librosa
+
+    params = variant.params
+    if variant.kind == "pad":
+        lead = np.zeros(int(params["lead_seconds"] * SAMPLE_RATE), dtype=np.float32)
+        tail = np.zeros(int(params["tail_seconds"] * SAMPLE_RATE), dtype=np.float32)
+        out = np.concatenate([lead, audio, tail])
+    elif variant.kind == "noise":
+        rms = float(np.sqrt(np.mean(np.square(audio)))) or 1e-4
+        noise_rms = rms / 10 ** (params["snr_db"] / 20)
+        out = audio + np.random.default_rng(seed).normal(0.0, noise_rms, audio.size)
+    elif variant.kind == "tempo":
+        out = librosa.effects.time_stretch(audio, rate=params["rate"])
+    elif variant.kind == "gain":
+        out = audio * 10 ** (params["gain_db"] / 20)
+    else:
+        out = audio
+    return np.clip(out, -1.0, 1.0).astype(np.float32)
+
+
+def _seed(entry_id: str, variant: str) -> int:
+    return zlib.crc32(f"{entry_id}|{variant}".encode("utf-8"))
+
+
+def _render_target(text: str, language: str, backend: str) -> np.ndarray:
+    import librosa
+    import soundfile as sf
+
+    from app.tts import synthesize_with_backend
+
+    result = asyncio.run(synthesize_with_backend(text, language, backend))
+    signal, sample_rate = sf.read(io.BytesIO(result.audio_bytes), dtype="float32", always_2d=True)
+    signal = signal.mean(axis=1)
+    if sample_rate != SAMPLE_RATE:
+        signal = librosa.resample(signal, orig_sr=sample_rate, target_sr=SAMPLE_RATE)
+    return signal.astype(np.float32)
+
+
+def _wav_bytes(audio: np.ndarray) -> bytes:
+    import soundfile as sf
+
+    out = io.BytesIO()
+    sf.write(out, audio, SAMPLE_RATE, format="WAV", subtype="PCM_16")
+    return out.getvalue()
+
+
+def build_corpus(
+    targets_path: Path,
+    out_dir: Path,
+    languages: set[str],
+    backend_override: str | None = None,
+) -> dict:
+    from app.config import SETTINGS
+    from app.tts import TtsError, resolve_backends
+
+    spec = json.loads(targets_path.read_text(encoding="utf-8"))
+    targets = [target for target in spec["targets"] if target["language"] in languages]
+
+    backends: dict[str, str] = {}
+    for language in sorted(languages):
+        backends[language] = backend_override or resolve_backends(language)[0]
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    entries: list[dict] = []
+    failures: list[dict] = []
+    for index, target in enumerate(targets, start=1):
+        language = target["language"]
+        try:
+            base = _render_target(target["targetText"], language, backends[language])
+        except TtsError as exc:
+            failures.append({"id": target["id"], "error": str(exc)})
+            print(f"[corpus] {target['id']}: {exc}", file=sys.stderr, flush=True)
+            continue
+
+        for variant in VARIANTS:
+            audio = apply_variant(base, variant, _seed(target["id"], variant.name))
+            data = _wav_bytes(audio)
+            relative = Path(language) / f"{target['id']}__{variant.name}.wav"
+            (out_dir / relative).parent.mkdir(parents=True, exist_ok=True)
+            (out_dir / relative).write_bytes(data)
+            entries.append(
+                {
+                    "id": f"{target['id']}__{variant.name}",
+                    "language": language,
+                    "targetText": target["targetText"],
+                    "expectedTranscript": target["targetText"],
+                    "transliteration": target.get("transliteration"),
+                    "audioPath": relative.as_posix(),
+                    "variant": variant.name,
+                    "variantParams": variant.params,
+                    "durationSeconds": round(audio.size / SAMPLE_RATE, 3),
+                    "sha256": hashlib.sha256(data).hexdigest(),
+                }
+            )
+        print(f"[corpus] {index}/{len(targets)} {target['id']}", file=sys.stderr, flush=True)
+
+    (out_dir / "manifest.json").write_text(
+        json.dumps(entries, ensure_ascii=False, indent=2) + "\n", encoding="utf-8"
+    )
+    info = {
+        "corpusVersion": f"{spec['version']}.{GENERATOR_VERSION}",
+        "targetsVersion": spec["version"],
+        "generatorVersion": GENERATOR_VERSION,
+        "generatedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "sampleRate": SAMPLE_RATE,
+        "backends": backends,
+        # Stub-model clips are tones, useful for plumbing tests only.
+        "stubModels": SETTINGS.stub_models,
+        "variants": [{"name": variant.name, "kind": variant.kind, **variant.params} for variant in VARIANTS],
+        "entries": len(entries),
+        "failures": failures,
+        "clips": {entry["id"]: entry["sha256"] for entry in entries},
+    }
+    (out_dir / "corpus.json").write_text(json.dumps(info, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    return info
+
+
+def verify_corpus(out_dir: Path) -> list[str]:
+    """Return ids of clips that are missing or differ from the recorded hashes."""
+    info = json.loads((out_dir / "corpus.json").read_text(encoding="utf-8"))
+    manifest = json.loads((out_dir / "manifest.json").read_text(encoding="utf-8"))
+    paths = {entry["id"]: out_dir / entry["audioPath"] for entry in manifest}
+    mismatched = []
+    for entry_id, digest in info["clips"].items():
+        path = paths.get(entry_id)
+        if path is None or not path.exists() or hashlib.sha256(path.read_bytes()).hexdigest() != digest:
+            mismatched.append(entry_id)
+    return mismatched
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Render the synthetic benchmark corpus.")
+    parser.add_argument("--targets", type=Path, default=DEFAULT_TARGETS)
+    parser.add_argument("--out", type=Path, default=SERVICE_DIR / "benchmarks" / "corpus")
+    parser.add_argument("--languages", default="zh,ar")
+    parser.add_argument("--backend", default=None, help="force one TTS backend for every language")
+    parser.add_argument("--verify", action="store_true", help="check an existing corpus against its hashes")
+    args = parser.parse_args(argv)
+
+    if args.verify:
+        mismatched = verify_corpus(args.out)
+        print(json.dumps({"corpus": str(args.out), "mismatched": mismatched}))
+        return 1 if mismatched else 0
+
+    languages = {language.strip() for language in args.languages.split(",") if language.strip()}
+    info = build_corpus(args.targets, args.out, languages, backend_override=args.backend)
+    print(json.dumps({key: info[key] for key in ("corpusVersion", "backends", "entries", "failures")}))
+    return 1 if info["failures"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
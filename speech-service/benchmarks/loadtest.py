@@ -0,0 +1,355 @@
+"""Concurrent load test for ``/score`` and ``/synthesize``.
+
+Replays a smoke-set manifest (or synthetic clips when there is none) at a
+fixed concurrency (closed loop) or a Poisson arrival rate (open loop), and
+reports throughput, p50/p95/p99 latency and error rate per endpoint.
+
+Run from ``speech-service/``::
+
+    # against a running service
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000 --concurrency 8 --duration 60
+
+    # start a stub-model service (no model weights) and drive it at 5 req/s
+    python -m benchmarks.loadtest --spawn --stub --rate 5 --duration 60
+
+In open-loop mode latency is measured from each request's scheduled arrival,
+so time spent queued behind ``--concurrency`` in-flight requests counts
+(no coordinated omission).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from benchmarks.startup import (
+    SERVICE_DIR,
+    _free_port,
+    _status,
+    _wait_until,
+    encode_multipart,
+    resolve_audio_path,
+    score_fields,
+)
+
+
+@dataclass
+class RequestSpec:
+    endpoint: str
+    path: str
+    body: bytes
+    content_type: str
+
+
+def vary_text(spec: RequestSpec, index: int) -> RequestSpec:
+    """Make a synthesize request unique so it misses the synthesis cache."""
+    if spec.endpoint != "synthesize":
+        return spec
+    payload = json.loads(spec.body)
+    payload["text"] = f"{payload['text']} {index}"
+    return RequestSpec(spec.endpoint, spec.path, json.dumps(payload).encode("utf-8"), spec.content_type)
+
+
+@dataclass
+class Sample:
+    endpoint: str
+    status: int
+    seconds: float
+    error: str | None = None
+
+
+def _synthetic_entries(work_dir: Path) -> list[dict]:
+    import soundfile as sf
+
+    from benchmarks.micro import SAMPLE_RATE, synthetic_speech
+
+    manifest = json.loads((SERVICE_DIR / "warmup.json").read_text(encoding="utf-8"))
+    entries = []
+    for index, utterance in enumerate(manifest.get("utterances", [])):
+        audio, _ = synthetic_speech(1.5, seed=index)
+        path = work_dir / f"synthetic-{index}.wav"
+        sf.write(path, audio, SAMPLE_RATE, subtype="PCM_16")
+        entries.append(
+            {
+                "id": f"synthetic-{index}",
+                "language": utterance["language"],
+                "targetText": utterance["text"],
+                "audioPath": str(path),
+            }
+        )
+    return entries
+
+
+def load_entries(dataset: Path, work_dir: Path) -> list[dict]:
+    if not dataset.exists():
+        print(f"[loadtest] {dataset} not found; using synthetic clips", file=sys.stderr)
+        return _synthetic_entries(work_dir)
+
+    entries = []
+    for entry in json.loads(dataset.read_text(encoding="utf-8")):
+        entries.append({**entry, "audioPath": str(resolve_audio_path(dataset, entry["audioPath"]))})
+    return entries
+
+
+def build_specs(entries: list[dict], score_share: float) -> list[RequestSpec]:
+    """Interleave score and synthesize requests in the ratio *score_share*."""
+    score_specs = []
+    synth_specs = []
+    for entry in entries:
+        body, content_type = encode_multipart(score_fields(entry), Path(entry["audioPath"]))
+        score_specs.append(RequestSpec("score", "/score", body, content_type))
+        payload = {"language": entry["language"], "text": entry["targetText"]}
+        synth_specs.append(
+            RequestSpec("synthesize", "/synthesize", json.dumps(payload).encode("utf-8"), "application/json")
+        )
+
+    specs: list[RequestSpec] = []
+    score_cycle, synth_cycle = itertools.cycle(score_specs), itertools.cycle(synth_specs)
+    slots = max(len(score_specs), 20)
+    for index in range(slots):
+        # Deterministic spread: slot i is a score request while the running
+        # share of score requests is below the target.
+        scored = sum(1 for spec in specs if spec.endpoint == "score")
+        if score_share > 0 and (score_share >= 1 or scored < score_share * (index + 1)):
+            specs.append(next(score_cycle))
+        else:
+            specs.append(next(synth_cycle))
+    return specs
+
+
+async def _post(host: str, port: int, spec: RequestSpec, timeout: float) -> int:
+    # HTTP/1.0 with a close-delimited body keeps the client dependency-free.
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        head = (
+            f"POST {spec.path} HTTP/1.0\r\nHost: {host}:{port}\r\n"
+            f"Content-Type: {spec.content_type}\r\nContent-Length: {len(spec.body)}\r\n\r\n"
+        ).encode("latin-1")
+        writer.write(head + spec.body)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    status_line = response.split(b"\r\n", 1)[0].split()
+    return int(status_line[1]) if len(status_line) > 1 else 0
+
+
+async def _send(host: str, port: int, spec: RequestSpec, timeout: float, started: float) -> Sample:
+    try:
+        status = await _post(host, port, spec, timeout)
+        error = None if status == 200 else f"HTTP {status}"
+    except (OSError, asyncio.TimeoutError) as exc:
+        status, error = 0, type(exc).__name__
+    return Sample(spec.endpoint, status, time.perf_counter() - started, error)
+
+
+def _pick(specs: list[RequestSpec], index: int, bust_cache: bool) -> RequestSpec:
+    spec = specs[index % len(specs)]
+    return vary_text(spec, index) if bust_cache else spec
+
+
+async def run_closed_loop(
+    url: str,
+    specs: list[RequestSpec],
+    concurrency: int,
+    duration: float,
+    total: int,
+    timeout: float,
+    bust_cache: bool = False,
+) -> list[Sample]:
+    parts = urlsplit(url)
+    host, port = parts.hostname or "127.0.0.1", parts.port or 80
+    samples: list[Sample] = []
+    cursor = itertools.count()
+    deadline = time.perf_counter() + duration
+
+    async def worker() -> None:
+        while time.perf_counter() < deadline:
+            index = next(cursor)
+            if total and index >= total:
+                return
+            spec = _pick(specs, index, bust_cache)
+            samples.append(await _send(host, port, spec, timeout, time.perf_counter()))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples
+
+
+async def run_open_loop(
+    url: str,
+    specs: list[RequestSpec],
+    rate: float,
+    concurrency: int,
+    duration: float,
+    total: int,
+    timeout: float,
+    seed: int,
+    bust_cache: bool = False,
+) -> list[Sample]:
+    parts = urlsplit(url)
+    host, port = parts.hostname or "127.0.0.1", parts.port or 80
+    rng = random.Random(seed)
+    limit = asyncio.Semaphore(concurrency)
+    samples: list[Sample] = []
+
+    async def arrival(spec: RequestSpec, scheduled: float) -> None:
+        async with limit:
+            samples.append(await _send(host, port, spec, timeout, scheduled))
+
+    tasks = []
+    started = time.perf_counter()
+    next_arrival = started
+    for index in itertools.count():
+        if (total and index >= total) or next_arrival - started >= duration:
+            break
+        delay = next_arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(arrival(_pick(specs, index, bust_cache), next_arrival)))
+        next_arrival += rng.expovariate(rate)
+
+    await asyncio.gather(*tasks)
+    return samples
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float | None:
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(fraction * len(sorted_values) + 0.5)))
+    return round(sorted_values[min(rank, len(sorted_values)) - 1] * 1000, 1)
+
+
+def summarize(samples: list[Sample], wall_seconds: float) -> dict:
+    groups: dict[str, list[Sample]] = {"all": samples}
+    for sample in samples:
+        groups.setdefault(sample.endpoint, []).append(sample)
+
+    report = {}
+    for name, group in groups.items():
+        latencies = sorted(sample.seconds for sample in group)
+        errors = sum(1 for sample in group if sample.error)
+        report[name] = {
+            "requests": len(group),
+            "errors": errors,
+            "error_rate": round(errors / len(group), 4) if group else 0.0,
+            "throughput_rps": round(len(group) / wall_seconds, 3) if wall_seconds else 0.0,
+            "p50_ms": _percentile(latencies, 0.50),
+            "p95_ms": _percentile(latencies, 0.95),
+            "p99_ms": _percentile(latencies, 0.99),
+            "statuses": dict(Counter(str(sample.status) for sample in group)),
+        }
+    return report
+
+
+def _spawn_service(stub: bool) -> tuple[subprocess.Popen, str]:
+    port = _free_port()
+    env = dict(os.environ)
+    if stub:
+        env["SPEECH_STUB_MODELS"] = "1"
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=SERVICE_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    if not _wait_until(lambda: _status(f"{base_url}/health", timeout=2) == 200, time.monotonic() + 120):
+        process.kill()
+        raise RuntimeError("spawned speech service did not answer /health")
+    return process, base_url
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test /score and /synthesize.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--spawn", action="store_true", help="start a local service on a free port")
+    parser.add_argument("--stub", action="store_true", help="with --spawn: SPEECH_STUB_MODELS=1")
+    parser.add_argument("--dataset", type=Path, default=SERVICE_DIR.parent / "scripts/benchmark/smoke-set.json")
+    parser.add_argument("--concurrency", type=int, default=4, help="workers, or max in flight with --rate")
+    parser.add_argument("--rate", type=float, default=0.0, help="open-loop arrivals per second (0 = closed loop)")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--requests", type=int, default=0, help="stop after this many requests (0 = no limit)")
+    parser.add_argument("--score-share", type=float, default=0.8, help="fraction of requests sent to /score")
+    parser.add_argument(
+        "--bust-cache", action="store_true", help="make every /synthesize text unique (no cache hits)"
+    )
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, default=None, help="also write the report JSON here")
+    args = parser.parse_args(argv)
+
+    process = None
+    with tempfile.TemporaryDirectory() as work_dir:
+        specs = build_specs(load_entries(args.dataset, Path(work_dir)), args.score_share)
+        url = args.url
+        if args.spawn:
+            process, url = _spawn_service(args.stub)
+
+        try:
+            started = time.perf_counter()
+            if args.rate > 0:
+                samples = asyncio.run(
+                    run_open_loop(
+                        url,
+                        specs,
+                        rate=args.rate,
+                        concurrency=max(1, args.concurrency),
+                        duration=args.duration,
+                        total=args.requests,
+                        timeout=args.timeout,
+                        seed=args.seed,
+                        bust_cache=args.bust_cache,
+                    )
+                )
+            else:
+                samples = asyncio.run(
+                    run_closed_loop(
+                        url,
+                        specs,
+                        concurrency=max(1, args.concurrency),
+                        duration=args.duration,
+                        total=args.requests,
+                        timeout=args.timeout,
+                        bust_cache=args.bust_cache,
+                    )
+                )
+            wall_seconds = time.perf_counter() - started
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=10)
+
+    report = {
+        "config": {
+            "mode": "open" if args.rate > 0 else "closed",
+            "concurrency": args.concurrency,
+            "rate": args.rate or None,
+            "score_share": args.score_share,
+            "stub": args.stub,
+            "bust_cache": args.bust_cache,
+            "wall_seconds": round(wall_seconds, 2),
+        },
+        "endpoints": summarize(samples, wall_seconds),
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.out:
+        args.out.write_text(output + "\n", encoding="utf-8")
+    return 1 if report["endpoints"]["all"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
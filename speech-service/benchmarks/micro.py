@@ -0,0 +1,264 @@
+"""Micro-benchmarks for the scoring and text hot paths.
+
+Times ``normalize_text``, ``similarity_score``, target-variant matching,
+``boost_quiet_signal``, ``_fluency_score``, ``_segment_by_onsets`` and
+``_mandarin_tone_score`` on deterministic synthetic speech-like audio of
+several lengths (plus the smoke-set recordings, when present), and compares
+against a stored baseline.
+
+Run from ``speech-service/``::
+
+    python -m benchmarks.micro --update-baseline   # record a baseline on this machine
+    python -m benchmarks.micro                     # exit 1 if any case regressed
+
+Checking without a recorded baseline exits 2 rather than passing vacuously.
+
+Timings are machine-specific, so a baseline is only meaningful on the
+machine (and Python/library versions) that recorded it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.startup import SERVICE_DIR, first_entry_per_language
+
+SAMPLE_RATE = 16000
+SYNTHETIC_SECONDS = (1.0, 4.0, 10.0)
+DEFAULT_BASELINE = SERVICE_DIR / "benchmarks" / "micro-baseline.json"
+
+_ZH_TEXT = "我要喝水谢谢你今天天气很好我们去学校吧"
+_AR_TEXT = "أريد أن أشرب الماء من فضلك اليوم الطقس جميل جدا ونذهب إلى المدرسة معا"
+# Mandarin tone contours in semitones relative to the speaker's base pitch.
+_TONE_CONTOURS = {
+    1: (2.0, 2.0),
+    2: (-1.0, 3.0),
+    3: (-1.0, -4.0, 0.0),
+    4: (4.0, -3.0),
+}
+
+
+@dataclass
+class Case:
+    name: str
+    func: Callable[[], object]
+
+
+def synthetic_speech(seconds: float, seed: int = 0) -> tuple[np.ndarray, int]:
+    """Deterministic tonal syllables with gaps; returns ``(audio, syllable_count)``."""
+    rng = np.random.default_rng(seed)
+    syllable_seconds, gap_seconds = 0.24, 0.08
+    count = max(1, int(seconds / (syllable_seconds + gap_seconds)))
+    chunks: list[np.ndarray] = []
+    for index in range(count):
+        contour = _TONE_CONTOURS[index % 4 + 1]
+        n = int(syllable_seconds * SAMPLE_RATE)
+        semitones = np.interp(np.linspace(0, len(contour) - 1, n), np.arange(len(contour)), contour)
+        f0 = 180.0 * 2 ** (semitones / 12)
+        phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+        voice = sum(np.sin(k * phase) / k for k in (1, 2, 3))
+        envelope = np.sin(np.linspace(0, np.pi, n)) ** 0.5
+        chunks.append(0.3 * envelope * voice)
+        chunks.append(np.zeros(int(gap_seconds * SAMPLE_RATE)))
+
+    audio = np.concatenate(chunks)
+    target = int(seconds * SAMPLE_RATE)
+    audio = np.pad(audio, (0, max(0, target - audio.size)))[:target]
+    audio += rng.normal(0.0, 0.003, audio.size)
+    return audio.astype(np.float32), count
+
+
+def _repeat_to(text: str, length: int) -> str:
+    return (text * (length // len(text) + 1))[:length]
+
+
+def _load_fixtures(dataset: Path) -> list[tuple[str, np.ndarray, str, str]]:
+    import librosa
+
+    if not dataset.exists():
+        return []
+    fixtures = []
+    for entry in first_entry_per_language(dataset):
+        audio, _ = librosa.load(entry["audioPath"], sr=SAMPLE_RATE, mono=True)
+        fixtures.append((f"fixture-{entry['language']}", audio, entry["language"], entry["targetText"]))
+    return fixtures
+
+
+def build_cases(dataset: Path) -> list[Case]:
+    from app.audio import boost_quiet_signal
+    from app.scoring import _fluency_score, _mandarin_tone_score, _segment_by_onsets
+    from app.text_utils import normalize_text, similarity_score
+    from app.variants import target_matcher
+
+    cases: list[Case] = []
+
+    for language, base in (("zh", _ZH_TEXT), ("ar", _AR_TEXT)):
+        for length in (8, 32, 96):
+            text = _repeat_to(base, length)
+            # A plausible mis-recognition: a couple of substituted characters.
+            heard = text[: length // 2] + text[length // 2 + 2 :] + text[:2]
+            cases.append(Case(f"normalize_text[{language}-{length}]", lambda text=text: normalize_text(text)))
+            norm_text, norm_heard = normalize_text(text), normalize_text(heard)
+            cases.append(
+                Case(
+                    f"similarity_score[{language}-{length}]",
+                    lambda a=norm_heard, b=norm_text: similarity_score(a, b),
+                )
+            )
+            # Same target plus five alternatives sharing most of its prefix.
+            for count in (1, 6):
+                forms = [text] + [text[:-shift] + base[:shift] for shift in range(1, count)]
+                matcher = target_matcher(forms[0], None, forms[1:])
+                cases.append(
+                    Case(
+                        f"variant_match[{language}-{length}-x{count}]",
+                        lambda matcher=matcher, heard=norm_heard: matcher.match(heard),
+                    )
+                )
+
+    clips: list[tuple[str, np.ndarray, str, str]] = []
+    for seconds in SYNTHETIC_SECONDS:
+        audio, syllables = synthetic_speech(seconds)
+        clips.append((f"synthetic-{seconds:g}s", audio, "zh", _repeat_to(_ZH_TEXT, syllables)))
+    clips.extend(_load_fixtures(dataset))
+
+    for label, audio, language, target_text in clips:
+        quiet = audio * 0.02
+        syllables = max(1, len(target_text)) if language == "zh" else max(1, len(target_text.split()))
+        cases.extend(
+            [
+                Case(f"boost_quiet_signal[{label}]", lambda quiet=quiet: boost_quiet_signal(quiet)),
+                Case(
+                    f"_fluency_score[{label}]",
+                    lambda audio=audio, text=target_text, language=language: _fluency_score(
+                        audio, SAMPLE_RATE, text, language
+                    ),
+                ),
+                Case(
+                    f"_segment_by_onsets[{label}]",
+                    lambda audio=audio, n=syllables: _segment_by_onsets(audio, SAMPLE_RATE, n),
+                ),
+            ]
+        )
+        if language == "zh":
+            cases.append(
+                Case(
+                    f"_mandarin_tone_score[{label}]",
+                    lambda audio=audio, text=target_text: _mandarin_tone_score(audio, SAMPLE_RATE, text),
+                )
+            )
+    return cases
+
+
+def time_case(func: Callable[[], object], repeat: int, min_run_seconds: float) -> dict:
+    # The first calls pay for numba JIT and librosa's lazy imports; exclude them.
+    func()
+    func()
+
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_run_seconds or loops >= 1_000_000:
+            break
+        loops *= 10 if elapsed < min_run_seconds / 10 else 2
+
+    runs = [elapsed / loops]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        runs.append((time.perf_counter() - started) / loops)
+
+    return {
+        "min_ms": round(min(runs) * 1000, 4),
+        "median_ms": round(statistics.median(runs) * 1000, 4),
+        "loops": loops,
+        "repeat": repeat,
+    }
+
+
+def _environment() -> dict:
+    import librosa
+
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor() or platform.machine(),
+        "numpy": np.__version__,
+        "librosa": librosa.__version__,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[dict]:
+    """Cases whose ``min_ms`` grew by more than *threshold* (a fraction) over the baseline."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous or previous["min_ms"] <= 0:
+            continue
+        ratio = current["min_ms"] / previous["min_ms"]
+        if ratio > 1 + threshold:
+            regressions.append(
+                {
+                    "case": name,
+                    "baseline_ms": previous["min_ms"],
+                    "current_ms": current["min_ms"],
+                    "ratio": round(ratio, 3),
+                }
+            )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Time scoring/text hot paths and check for regressions.")
+    parser.add_argument("--dataset", type=Path, default=SERVICE_DIR.parent / "scripts/benchmark/smoke-set.json")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="write this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown, e.g. 0.2 = 20%%")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-run-seconds", type=float, default=0.2)
+    parser.add_argument("--filter", default="", help="only run cases whose name contains this")
+    parser.add_argument("--out", type=Path, default=None, help="also write the result JSON here")
+    args = parser.parse_args(argv)
+    if not args.update_baseline and not args.baseline.exists():
+        parser.error(f"no baseline at {args.baseline}; record one with --update-baseline")
+
+    results: dict[str, dict] = {}
+    for case in build_cases(args.dataset):
+        if args.filter and args.filter not in case.name:
+            continue
+        results[case.name] = time_case(case.func, max(1, args.repeat), args.min_run_seconds)
+        print(f"{case.name:48s} {results[case.name]['min_ms']:>12.4f} ms", file=sys.stderr, flush=True)
+
+    report = {"environment": _environment(), "results": results}
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(json.dumps({"baseline": str(args.baseline), "cases": len(results)}))
+        return 0
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    if baseline.get("environment") != report["environment"]:
+        print("[micro] warning: baseline was recorded in a different environment", file=sys.stderr)
+    regressions = compare(results, baseline.get("results", {}), args.threshold)
+    print(json.dumps({"baseline": str(args.baseline), "cases": len(results), "regressions": regressions}, indent=2))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
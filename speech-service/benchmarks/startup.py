@@ -0,0 +1,168 @@
+"""Measure cold-start time of the speech service.
+
+Starts ``uvicorn app.main:app`` in a subprocess and reports, per language,
+the time from process launch to the first successful ``/score`` response,
+alongside time to first ``/health`` and to ``/ready``.
+
+Run from ``speech-service/``::
+
+    python -m benchmarks.startup --dataset ../scripts/benchmark/smoke-set.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+from urllib import error as urlerror
+from urllib import request as urlrequest
+
+SERVICE_DIR = Path(__file__).resolve().parents[1]
+
+
+def encode_multipart(fields: dict[str, str], audio_path: Path) -> tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    parts: list[bytes] = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode("utf-8")
+        )
+    parts.append(
+        (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="audio"; filename="{audio_path.name}"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n"
+        ).encode("utf-8")
+        + audio_path.read_bytes()
+        + b"\r\n"
+    )
+    parts.append(f"--{boundary}--\r\n".encode("ascii"))
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def score_fields(entry: dict) -> dict[str, str]:
+    fields = {"language": entry["language"], "target_text": entry["targetText"]}
+    if entry.get("transliteration"):
+        fields["transliteration"] = entry["transliteration"]
+    return fields
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _status(url: str, data: bytes | None = None, content_type: str | None = None, timeout: float = 600) -> int:
+    headers = {"Content-Type": content_type} if content_type else {}
+    request = urlrequest.Request(url, data=data, headers=headers, method="POST" if data else "GET")
+    try:
+        with urlrequest.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urlerror.HTTPError as exc:
+        return exc.code
+    except (urlerror.URLError, ConnectionError, TimeoutError):
+        return 0
+
+
+def _wait_until(predicate, deadline: float, interval: float = 0.1) -> bool:
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(interval)
+    return False
+
+
+def measure_startup(entries: list[dict], timeout: float) -> dict:
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.monotonic()
+    deadline = started + timeout
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=SERVICE_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    def elapsed() -> float:
+        return round(time.monotonic() - started, 3)
+
+    result: dict = {"health_seconds": None, "languages": {}}
+    try:
+        if not _wait_until(lambda: _status(f"{base_url}/health", timeout=2) == 200, deadline):
+            raise RuntimeError("speech service did not answer /health before the timeout")
+        result["health_seconds"] = elapsed()
+
+        for entry in entries:
+            language = entry["language"]
+            body, content_type = encode_multipart(score_fields(entry), Path(entry["audioPath"]))
+            score_seconds = None
+            # /score loads models lazily, so retry only on errors, not on slowness.
+            while time.monotonic() < deadline:
+                status = _status(f"{base_url}/score", body, content_type, timeout=max(1.0, deadline - time.monotonic()))
+                if status == 200:
+                    score_seconds = elapsed()
+                    break
+                time.sleep(0.5)
+
+            ready_seconds = None
+            if _wait_until(lambda: _status(f"{base_url}/ready?language={language}", timeout=2) == 200, deadline):
+                ready_seconds = elapsed()
+
+            result["languages"][language] = {
+                "first_score_seconds": score_seconds,
+                "ready_seconds": ready_seconds,
+            }
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    return result
+
+
+def resolve_audio_path(dataset: Path, audio_path: str) -> Path:
+    path = Path(audio_path)
+    if path.is_absolute():
+        return path
+    # Generated corpora use paths relative to their manifest; the smoke set
+    # uses paths relative to the repository root.
+    beside_manifest = dataset.parent / path
+    if beside_manifest.exists():
+        return beside_manifest.resolve()
+    return (SERVICE_DIR.parent / path).resolve()
+
+
+def first_entry_per_language(dataset: Path) -> list[dict]:
+    entries: dict[str, dict] = {}
+    for entry in json.loads(dataset.read_text(encoding="utf-8")):
+        audio_path = resolve_audio_path(dataset, entry["audioPath"])
+        entries.setdefault(entry["language"], {**entry, "audioPath": str(audio_path)})
+    return list(entries.values())
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure time to first successful /score per language.")
+    parser.add_argument("--dataset", type=Path, default=SERVICE_DIR.parent / "scripts/benchmark/smoke-set.json")
+    parser.add_argument("--timeout", type=float, default=900.0)
+    parser.add_argument("--out", type=Path, default=None, help="also write the result JSON here")
+    args = parser.parse_args(argv)
+
+    result = measure_startup(first_entry_per_language(args.dataset), timeout=args.timeout)
+    output = json.dumps(result, indent=2)
+    print(output)
+    if args.out:
+        args.out.write_text(output + "\n", encoding="utf-8")
+    return 0 if all(lang["first_score_seconds"] for lang in result["languages"].values()) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,5 +1,5 @@
 import { NextRequest } from "next/server";
-import { parseArabicForm, resolveArabicTarget } from "@/lib/arabic-forms";
+import { arabicTargetVariants, parseArabicForm, resolveArabicTarget } from "@/lib/arabic-forms";
 import {
   PRONUNCIATION_DAILY_LIMIT,
   PRONUNCIATION_MONTHLY_LIMIT,
@@ -96,6 +96,7 @@ export async function POST(request: NextRequest) {
         select: {
           id: true,
           scriptText: true,
+          vowelledText: true,
           transliteration: true,
           language: true,
           lexicalVariants: {
@@ -123,6 +124,13 @@ export async function POST(request: NextRequest) {
         language: lexicalItem.language,
         targetText: target.scriptText,
         transliteration: target.transliteration,
+        variants: arabicTargetVariants({
+          language: lexicalItem.language,
+          scriptText: lexicalItem.scriptText,
+          vowelledText: lexicalItem.vowelledText,
+          transliteration: lexicalItem.transliteration,
+          lexicalVariants: lexicalItem.lexicalVariants,
+        }),
       });
 
       const attempt = await db.pronunciationAttempt.create({
@@ -103,6 +103,8 @@ export async function POST(request: NextRequest) {
       language: lexicalItem.language,
       targetText: lexicalItem.scriptText,
       transliteration: expectedTransliteration,
+      // The drill is MSA only, so the Syrian variant is not accepted here.
+      variants: [vowelledText],
     });
 
     const tips = buildNoHarakatTips({
@@ -1,10 +1,10 @@
-import { NextRequest, NextResponse } from "next/server";
+import { NextRequest } from "next/server";
 import { LanguageCode } from "@prisma/client";
 import { parseArabicForm, resolveArabicTarget } from "@/lib/arabic-forms";
 import { requireUser } from "@/lib/auth";
 import { db } from "@/lib/db";
 import { ensure, handleRouteError } from "@/lib/http";
-import { synthesizeWithLocalService } from "@/lib/local-speech-service";
+import { synthesizeWithLocalService, targetAudioResponse } from "@/lib/local-speech-service";
 import { pronunciationTargetAudioQuerySchema } from "@/lib/schemas";
 
 export async function GET(request: NextRequest) {
@@ -55,15 +55,10 @@ export async function GET(request: NextRequest) {
       language: lexicalItem.language,
       text: synthesisText,
       transliteration: target.transliteration,
+      ifNoneMatch: request.headers.get("if-none-match"),
     });
 
-    return new NextResponse(result.audio, {
-      status: 200,
-      headers: {
-        "Content-Type": result.contentType,
-        "Cache-Control": "no-store",
-      },
-    });
+    return targetAudioResponse(result);
   } catch (error) {
     return handleRouteError(error);
   }
@@ -99,3 +99,28 @@ export function resolveArabicTarget(args: {
     transliteration: fallback?.transliteration ?? args.transliteration,
   };
 }
+
+/**
+ * Every acceptable spoken form of an Arabic item: the item's own script,
+ * vowelled and transliterated forms plus those of each register variant.
+ * The speech service matches an attempt against all of them at once.
+ */
+export function arabicTargetVariants(args: {
+  language: LanguageCode;
+  scriptText: string;
+  vowelledText?: string | null;
+  transliteration: string | null;
+  lexicalVariants: LexicalVariantShape[];
+}): string[] {
+  if (args.language !== LanguageCode.AR_MSA) {
+    return [];
+  }
+
+  const forms = [
+    args.scriptText,
+    args.vowelledText,
+    args.transliteration,
+    ...args.lexicalVariants.flatMap((variant) => [variant.scriptText, variant.transliteration]),
+  ];
+  return [...new Set(forms.map((form) => form?.trim() ?? "").filter((form) => form.length > 0))];
+}
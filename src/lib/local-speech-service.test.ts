@@ -0,0 +1,58 @@
+import assert from "node:assert/strict";
+import { afterEach, test } from "node:test";
+import { LanguageCode } from "@prisma/client";
+import { ApiError } from "@/lib/http";
+import { synthesizeWithLocalService } from "@/lib/local-speech-service";
+
+const realFetch = globalThis.fetch;
+
+afterEach(() => {
+  globalThis.fetch = realFetch;
+});
+
+function serve(response: Response): { headers: () => Headers } {
+  let sent = new Headers();
+  globalThis.fetch = async (_input, init) => {
+    sent = new Headers(init?.headers);
+    return response;
+  };
+  return { headers: () => sent };
+}
+
+test("a 304 revalidation returns no audio and keeps the ETag", async () => {
+  const request = serve(new Response(null, { status: 304, headers: { ETag: '"clip-1"' } }));
+
+  const result = await synthesizeWithLocalService({
+    language: LanguageCode.AR_MSA,
+    text: "مرحبا",
+    ifNoneMatch: '"clip-1"',
+  });
+
+  assert.equal(request.headers().get("if-none-match"), '"clip-1"');
+  assert.deepEqual(result, { audio: null, contentType: "audio/wav", etag: '"clip-1"' });
+});
+
+test("a 200 returns the audio with its ETag", async () => {
+  serve(
+    new Response(new Uint8Array([1, 2, 3]), {
+      status: 200,
+      headers: { "Content-Type": "audio/wav", ETag: '"clip-2"' },
+    }),
+  );
+
+  const result = await synthesizeWithLocalService({ language: LanguageCode.ZH_HANS, text: "你好" });
+
+  assert.equal(result.etag, '"clip-2"');
+  assert.equal(result.contentType, "audio/wav");
+  assert.deepEqual(new Uint8Array(result.audio ?? new ArrayBuffer(0)), new Uint8Array([1, 2, 3]));
+});
+
+test("a service error still fails as LOCAL_TTS_ERROR", async () => {
+  serve(Response.json({ detail: "backend down" }, { status: 500 }));
+
+  await assert.rejects(
+    synthesizeWithLocalService({ language: LanguageCode.AR_MSA, text: "مرحبا" }),
+    (error: unknown) =>
+      error instanceof ApiError && error.status === 502 && error.payload.code === "LOCAL_TTS_ERROR",
+  );
+});
@@ -1,12 +1,21 @@
+import { NextResponse } from "next/server";
 import { LanguageCode } from "@prisma/client";
 import { ApiError } from "@/lib/http";
 
 const DEFAULT_URL = "http://127.0.0.1:8001";
+const DEFAULT_SCORE_TIMEOUT_MS = 20000;
+// Time kept back from the deadline sent to the service for the round trip.
+const DEADLINE_NETWORK_MARGIN_MS = 250;
 
 function baseUrl(): string {
   return (process.env.LOCAL_SPEECH_URL ?? DEFAULT_URL).replace(/\/$/, "");
 }
 
+function scoreTimeoutMs(): number {
+  const value = Number(process.env.LOCAL_SPEECH_SCORE_TIMEOUT_MS);
+  return Number.isFinite(value) && value > 0 ? value : DEFAULT_SCORE_TIMEOUT_MS;
+}
+
 function detailFromPayload(payload: unknown): string | null {
   if (!payload || typeof payload !== "object") {
     return null;
@@ -28,12 +37,26 @@ function speechLanguage(language: LanguageCode): "ar" | "zh" {
   return language === LanguageCode.AR_MSA ? "ar" : "zh";
 }
 
+/**
+ * Scheduling class for speech-service work. Learner-facing requests are
+ * `interactive`; audio fetched ahead of need should be `prefetch`, and bulk
+ * jobs `background`, so they never delay a learner waiting on a score.
+ */
+export type SpeechPriority = "interactive" | "prefetch" | "background";
+
 type ScoreResponse = {
   transcript: string;
   score: number;
   feedback: string;
   confidence: string;
   components: Record<string, number>;
+  /** True when Whisper passes were skipped or run greedy to meet the deadline. */
+  degraded?: boolean;
+  degradations?: string[];
+  /** Overload quality tier the attempt was scored at ("full" normally). */
+  tier?: string;
+  /** Target form (target text, transliteration or variant) the transcript matched best. */
+  matched_variant?: string | null;
 };
 
 export async function scorePronunciationWithLocalService(args: {
@@ -41,6 +64,8 @@ export async function scorePronunciationWithLocalService(args: {
   language: LanguageCode;
   targetText: string;
   transliteration?: string | null;
+  /** Other acceptable forms of the target, e.g. the other register or spelling. */
+  variants?: string[];
 }): Promise<ScoreResponse> {
   const form = new FormData();
   form.set("audio", args.audioFile, args.audioFile.name || "attempt.webm");
@@ -51,13 +76,29 @@ export async function scorePronunciationWithLocalService(args: {
     form.set("transliteration", args.transliteration);
   }
 
+  for (const variant of args.variants ?? []) {
+    form.append("variants", variant);
+  }
+
+  const timeoutMs = scoreTimeoutMs();
   let response: Response;
   try {
     response = await fetch(`${baseUrl()}/score`, {
       method: "POST",
       body: form,
+      headers: {
+        "X-Speech-Deadline-Ms": String(Math.max(1, timeoutMs - DEADLINE_NETWORK_MARGIN_MS)),
+      },
+      signal: AbortSignal.timeout(timeoutMs),
     });
-  } catch {
+  } catch (error) {
+    if (error instanceof DOMException && error.name === "TimeoutError") {
+      throw new ApiError(
+        504,
+        "LOCAL_SPEECH_TIMEOUT",
+        `Local speech service did not score the attempt within ${timeoutMs} ms.`,
+      );
+    }
     throw new ApiError(
       503,
       "LOCAL_SPEECH_UNAVAILABLE",
@@ -79,17 +120,31 @@ export async function scorePronunciationWithLocalService(args: {
   return (await response.json()) as ScoreResponse;
 }
 
+/**
+ * Synthesized target audio. `audio` is null when `ifNoneMatch` matched the
+ * clip's current ETag (HTTP 304): the caller's copy is still valid.
+ */
+export type SynthesizedAudio = {
+  audio: ArrayBuffer | null;
+  contentType: string;
+  etag: string | null;
+};
+
 export async function synthesizeWithLocalService(args: {
   language: LanguageCode;
   text: string;
   transliteration?: string | null;
-}): Promise<{ audio: ArrayBuffer; contentType: string }> {
+  priority?: SpeechPriority;
+  ifNoneMatch?: string | null;
+}): Promise<SynthesizedAudio> {
   let response: Response;
   try {
     response = await fetch(`${baseUrl()}/synthesize`, {
       method: "POST",
       headers: {
         "Content-Type": "application/json",
+        "X-Speech-Priority": args.priority ?? "interactive",
+        ...(args.ifNoneMatch ? { "If-None-Match": args.ifNoneMatch } : {}),
       },
       body: JSON.stringify({
         language: speechLanguage(args.language),
@@ -105,6 +160,12 @@ export async function synthesizeWithLocalService(args: {
     );
   }
 
+  const etag = response.headers.get("etag");
+  // A revalidation hit is not `ok` (2xx), so check for it before errors.
+  if (response.status === 304) {
+    return { audio: null, contentType: "audio/wav", etag };
+  }
+
   if (!response.ok) {
     const payload = (await response.json().catch(() => ({}))) as { detail?: unknown };
     const detail = detailFromPayload(payload);
@@ -119,9 +180,28 @@ export async function synthesizeWithLocalService(args: {
   return {
     audio: await response.arrayBuffer(),
     contentType: response.headers.get("content-type") ?? "audio/wav",
+    etag,
   };
 }
 
+/**
+ * Response for target audio: the browser revalidates every replay with
+ * `If-None-Match`, so an unchanged clip costs one empty 304 round-trip.
+ */
+export function targetAudioResponse(result: SynthesizedAudio): NextResponse {
+  const headers: Record<string, string> = {
+    "Cache-Control": "private, no-cache",
+    ...(result.etag ? { ETag: result.etag } : {}),
+  };
+  if (result.audio === null) {
+    return new NextResponse(null, { status: 304, headers });
+  }
+  return new NextResponse(result.audio, {
+    status: 200,
+    headers: { ...headers, "Content-Type": result.contentType },
+  });
+}
+
 export async function checkLocalSpeechHealth() {
   try {
     const response = await fetch(`${baseUrl()}/health`, {